@@ -1,20 +1,17 @@
 import os
 import json
-import schedule
+import threading
 import time
 from datetime import datetime
 from dotenv import load_dotenv
 
+from . import metrics, run_log
+
 # Charger les variables d'environnement
 load_dotenv('config/.env')
 
 PLAYLIST_ID = os.getenv('PLAYLIST_ID')
 YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
-LOG_FILE = 'logs/auto_update.log'
-
-# Créer le dossier logs s'il n'existe pas
-os.makedirs('logs', exist_ok=True)
-
 # Keywords optimisés pour RAP GASY avec codes de ville
 KEYWORDS_LIST = [
     # Base
@@ -80,16 +77,130 @@ KEYWORDS_LIST = [
     "kolotsaina mainty",
 ]
 
-def log_update(message):
-    """Sauvegarde les logs des mises à jour"""
+def _echo(message):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_message = f"[{timestamp}] {message}"
-    print(log_message)
+    print(f"[{timestamp}] {message}")
+
+def log_update(message, event='message', **fields):
+    """
+    Affiche un message et l'ajoute au journal structuré (JSON lines, écritures groupées)
+    fields: données de l'entrée (mot-clé, compteurs...) exploitables sans parser le texte
+    """
+    _echo(message)
+    
+    # Les lignes de séparation ('=====') ne servent qu'à l'affichage
+    if message.strip('=\n ') or fields:
+        run_log.log_event(event, message.strip(), **fields)
+
+_log_lock = threading.Lock()
+
+def _rate(part, total):
+    return f"{100 * part / total:.0f}%" if total else "n/a"
+
+def process_keyword(youtube, idx, total, keywords, max_pages=None, seen=None, run_id=None):
+    """
+    Traite un mot-clé (recherche, filtres, ajouts) et journalise son résultat
+    Appelé en parallèle par le crawler: les lignes d'un mot-clé sont écrites d'un bloc
+    max_pages: profondeur décidée par le planificateur (recherche incrémentale)
+    seen: vidéos déjà traitées pendant ce passage (partagé entre mots-clés)
+    run_id: mise à jour en cours (journal structuré)
+    """
+    from .search_api import search_and_add_videos_with_api
+    from . import crawl_state
+    from .quota import QuotaExceededError
+    
+    window = crawl_state.get_search_window(keywords)
+    if max_pages and not window['full_scan']:
+        window['max_pages'] = min(window['max_pages'], max_pages)
+    if window['full_scan']:
+        mode = "complète"
+    elif window['published_before']:
+        mode = f"rattrapage {window['published_after']} -> {window['published_before']}"
+    else:
+        mode = f"depuis {window['published_after']}"
+    lines = [f"\n[{idx}/{total}] 🔍 Recherche: '{keywords}' ({mode})"]
+    outcome = {'keywords': keywords, 'result': None, 'quota_exceeded': False, 'full_scan': window['full_scan']}
+    
+    try:
+        result = search_and_add_videos_with_api(
+            youtube,
+            PLAYLIST_ID,
+            keywords,
+            max_results=50,  # 50 résultats par requête
+            published_after=window['published_after'],
+            max_pages=window['max_pages'],
+            seen=seen,
+            published_before=window['published_before']
+        )
+        outcome['result'] = result
+        
+        if result:
+            # Ne pas avancer la marque si le quota a coupé le traitement
+            if not result.get('quota_exceeded'):
+                crawl_state.record_search(
+                    keywords,
+                    window,
+                    result.get('latest_published_at'),
+                    result.get('truncated', False),
+                    result.get('oldest_published_at')
+                )
+            
+            added = result.get('added', 0)
+            skipped = result.get('skipped', 0)
+            errors = result.get('errors', 0)
+            too_short = result.get('too_short', 0)
+            near_duplicates = result.get('near_duplicates', 0)
+            off_topic = result.get('off_topic', 0)
+            queued = result.get('queued', 0)
+            
+            status = "✅" if added > 0 else "⏭️"
+            lines.append(
+                f"  {status} Ajoutées: {added} | ⏭️ Doublons: {skipped} | "
+                f"🪞 Quasi-doublons: {near_duplicates} | 🚫 Hors sujet: {off_topic} | "
+                f"⏱️ Trop courtes: {too_short} | 📥 En file: {queued} | ❌ Erreurs: {errors}"
+            )
+            
+            if result.get('quota_exceeded'):
+                lines.append("  🛑 Quota YouTube épuisé: arrêt de la mise à jour")
+                outcome['quota_exceeded'] = True
+        else:
+            lines.append(f"  ⚠️ Erreur lors de la recherche")
+        
+    except QuotaExceededError as e:
+        # Arrêt propre: les mots-clés suivants échoueraient tous
+        lines.append(f"  🛑 {str(e)}: arrêt de la mise à jour")
+        outcome['quota_exceeded'] = True
+    except Exception as e:
+        lines.append(f"  ❌ Erreur critique: {str(e)}")
+        outcome['error'] = str(e)
+    
+    with _log_lock:
+        for line in lines:
+            _echo(line)
     
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_message + '\n')
+    result = outcome['result'] or {}
+    run_log.log_event(
+        'keyword',
+        run_id=run_id,
+        keyword=keywords,
+        full_scan=window['full_scan'],
+        published_after=window['published_after'],
+        max_pages=window['max_pages'],
+        added=result.get('added', 0),
+        skipped=result.get('skipped', 0),
+        too_short=result.get('too_short', 0),
+        errors=result.get('errors', 0),
+        already_seen=result.get('already_seen', 0),
+        off_topic=result.get('off_topic', 0),
+        queued=result.get('queued', 0),
+        near_duplicates=result.get('near_duplicate_videos', []),
+        quota_exceeded=outcome['quota_exceeded'],
+        error=outcome.get('error')
+    )
+    
+    return outcome
 
-def automatic_update():
+def automatic_update(abort=None):
     """
     Effectue une mise à jour automatique de la playlist
     Recherche les nouvelles vidéos RAP Gasy et les ajoute
@@ -97,67 +208,222 @@ def automatic_update():
     - Anti-doublons global
     - Durée minimale: 2 minutes
     - Toutes les chaînes
+    abort: threading.Event levé quand la mise à jour doit s'arrêter (bail perdu, voir scheduler):
+    les chaînes et mots-clés pas encore démarrés sont sautés, les étapes suivantes aussi
     """
     log_update("=" * 70)
     log_update("🔄 DÉBUT DE LA MISE À JOUR AUTOMATIQUE")
     log_update(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     log_update(f"🔍 Total mots-clés à traiter: {len(KEYWORDS_LIST)}")
     log_update("=" * 70)
+    started = time.perf_counter()
+    run_id = None
     
     try:
-        # Importer la fonction de recherche
-        from .search_api import search_and_add_videos_with_api
-        from googleapiclient.discovery import build
+        from . import channels, enrichment, events, insert_queue, keyword_stats, membership, quota, reorder, runs, search_cache
+        from .crawler import run_crawl
+        from .quota import QuotaExceededError
+        from .youtube_client import get_youtube_client
+        
+        # Historique consultable via /api/runs
+        run_id = runs.start_run(len(KEYWORDS_LIST))
+        log_update(f"🆔 Mise à jour n°{run_id}", event='run_started', run_id=run_id)
+        
+        # Client YouTube (clé API) réutilisé d'une exécution à l'autre
+        youtube = get_youtube_client()
+        
+        # Mettre à jour l'index des vidéos de la playlist (synchro différentielle)
+        try:
+            sync = membership.get_index().refresh(youtube, PLAYLIST_ID)
+            if sync['synced']:
+                log_update(f"📚 Catalogue synchronisé: {sync['total']} vidéos ({sync['removed']} retirées)")
+            else:
+                log_update(f"📚 Catalogue déjà à jour: {sync['total']} vidéos")
+        except Exception as e:
+            log_update(f"⚠️ Synchro du catalogue impossible: {str(e)}")
+        
+        stop_event = threading.Event()
+        
+        def aborted():
+            return abort is not None and abort.is_set()
+        
+        # Ajouts restés en attente (erreur, quota, arrêt d'un passage précédent): avant tout le reste
+        queue = insert_queue.drain(youtube)
+        if queue['quota_exceeded']:
+            stop_event.set()
+        log_update(
+            f"📥 File d'ajouts: {queue['added']} ajoutées | {queue['present']} déjà présentes | "
+            f"{queue['retry']} reportées | {queue['failed']} abandonnées | reste {queue['remaining']}",
+            event='insert_queue',
+            run_id=run_id,
+            **queue
+        )
+        
+        # Une vidéo trouvée par plusieurs mots-clés n'est traitée qu'une fois par passage
+        seen = search_cache.SeenVideos()
+        cache_before = search_cache.get_stats()
+        
+        # Nouveautés des chaînes suivies d'abord: 1 unité par chaîne au lieu de 100 par recherche
+        discovered = channels.bootstrap_from_catalog()
+        if discovered:
+            log_update(f"📺 Nouvelles chaînes suivies (depuis le catalogue): {discovered}")
+        channels_due = channels.channels_to_poll()
+        
+        def channel_worker(channel):
+            if aborted():
+                stop_event.set()
+                return None
+            with quota.track_usage() as usage, events.context(run_id=run_id, channel=channel['channel_id']):
+                try:
+                    result = channels.poll_channel(get_youtube_client(), PLAYLIST_ID, channel, seen)
+                except QuotaExceededError:
+                    stop_event.set()
+                    return None
+            if result['quota_exceeded']:
+                stop_event.set()
+            return {'result': result, 'units': usage['units']}
         
-        # Construire le service YouTube avec clé API
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+        channel_outcomes = run_crawl(channels_due, channel_worker, stop_event=stop_event)
+        channel_totals = {'polled': 0, 'added': 0, 'skipped': 0, 'errors': 0, 'units': 0}
+        for outcome in channel_outcomes:
+            if outcome is None:
+                continue
+            if isinstance(outcome, Exception):
+                channel_totals['errors'] += 1
+                continue
+            channel_totals['polled'] += 1
+            channel_totals['units'] += outcome['units']
+            for name in ('added', 'skipped', 'errors'):
+                channel_totals[name] += outcome['result'].get(name, 0)
+        log_update(
+            f"📺 Chaînes suivies: {channel_totals['polled']}/{len(channels_due)} lues | "
+            f"✅ Ajoutées: {channel_totals['added']} | 💰 {channel_totals['units']} unités",
+            event='channels',
+            run_id=run_id,
+            **channel_totals
+        )
         
-        total_added = 0
-        total_skipped = 0
-        total_errors = 0
+        # Choisir les mots-clés selon leur rendement passé (les improductifs se reposent)
+        schedule_plan = keyword_stats.plan_keywords(KEYWORDS_LIST)
+        if schedule_plan['resting']:
+            log_update(f"😴 Mots-clés au repos (aucun ajout récent): {len(schedule_plan['resting'])}")
+        
+        # Puis garder les plus rentables qui tiennent dans le budget de quota restant
+        plan = quota.plan_run(schedule_plan['keywords'])
+        keywords_to_run = plan['keywords']
+        log_update(
+            f"💰 Budget quota: {plan['budget']} unités | ~{plan['cost_per_keyword']} par mot-clé | "
+            f"{len(keywords_to_run)}/{len(KEYWORDS_LIST)} mots-clés planifiés"
+        )
+        if plan['deferred']:
+            log_update(f"⏸️ Mots-clés reportés faute de quota: {len(plan['deferred'])}")
+        
+        total_added = queue['added'] + channel_totals['added']
+        total_skipped = channel_totals['skipped']
+        total_errors = channel_totals['errors']
         skipped_details = []
+        quota_stopped = stop_event.is_set() and not aborted()
         
-        for idx, keywords in enumerate(KEYWORDS_LIST, 1):
-            log_update(f"\n[{idx}/{len(KEYWORDS_LIST)}] 🔍 Recherche: '{keywords}'")
-            
-            try:
-                result = search_and_add_videos_with_api(
-                    youtube,
-                    PLAYLIST_ID,
-                    keywords,
-                    max_results=50  # 50 résultats par requête
+        total = len(keywords_to_run)
+        
+        def worker(job):
+            idx, keywords = job
+            if aborted():
+                stop_event.set()
+                return None
+            # Chaque thread du crawler a son propre client; le quota consommé par ce thread
+            # est attribué au mot-clé (et ses événements de suivi en direct aussi)
+            with quota.track_usage() as usage, events.context(run_id=run_id, keyword=keywords):
+                outcome = process_keyword(
+                    get_youtube_client(), idx, total, keywords,
+                    max_pages=schedule_plan['max_pages'].get(keywords),
+                    seen=seen,
+                    run_id=run_id
                 )
+            keyword_stats.record_run(
+                keywords,
+                outcome['result'],
+                usage['units'],
+                full_scan=outcome['full_scan'],
+                interrupted=outcome['quota_exceeded'],
+                run_id=run_id
+            )
+            result = outcome['result'] or {'errors': 1}
+            for name in ('added', 'skipped', 'too_short', 'off_topic', 'near_duplicates', 'queued', 'errors', 'already_seen'):
+                if result.get(name):
+                    metrics.keyword_videos.inc(keywords, name, amount=result[name])
+            if outcome['quota_exceeded']:
+                # Les mots-clés pas encore démarrés sont abandonnés
+                stop_event.set()
+            return outcome
+        
+        # Mots-clés traités en parallèle (concurrence bornée, débit limité)
+        outcomes = run_crawl(list(enumerate(keywords_to_run, 1)), worker, stop_event=stop_event)
+        
+        for outcome in outcomes:
+            if outcome is None:
+                continue  # Sauté après épuisement du quota ou perte du bail
+            if isinstance(outcome, Exception):
+                total_errors += 1
+                continue
+            
+            result = outcome['result']
+            if outcome['quota_exceeded']:
+                quota_stopped = True
+            
+            if result:
+                added = result.get('added', 0)
+                skipped = result.get('skipped', 0)
+                errors = result.get('errors', 0)
                 
-                if result:
-                    added = result.get('added', 0)
-                    skipped = result.get('skipped', 0)
-                    errors = result.get('errors', 0)
-                    
-                    total_added += added
-                    total_skipped += skipped
-                    total_errors += errors
-                    
-                    status = "✅" if added > 0 else "⏭️"
-                    log_update(f"  {status} Ajoutées: {added} | ⏭️ Doublons: {skipped} | ❌ Erreurs: {errors}")
-                    
-                    if skipped > 0:
-                        skipped_details.append(f"  • {keywords}: {skipped} doublons")
-                else:
-                    log_update(f"  ⚠️ Erreur lors de la recherche")
-                    total_errors += 1
-                
-                # Petit délai pour ne pas surcharger l'API
-                time.sleep(1)
+                total_added += added
+                total_skipped += skipped
+                total_errors += errors
                 
-            except Exception as e:
-                log_update(f"  ❌ Erreur critique: {str(e)}")
+                if skipped > 0:
+                    skipped_details.append(f"  • {outcome['keywords']}: {skipped} doublons")
+            elif not outcome['quota_exceeded']:
                 total_errors += 1
         
+        # Vues, likes, durées des vidéos du catalogue (tris de /api/videos): avec le quota restant
+        enriched = {'enriched': 0, 'missing': 0, 'batches': 0, 'stale': 0}
+        if not quota_stopped and not aborted():
+            try:
+                enriched = enrichment.enrich_catalog(youtube)
+            except QuotaExceededError:
+                quota_stopped = True
+            except Exception as e:
+                log_update(f"⚠️ Enrichissement du catalogue impossible: {str(e)}")
+            log_update(
+                f"📈 Métadonnées: {enriched['enriched']} vidéos relevées "
+                f"({enriched['batches']} unités, {enriched['missing']} introuvables)",
+                event='enrichment',
+                run_id=run_id,
+                **enriched
+            )
+        
+        # Playlist rangée selon PLAYLIST_ORDER: déplacements minimaux, dans la limite du quota
+        reordered = {'applied': 0, 'remaining': 0}
+        if reorder.PLAYLIST_ORDER and not quota_stopped and not aborted():
+            try:
+                reordered = reorder.reorder_playlist(youtube, PLAYLIST_ID)
+                log_update(
+                    f"🔀 Rangement ({reordered['sort']}): {reordered['applied']} déplacements | "
+                    f"reste {reordered['remaining']}",
+                    event='reorder',
+                    run_id=run_id,
+                    **reordered
+                )
+            except QuotaExceededError:
+                quota_stopped = True
+            except Exception as e:
+                log_update(f"⚠️ Rangement de la playlist impossible: {str(e)}")
+        
         # Résumé final
         log_update("\n" + "=" * 70)
         log_update("📊 RÉSUMÉ DE LA MISE À JOUR")
         log_update("=" * 70)
-        log_update(f"✅ Total vidéos ajoutées: {total_added}")
+        log_update(f"✅ Total vidéos ajoutées: {total_added} (dont {channel_totals['added']} via les chaînes suivies)")
         log_update(f"⏭️ Total doublons détectés: {total_skipped}")
         if skipped_details:
             log_update(f"\n📌 Détails des doublons:")
@@ -167,49 +433,71 @@ def automatic_update():
                 log_update(f"  ... et {len(skipped_details) - 10} autres")
         
         log_update(f"❌ Total erreurs: {total_errors}")
+        
+        # Efficacité des caches sur ce passage
+        cache_after = search_cache.get_stats()
+        cache_hits = cache_after['hits'] - cache_before['hits']
+        cache_lookups = cache_hits + cache_after['misses'] - cache_before['misses']
+        seen_stats = seen.get_stats()
+        log_update(
+            f"🗃️ Cache recherche: {cache_hits}/{cache_lookups} réponses réutilisées "
+            f"({_rate(cache_hits, cache_lookups)})"
+        )
+        log_update(
+            f"🔁 Vidéos déjà vues ce passage: {seen_stats['duplicates']}/{seen_stats['checked']} "
+            f"({_rate(seen_stats['duplicates'], seen_stats['checked'])})"
+        )
+        budget = quota.get_budget()
+        log_update(f"💰 Quota utilisé aujourd'hui: {budget['used']}/{budget['daily_quota']} unités")
+        lease_lost = aborted()
+        if lease_lost:
+            log_update("🛑 Mise à jour interrompue: bail perdu (reprise par un autre process)")
+        elif quota_stopped:
+            log_update("🛑 Mise à jour interrompue: quota épuisé")
         log_update(f"✨ Mise à jour terminée à {datetime.now().strftime('%H:%M:%S')}")
         log_update("=" * 70 + "\n")
         
+        status = 'aborted' if lease_lost else 'quota_exceeded' if quota_stopped else 'ok'
+        metrics.update_run_seconds.observe(time.perf_counter() - started, status)
+        
         # Retourner les stats
-        return {
+        stats = {
+            'run_id': run_id,
             'added': total_added,
             'skipped': total_skipped,
             'errors': total_errors,
+            'quota_exceeded': quota_stopped,
+            'aborted': lease_lost,
+            'deferred': len(plan['deferred']),
+            'resting': len(schedule_plan['resting']),
+            'channels_polled': channel_totals['polled'],
+            'channel_added': channel_totals['added'],
+            'channel_units': channel_totals['units'],
+            'queue_added': queue['added'],
+            'queue_remaining': queue['remaining'],
+            'enriched': enriched['enriched'],
+            'reordered': reordered['applied'],
+            'search_cache_hits': cache_hits,
+            'search_cache_lookups': cache_lookups,
+            'already_seen': seen_stats['duplicates'],
             'timestamp': datetime.now().isoformat()
         }
+        runs.finish_run(run_id, status, stats, quota_used=budget['used'])
+        run_log.log_event('run_finished', status=status, **stats)
+        return stats
         
     except Exception as e:
         log_update(f"❌ ERREUR CRITIQUE DANS LA MISE À JOUR: {str(e)}")
         import traceback
-        log_update(traceback.format_exc())
+        log_update(traceback.format_exc(), event='run_failed', run_id=run_id, error=str(e))
+        metrics.update_run_seconds.observe(time.perf_counter() - started, 'error')
+        if run_id is not None:
+            try:
+                from . import runs
+                runs.finish_run(run_id, 'error', error=str(e))
+            except Exception:
+                pass
         return None
-
-def start_scheduler():
-    """
-    Démarre le scheduler qui exécute les mises à jour toutes les 3 heures
-    Utilisé EN LOCAL uniquement
-    """
-    log_update("🚀 Scheduler démarré - Mises à jour toutes les 3 heures")
-    
-    # Programmer la mise à jour toutes les 3 heures
-    schedule.every(3).hours.do(automatic_update)
-    
-    # Exécuter une fois au démarrage
-    automatic_update()
-    
-    # Boucle infinie du scheduler
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Vérifier toutes les minutes
-
-def start_scheduler_background():
-    """
-    Lance le scheduler en arrière-plan (pour déploiement local)
-    Utilisé EN LOCAL uniquement
-    """
-    import threading
-    
-    scheduler_thread = threading.Thread(target=start_scheduler, daemon=True)
-    scheduler_thread.start()
     
-    log_update("🔄 Scheduler lancé en arrière-plan (mise à jour toutes les 3 heures)")
\ No newline at end of file
+    finally:
+        run_log.flush()
@@ -0,0 +1,666 @@
+import base64
+import json
+import threading
+from datetime import datetime, timezone
+
+from . import quota
+from .db import get_connection, register_column, register_function, register_schema, transaction
+from .textnorm import normalize_text
+
+# Miroir local de la playlist YouTube (lu par /api/videos, tenu à jour par le crawler)
+register_schema("""
+CREATE TABLE IF NOT EXISTS catalog_videos (
+    video_id TEXT PRIMARY KEY,
+    playlist_item_id TEXT,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    channel_id TEXT,
+    channel_title TEXT,
+    description TEXT,
+    thumbnail TEXT,
+    published_at TEXT,
+    added_at TEXT,
+    synced_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_catalog_position ON catalog_videos(position, video_id);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS catalog_removed (
+    video_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+""")
+
+# Version du catalogue à laquelle chaque vidéo a changé pour la dernière fois (requêtes delta)
+register_column('catalog_videos', 'version', 'INTEGER NOT NULL DEFAULT 0')
+register_schema("CREATE INDEX IF NOT EXISTS idx_catalog_version ON catalog_videos(version);")
+register_schema("CREATE INDEX IF NOT EXISTS idx_catalog_channel ON catalog_videos(channel_id);")
+
+# Playlist YouTube (shard) qui contient la vidéo; NULL: PLAYLIST_ID (catalogue d'avant les shards)
+register_column('catalog_videos', 'playlist_id', 'TEXT')
+register_schema("CREATE INDEX IF NOT EXISTS idx_catalog_playlist ON catalog_videos(playlist_id);")
+
+# Métadonnées YouTube (statistics, contentDetails, snippet) remplies par enrichment.py
+# view_velocity: vues gagnées par jour (classement « tendances »)
+register_column('catalog_videos', 'view_count', 'INTEGER NOT NULL DEFAULT 0')
+register_column('catalog_videos', 'like_count', 'INTEGER')
+register_column('catalog_videos', 'comment_count', 'INTEGER')
+register_column('catalog_videos', 'duration_seconds', 'INTEGER')
+register_column('catalog_videos', 'category_id', 'TEXT')
+register_column('catalog_videos', 'tags', 'TEXT')
+register_column('catalog_videos', 'thumbnail_high', 'TEXT')
+register_column('catalog_videos', 'view_velocity', 'REAL NOT NULL DEFAULT 0')
+register_column('catalog_videos', 'enriched_at', 'TEXT')
+register_schema("CREATE INDEX IF NOT EXISTS idx_catalog_enriched ON catalog_videos(enriched_at);")
+
+# Version des stats à laquelle les chiffres de la vidéo ont changé (delta des vues, likes...)
+register_column('catalog_videos', 'stats_version', 'INTEGER NOT NULL DEFAULT 0')
+register_schema("CREATE INDEX IF NOT EXISTS idx_catalog_stats_version ON catalog_videos(stats_version);")
+
+# Clés de tri sans NULL (colonnes calculées): la comparaison du curseur reste possible dans l'index
+register_column('catalog_videos', 'published_key', "TEXT GENERATED ALWAYS AS (IFNULL(published_at, '')) VIRTUAL")
+register_column('catalog_videos', 'channel_key', "TEXT GENERATED ALWAYS AS (IFNULL(channel_title, '')) VIRTUAL")
+
+# Tris de /api/videos: colonnes de la clé de tri (dernière: video_id, départage) et sens
+# Chaque tri a son index dans le même ordre: pages lues dans l'index, sans tri à la requête
+SORTS = {
+    'playlist': (['position', 'video_id'], 'ASC'),
+    'views': (['view_count', 'video_id'], 'DESC'),
+    'newest': (['published_key', 'video_id'], 'DESC'),
+    'trending': (['view_velocity', 'video_id'], 'DESC'),
+    'channel': (['channel_key', 'position', 'video_id'], 'ASC'),
+}
+register_schema("""
+CREATE INDEX IF NOT EXISTS idx_catalog_views ON catalog_videos(view_count, video_id);
+CREATE INDEX IF NOT EXISTS idx_catalog_newest ON catalog_videos(published_key, video_id);
+CREATE INDEX IF NOT EXISTS idx_catalog_trending ON catalog_videos(view_velocity, video_id);
+CREATE INDEX IF NOT EXISTS idx_catalog_by_channel ON catalog_videos(channel_key, position, video_id);
+""")
+
+# Index plein texte (titres, chaînes, descriptions normalisés), tenu à jour par triggers
+register_function('rap_normalize', 1, normalize_text)
+register_schema("""
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+    title, channel, description,
+    tokenize = 'unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS catalog_fts_insert AFTER INSERT ON catalog_videos BEGIN
+    INSERT INTO catalog_fts (rowid, title, channel, description) VALUES (
+        new.rowid, rap_normalize(new.title), rap_normalize(new.channel_title),
+        rap_normalize(new.description)
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS catalog_fts_delete AFTER DELETE ON catalog_videos BEGIN
+    DELETE FROM catalog_fts WHERE rowid = old.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS catalog_fts_update
+AFTER UPDATE OF title, channel_title, description ON catalog_videos BEGIN
+    UPDATE catalog_fts SET
+        title = rap_normalize(new.title),
+        channel = rap_normalize(new.channel_title),
+        description = rap_normalize(new.description)
+    WHERE rowid = new.rowid;
+END;
+""")
+
+def rebuild_search_index(conn=None):
+    """Reconstruit l'index plein texte depuis le catalogue"""
+    conn = conn or get_connection()
+    with conn:
+        conn.execute("DELETE FROM catalog_fts")
+        conn.execute("""
+            INSERT INTO catalog_fts (rowid, title, channel, description)
+            SELECT rowid, rap_normalize(title), rap_normalize(channel_title), rap_normalize(description)
+            FROM catalog_videos
+        """)
+
+def _backfill_search_index(conn):
+    # Catalogue créé avant l'index plein texte: l'indexer une fois
+    indexed = conn.execute("SELECT 1 FROM catalog_fts LIMIT 1").fetchone()
+    if not indexed and conn.execute("SELECT 1 FROM catalog_videos LIMIT 1").fetchone():
+        rebuild_search_index(conn)
+
+register_schema(_backfill_search_index)
+
+_bootstrap_lock = threading.Lock()
+
+def _pick_thumbnail(thumbnails):
+    """Choisit la meilleure miniature disponible (les vidéos supprimées n'en ont pas)"""
+    for size in ('default', 'medium', 'high'):
+        if size in thumbnails:
+            return thumbnails[size]['url']
+    return ''
+
+def _row_from_playlist_item(item):
+    """Convertit un playlistItem (snippet + contentDetails) en ligne du catalogue"""
+    snippet = item.get('snippet', {})
+    details = item.get('contentDetails', {})
+    video_id = snippet.get('resourceId', {}).get('videoId') or details.get('videoId')
+
+    if not video_id:
+        return None
+
+    return {
+        'video_id': video_id,
+        'playlist_id': snippet.get('playlistId'),
+        'playlist_item_id': item.get('id'),
+        'position': snippet.get('position'),
+        'title': snippet.get('title', 'Sans titre'),
+        'channel_id': snippet.get('videoOwnerChannelId'),
+        'channel_title': snippet.get('videoOwnerChannelTitle'),
+        'description': snippet.get('description', ''),
+        'thumbnail': _pick_thumbnail(snippet.get('thumbnails', {})),
+        'published_at': details.get('videoPublishedAt'),
+        'added_at': snippet.get('publishedAt'),
+        'synced_at': datetime.now().isoformat()
+    }
+
+def _next_version(conn):
+    """Version suivante du catalogue (à appeler dans une transaction)"""
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+    return (int(row['value']) if row else 0) + 1
+
+def _commit_version(conn, version):
+    conn.execute("""
+        INSERT INTO catalog_meta (key, value) VALUES ('version', ?), ('updated_at', ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (str(version), datetime.now(timezone.utc).isoformat()))
+
+def _next_stats_version(conn):
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'stats_version'").fetchone()
+    return (int(row['value']) if row else 0) + 1
+
+def _commit_stats_version(conn, version):
+    conn.execute("""
+        INSERT INTO catalog_meta (key, value) VALUES ('stats_version', ?), ('stats_updated_at', ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (str(version), datetime.now(timezone.utc).isoformat()))
+
+def upsert_videos(rows):
+    """
+    Insère ou met à jour des lignes du catalogue
+    La version du catalogue n'avance que si une ligne a réellement changé
+    """
+    with transaction() as conn:
+        version = _next_version(conn)
+        before = conn.total_changes
+        conn.executemany("""
+            INSERT INTO catalog_videos (
+                video_id, playlist_id, playlist_item_id, position, title, channel_id, channel_title,
+                description, thumbnail, published_at, added_at, synced_at, version
+            ) VALUES (
+                :video_id, :playlist_id, :playlist_item_id, :position, :title, :channel_id, :channel_title,
+                :description, :thumbnail, :published_at, :added_at, :synced_at, :version
+            )
+            ON CONFLICT(video_id) DO UPDATE SET
+                playlist_id = COALESCE(excluded.playlist_id, playlist_id),
+                playlist_item_id = excluded.playlist_item_id,
+                position = excluded.position,
+                title = excluded.title,
+                channel_id = COALESCE(excluded.channel_id, channel_id),
+                channel_title = COALESCE(excluded.channel_title, channel_title),
+                description = excluded.description,
+                thumbnail = excluded.thumbnail,
+                published_at = COALESCE(excluded.published_at, published_at),
+                added_at = COALESCE(excluded.added_at, added_at),
+                synced_at = excluded.synced_at,
+                version = excluded.version
+            WHERE playlist_item_id IS NOT excluded.playlist_item_id
+                OR playlist_id IS NOT COALESCE(excluded.playlist_id, playlist_id)
+                OR position IS NOT excluded.position
+                OR title IS NOT excluded.title
+                OR channel_title IS NOT COALESCE(excluded.channel_title, channel_title)
+                OR description IS NOT excluded.description
+                OR thumbnail IS NOT excluded.thumbnail
+                OR published_at IS NOT COALESCE(excluded.published_at, published_at)
+        """, [{'playlist_id': None, **row, 'version': version} for row in rows])
+
+        if conn.total_changes > before:
+            # Une vidéo revenue dans la playlist n'est plus marquée comme retirée
+            conn.executemany(
+                "DELETE FROM catalog_removed WHERE video_id = ?",
+                [(row['video_id'],) for row in rows]
+            )
+            _commit_version(conn, version)
+
+def get_meta(key, default=None):
+    row = get_connection().execute(
+        "SELECT value FROM catalog_meta WHERE key = ?", (key,)
+    ).fetchone()
+    return row['value'] if row else default
+
+def set_meta(key, value):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO catalog_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
+
+def _list_playlist(youtube, playlist_id, offset):
+    """Lignes du catalogue d'une playlist, positions décalées de offset (catalogue logique)"""
+    rows = []
+    next_page_token = None
+
+    while True:
+        response = quota.execute(youtube.playlistItems().list(
+            playlistId=playlist_id,
+            part='snippet,contentDetails',
+            maxResults=50,
+            pageToken=next_page_token
+        ))
+
+        for item in response.get('items', []):
+            row = _row_from_playlist_item(item)
+            if row:
+                if row['position'] is None:
+                    row['position'] = len(rows)
+                row['position'] += offset
+                row['playlist_id'] = playlist_id
+                rows.append(row)
+
+        next_page_token = response.get('nextPageToken')
+        if not next_page_token:
+            return rows
+
+def sync_catalog(youtube, playlist_id):
+    """
+    Synchronise le catalogue local avec la playlist YouTube et ses shards
+    - Parcourt toutes les playlists (1 unité de quota par page de 50)
+    - Supprime du catalogue les vidéos retirées des playlists
+    """
+    from . import shards
+
+    rows = []
+    for shard_id, offset in shards.playlists(playlist_id).items():
+        rows.extend(_list_playlist(youtube, shard_id, offset))
+
+    upsert_videos(rows)
+
+    with transaction() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _seen_ids (video_id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM _seen_ids")
+        conn.executemany(
+            "INSERT OR IGNORE INTO _seen_ids (video_id) VALUES (?)",
+            [(row['video_id'],) for row in rows]
+        )
+
+        # Garder une trace des vidéos retirées pour les clients qui demandent un delta
+        version = _next_version(conn)
+        conn.execute("""
+            INSERT INTO catalog_removed (video_id, version)
+            SELECT video_id, ? FROM catalog_videos
+            WHERE video_id NOT IN (SELECT video_id FROM _seen_ids)
+            ON CONFLICT(video_id) DO UPDATE SET version = excluded.version
+        """, (version,))
+        removed = conn.execute(
+            "DELETE FROM catalog_videos WHERE video_id NOT IN (SELECT video_id FROM _seen_ids)"
+        ).rowcount
+        if removed:
+            _commit_version(conn, version)
+
+    set_meta('last_sync', datetime.now().isoformat())
+
+    return {'total': len(rows), 'removed': removed}
+
+def bootstrap_catalog(youtube_factory, playlist_id):
+    """
+    Remplit le catalogue s'il n'a jamais été synchronisé (premier démarrage)
+    youtube_factory n'est appelée que si une synchronisation est nécessaire
+    """
+    if get_meta('last_sync') is not None:
+        return
+
+    with _bootstrap_lock:
+        if get_meta('last_sync') is None:
+            sync_catalog(youtube_factory(), playlist_id)
+
+def record_insert(video_id, insert_response=None, snippet=None, playlist_id=None):
+    """
+    Enregistre dans le catalogue une vidéo qui vient d'être ajoutée à la playlist
+    Utilise la réponse de playlistItems().insert, sinon le snippet de la recherche
+    playlist_id: shard où la vidéo a été ajoutée (sinon lu dans la réponse)
+    """
+    from . import shards
+
+    row = _row_from_playlist_item(insert_response or {})
+
+    if row is None:
+        snippet = snippet or {}
+        row = {
+            'video_id': video_id,
+            'playlist_id': playlist_id,
+            'playlist_item_id': None,
+            'position': None,
+            'title': snippet.get('title', 'Sans titre'),
+            'channel_id': snippet.get('channelId'),
+            'channel_title': snippet.get('channelTitle'),
+            'description': snippet.get('description', ''),
+            'thumbnail': _pick_thumbnail(snippet.get('thumbnails', {})),
+            'published_at': snippet.get('publishedAt'),
+            'added_at': datetime.now().isoformat(),
+            'synced_at': datetime.now().isoformat()
+        }
+    elif row['published_at'] is None and snippet:
+        row['published_at'] = snippet.get('publishedAt')
+    row['playlist_id'] = row['playlist_id'] or playlist_id
+
+    # Position dans le catalogue logique: celle de la playlist, décalée selon le shard
+    offset = shards.offset_of(row['playlist_id']) if row['playlist_id'] else 0
+    if row['position'] is not None:
+        row['position'] += offset
+    else:
+        # Position inconnue: la vidéo est ajoutée en fin de playlist
+        max_position = get_connection().execute(
+            "SELECT MAX(position) AS p FROM catalog_videos WHERE position >= ? AND position < ?",
+            (offset, offset + shards.MAX_PLAYLIST_ITEMS)
+        ).fetchone()['p']
+        row['position'] = offset if max_position is None else max_position + 1
+
+    upsert_videos([row])
+
+def list_stale(recent_after, recent_before, older_before, limit):
+    """
+    Vidéos dont les métadonnées sont absentes ou périmées, jamais enrichies d'abord
+    - recent_after: publiées après cette date, périmées avant recent_before (chiffres qui bougent vite)
+    - les autres: périmées avant older_before
+    """
+    rows = get_connection().execute("""
+        SELECT video_id, published_at, view_count, view_velocity, enriched_at FROM catalog_videos
+        WHERE enriched_at IS NULL
+            OR enriched_at < CASE WHEN published_at >= ? THEN ? ELSE ? END
+        ORDER BY enriched_at IS NOT NULL, enriched_at
+        LIMIT ?
+    """, (recent_after, recent_before, older_before, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def update_metadata(rows):
+    """
+    Enregistre les métadonnées YouTube de vidéos du catalogue (enrichment.py)
+    - Vues, likes, commentaires, vitesse: version des stats seulement (get_stats_version),
+      la version du catalogue ne bouge pas à chaque relevé
+    - Durée, miniature, chaîne ou date complétées: nouvelle version du catalogue
+    """
+    with transaction() as conn:
+        stats_version = _next_stats_version(conn)
+        before = conn.total_changes
+        conn.executemany("""
+            UPDATE catalog_videos SET
+                view_count = :view_count,
+                like_count = :like_count,
+                comment_count = :comment_count,
+                view_velocity = :view_velocity,
+                stats_version = :stats_version
+            WHERE video_id = :video_id AND (
+                view_count IS NOT :view_count
+                OR like_count IS NOT :like_count
+                OR comment_count IS NOT :comment_count
+                OR view_velocity IS NOT :view_velocity
+            )
+        """, [{**row, 'stats_version': stats_version} for row in rows])
+        if conn.total_changes > before:
+            _commit_stats_version(conn, stats_version)
+
+        version = _next_version(conn)
+        conn.executemany("""
+            UPDATE catalog_videos SET
+                version = CASE WHEN duration_seconds IS NOT :duration_seconds
+                    OR thumbnail_high IS NOT :thumbnail_high
+                    OR (channel_id IS NULL AND :channel_id IS NOT NULL)
+                    OR (published_at IS NULL AND :published_at IS NOT NULL)
+                    THEN :version ELSE version END,
+                duration_seconds = :duration_seconds,
+                category_id = :category_id,
+                tags = :tags,
+                thumbnail_high = :thumbnail_high,
+                channel_id = COALESCE(channel_id, :channel_id),
+                published_at = COALESCE(published_at, :published_at),
+                enriched_at = :enriched_at
+            WHERE video_id = :video_id
+        """, [{**row, 'version': version} for row in rows])
+        if conn.execute("SELECT 1 FROM catalog_videos WHERE version = ? LIMIT 1", (version,)).fetchone():
+            _commit_version(conn, version)
+
+def mark_enriched(video_ids, enriched_at):
+    """Relevé fait sans résultat (vidéo supprimée ou privée): pas de nouvel essai avant péremption"""
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "UPDATE catalog_videos SET enriched_at = ? WHERE video_id = ?",
+            [(enriched_at, video_id) for video_id in video_ids]
+        )
+
+def list_playlist_order(playlist_id, primary_id, sort='playlist'):
+    """
+    Vidéos d'une playlist (shard) dans l'ordre d'un tri de SORTS
+    (playlist: ordre actuel de la playlist YouTube)
+    """
+    keys, direction = SORTS[sort]
+    rows = get_connection().execute(f"""
+        SELECT video_id, playlist_item_id, position FROM catalog_videos
+        WHERE COALESCE(playlist_id, ?) = ?
+        ORDER BY {', '.join(f"{key} {direction}" for key in keys)}
+    """, (primary_id, playlist_id)).fetchall()
+    return [dict(row) for row in rows]
+
+def set_positions(video_ids, offset=0):
+    """Positions après réordonnancement d'une playlist: offset + rang dans video_ids"""
+    with transaction() as conn:
+        version = _next_version(conn)
+        conn.executemany("""
+            UPDATE catalog_videos SET position = ?, version = ?
+            WHERE video_id = ? AND position IS NOT ?
+        """, [
+            (offset + index, version, video_id, offset + index)
+            for index, video_id in enumerate(video_ids)
+        ])
+        if conn.execute("SELECT 1 FROM catalog_videos WHERE version = ? LIMIT 1", (version,)).fetchone():
+            _commit_version(conn, version)
+
+def encode_cursor(position, video_id):
+    raw = f"{position}:{video_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Décode un curseur opaque -> (position, video_id); ValueError si invalide"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position, video_id = base64.urlsafe_b64decode(padded).decode('utf-8').split(':', 1)
+        return int(position), video_id
+    except Exception:
+        raise ValueError(f"Curseur invalide: {cursor}")
+
+def count_by_channel(channel_ids):
+    """Nombre de vidéos de chaque chaîne dans le catalogue {channel_id: n}"""
+    channel_ids = sorted({channel_id for channel_id in channel_ids if channel_id})
+    if not channel_ids:
+        return {}
+    placeholders = ','.join('?' * len(channel_ids))
+    rows = get_connection().execute(f"""
+        SELECT channel_id, COUNT(*) AS videos FROM catalog_videos
+        WHERE channel_id IN ({placeholders})
+        GROUP BY channel_id
+    """, channel_ids).fetchall()
+    return {row['channel_id']: row['videos'] for row in rows}
+
+def list_channels(min_videos=1):
+    """Chaînes présentes dans le catalogue avec leur nombre de vidéos"""
+    rows = get_connection().execute("""
+        SELECT channel_id, MAX(channel_title) AS title, COUNT(*) AS videos
+        FROM catalog_videos
+        WHERE channel_id IS NOT NULL
+        GROUP BY channel_id
+        HAVING COUNT(*) >= ?
+    """, (min_videos,)).fetchall()
+    return [dict(row) for row in rows]
+
+def count_by_playlist(primary_id):
+    """Nombre de vidéos de chaque playlist (shard) {playlist_id: n}"""
+    rows = get_connection().execute("""
+        SELECT COALESCE(playlist_id, ?) AS playlist_id, COUNT(*) AS videos
+        FROM catalog_videos
+        GROUP BY COALESCE(playlist_id, ?)
+    """, (primary_id, primary_id)).fetchall()
+    return {row['playlist_id']: row['videos'] for row in rows}
+
+def count_videos():
+    return get_connection().execute("SELECT COUNT(*) AS n FROM catalog_videos").fetchone()['n']
+
+def encode_sort_cursor(values):
+    raw = json.dumps(list(values), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_sort_cursor(cursor, size):
+    """Décode le curseur d'un tri -> valeurs de la clé de tri; ValueError si invalide"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Curseur invalide: {cursor}")
+    return values
+
+def _list_sorted(sort, cursor, limit):
+    """Page d'un tri de SORTS, par curseur sur sa clé de tri (lue dans l'index du tri)"""
+    keys, direction = SORTS[sort]
+    columns = ', '.join(keys)
+    order = ', '.join(f"{key} {direction}" for key in keys)
+
+    where = ''
+    params = []
+    if cursor:
+        params = decode_sort_cursor(cursor, len(keys))
+        operator = '>' if direction == 'ASC' else '<'
+        where = f"WHERE ({columns}) {operator} ({', '.join('?' * len(keys))})"
+
+    rows = get_connection().execute(
+        f"SELECT * FROM catalog_videos {where} ORDER BY {order} LIMIT ?",
+        (*params, limit + 1)
+    ).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_sort_cursor(rows[-1][key] for key in keys)
+
+    return [dict(row) for row in rows], next_cursor
+
+def check_cursor(cursor, sort='playlist'):
+    """Valide un curseur de list_videos sans lire le catalogue; ValueError si invalide"""
+    if sort == 'playlist':
+        decode_cursor(cursor)
+    else:
+        decode_sort_cursor(cursor, len(SORTS[sort][0]))
+
+def list_videos(cursor=None, limit=50, sort='playlist'):
+    """
+    Retourne une page du catalogue dans l'ordre de la playlist (ou d'un autre tri de SORTS)
+    Pagination par curseur (position, video_id): stable et sans OFFSET
+    """
+    if sort != 'playlist':
+        return _list_sorted(sort, cursor, limit)
+
+    conn = get_connection()
+
+    if cursor:
+        position, video_id = decode_cursor(cursor)
+        rows = conn.execute("""
+            SELECT * FROM catalog_videos
+            WHERE (position, video_id) > (?, ?)
+            ORDER BY position, video_id
+            LIMIT ?
+        """, (position, video_id, limit + 1)).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT * FROM catalog_videos
+            ORDER BY position, video_id
+            LIMIT ?
+        """, (limit + 1,)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['position'], rows[-1]['video_id'])
+
+    return [dict(row) for row in rows], next_cursor
+
+def iter_videos(batch_size=500, cursor=None):
+    """
+    Parcourt tout le catalogue dans l'ordre de la playlist, par paquets (export en flux)
+    Une requête par paquet: mémoire constante, et chaque paquet peut être lu depuis
+    un thread différent (connexion SQLite du thread courant)
+    """
+    while True:
+        rows, cursor = list_videos(cursor, batch_size)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+def to_api_video(row):
+    """Format renvoyé au frontend"""
+    return {
+        'id': row['video_id'],
+        'title': row['title'],
+        'thumbnail': row['thumbnail'],
+        'thumbnail_high': row['thumbnail_high'],
+        'channel': row['channel_title'],
+        'channel_id': row['channel_id'],
+        'published_at': row['published_at'],
+        'position': row['position'],
+        'playlist_id': row['playlist_id'],
+        'views': row['view_count'] if row['enriched_at'] else None,
+        'likes': row['like_count'],
+        'comments': row['comment_count'],
+        'views_per_day': round(row['view_velocity'], 1) if row['enriched_at'] else None,
+        'duration_seconds': row['duration_seconds'],
+        'url': f"https://www.youtube.com/watch?v={row['video_id']}"
+    }
+
+def get_version():
+    """Version courante du catalogue et date de dernière modification (ETag / Last-Modified)"""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT key, value FROM catalog_meta WHERE key IN ('version', 'updated_at')"
+    ).fetchall()
+    meta = {row['key']: row['value'] for row in rows}
+    updated_at = meta.get('updated_at')
+    return int(meta.get('version', 0)), datetime.fromisoformat(updated_at) if updated_at else None
+
+def get_stats_version():
+    """Version des chiffres YouTube (vues, likes, vitesse) et date du dernier relevé modifié"""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT key, value FROM catalog_meta WHERE key IN ('stats_version', 'stats_updated_at')"
+    ).fetchall()
+    meta = {row['key']: row['value'] for row in rows}
+    updated_at = meta.get('stats_updated_at')
+    return int(meta.get('stats_version', 0)), datetime.fromisoformat(updated_at) if updated_at else None
+
+def list_changes(since_version, since_stats_version=None):
+    """
+    Vidéos modifiées et retirées depuis une version donnée
+    Permet au client de mettre à jour sa copie sans tout retélécharger
+    since_stats_version: ajoute les vidéos dont les chiffres (vues, likes...) ont changé depuis
+    """
+    conn = get_connection()
+    if since_stats_version is None:
+        changed = conn.execute(
+            "SELECT * FROM catalog_videos WHERE version > ? ORDER BY position, video_id",
+            (since_version,)
+        ).fetchall()
+    else:
+        changed = conn.execute("""
+            SELECT * FROM catalog_videos WHERE version > ?
+            UNION
+            SELECT * FROM catalog_videos WHERE stats_version > ?
+            ORDER BY position, video_id
+        """, (since_version, since_stats_version)).fetchall()
+    removed = conn.execute(
+        "SELECT video_id FROM catalog_removed WHERE version > ?", (since_version,)
+    ).fetchall()
+    return [dict(row) for row in changed], [row['video_id'] for row in removed]
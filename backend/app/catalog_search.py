@@ -0,0 +1,38 @@
+from .db import get_connection
+from .textnorm import tokenize
+from . import catalog
+
+# Poids bm25 par colonne: titre > chaîne > description
+_BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+def build_match_query(query):
+    """
+    Requête FTS5 à partir du texte saisi
+    - Mots normalisés comme à l'indexation (accents, y/i, lettres doublées)
+    - Chaque mot est un préfixe ("mal" trouve "malagasy"), tous doivent correspondre
+    """
+    tokens = tokenize(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def search_catalog(query, limit=20):
+    """Recherche plein texte dans le catalogue local (aucun appel YouTube)"""
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    rows = get_connection().execute(f"""
+        SELECT v.*, bm25(catalog_fts, {', '.join(map(str, _BM25_WEIGHTS))}) AS score
+        FROM catalog_fts
+        JOIN catalog_videos v ON v.rowid = catalog_fts.rowid
+        WHERE catalog_fts MATCH ?
+        ORDER BY score, v.position
+        LIMIT ?
+    """, (match, limit)).fetchall()
+
+    results = []
+    for row in rows:
+        video = catalog.to_api_video(row)
+        # bm25 est négatif (plus petit = plus pertinent)
+        video['score'] = round(-row['score'], 4)
+        results.append(video)
+    return results
@@ -0,0 +1,167 @@
+import os
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from . import catalog, quota
+from .db import get_connection, register_schema
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Intervalle minimal entre deux lectures des nouveautés d'une chaîne
+CHANNEL_POLL_INTERVAL = timedelta(hours=int(os.getenv('CHANNEL_POLL_INTERVAL_HOURS', '6')))
+
+# Chaînes interrogées au plus par mise à jour (1 unité chacune)
+CHANNEL_POLL_MAX = int(os.getenv('CHANNEL_POLL_MAX', '100'))
+
+# Vidéos du catalogue à partir desquelles une chaîne est suivie (amorçage depuis la playlist)
+CHANNEL_MIN_VIDEOS = int(os.getenv('CHANNEL_MIN_VIDEOS', '2'))
+
+# Pages de nouveautés lues au plus par chaîne (50 vidéos par page)
+MAX_PAGES = 2
+
+# Chaînes suivies: leur playlist "uploads" coûte 1 unité par page, contre 100 pour une recherche
+register_schema("""
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    title TEXT,
+    uploads_playlist_id TEXT NOT NULL,
+    accepted INTEGER NOT NULL DEFAULT 0,
+    added_from_uploads INTEGER NOT NULL DEFAULT 0,
+    last_published_at TEXT,
+    last_polled_at TEXT,
+    discovered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_channels_polled ON channels(last_polled_at);
+""")
+
+def uploads_playlist_id(channel_id):
+    """Playlist des mises en ligne d'une chaîne: UCxxxx -> UUxxxx (sans appel channels.list)"""
+    if channel_id and channel_id.startswith('UC'):
+        return 'UU' + channel_id[2:]
+    return None
+
+def record_accepted(channel_id, title=None, count=1):
+    """Une vidéo de cette chaîne vient d'être acceptée: la suivre"""
+    uploads = uploads_playlist_id(channel_id)
+    if uploads is None:
+        return
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO channels (channel_id, title, uploads_playlist_id, accepted, discovered_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                title = COALESCE(excluded.title, title),
+                accepted = accepted + excluded.accepted
+        """, (channel_id, title, uploads, count, datetime.now().isoformat()))
+
+def bootstrap_from_catalog():
+    """Suit les chaînes qui ont déjà au moins CHANNEL_MIN_VIDEOS vidéos dans la playlist"""
+    known = {row['channel_id'] for row in get_connection().execute("SELECT channel_id FROM channels")}
+    new_channels = [
+        row for row in catalog.list_channels(CHANNEL_MIN_VIDEOS)
+        if row['channel_id'] not in known and uploads_playlist_id(row['channel_id'])
+    ]
+
+    for row in new_channels:
+        record_accepted(row['channel_id'], row['title'], row['videos'])
+    return len(new_channels)
+
+def channels_to_poll(limit=CHANNEL_POLL_MAX):
+    """Chaînes dues (jamais lues ou lues il y a plus de CHANNEL_POLL_INTERVAL), les plus productives d'abord"""
+    due_before = (datetime.now() - CHANNEL_POLL_INTERVAL).isoformat()
+    rows = get_connection().execute("""
+        SELECT * FROM channels
+        WHERE last_polled_at IS NULL OR last_polled_at <= ?
+        ORDER BY added_from_uploads + accepted DESC, last_polled_at
+        LIMIT ?
+    """, (due_before, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def _to_candidate(item):
+    """playlistItem -> format search().list attendu par add_candidates"""
+    snippet = item.get('snippet', {})
+    details = item.get('contentDetails', {})
+    return {
+        'id': {'kind': 'youtube#video', 'videoId': details.get('videoId')},
+        'snippet': {
+            'title': snippet.get('title', ''),
+            'description': snippet.get('description', ''),
+            # Dans une playlist, channelId est le propriétaire de la playlist: ici la chaîne elle-même
+            'channelId': snippet.get('videoOwnerChannelId') or snippet.get('channelId'),
+            'channelTitle': snippet.get('videoOwnerChannelTitle') or snippet.get('channelTitle'),
+            'publishedAt': details.get('videoPublishedAt') or snippet.get('publishedAt'),
+            'thumbnails': snippet.get('thumbnails', {})
+        }
+    }
+
+def fetch_new_uploads(youtube, channel):
+    """
+    Vidéos publiées par la chaîne depuis la dernière lecture
+    La playlist uploads est triée de la plus récente à la plus ancienne: on s'arrête à la marque
+    """
+    watermark = channel['last_published_at']
+    items = []
+    page_token = None
+
+    for _ in range(MAX_PAGES):
+        response = quota.execute(youtube.playlistItems().list(
+            playlistId=channel['uploads_playlist_id'],
+            part='snippet,contentDetails',
+            maxResults=50,
+            pageToken=page_token
+        ))
+        reached_watermark = False
+        for item in response.get('items', []):
+            candidate = _to_candidate(item)
+            published_at = candidate['snippet']['publishedAt']
+            if watermark and published_at and published_at <= watermark:
+                reached_watermark = True
+                break
+            if candidate['id']['videoId']:
+                items.append(candidate)
+
+        page_token = response.get('nextPageToken')
+        # Première lecture: une page suffit (les plus anciennes sont trouvées par la recherche)
+        if reached_watermark or not page_token or not watermark:
+            break
+
+    return items
+
+def record_poll(channel_id, items, added):
+    """Avance la marque de la chaîne après une lecture complète"""
+    dates = [item['snippet']['publishedAt'] for item in items if item['snippet']['publishedAt']]
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            UPDATE channels SET
+                last_polled_at = ?,
+                last_published_at = NULLIF(MAX(COALESCE(last_published_at, ''), COALESCE(?, '')), ''),
+                added_from_uploads = added_from_uploads + ?
+            WHERE channel_id = ?
+        """, (datetime.now().isoformat(), max(dates) if dates else None, added, channel_id))
+
+def poll_channel(youtube, playlist_id, channel, seen=None):
+    """
+    Lit les nouveautés d'une chaîne suivie et ajoute celles qui passent les filtres
+    Mêmes filtres que la recherche (doublons, pertinence, durée, quasi-doublons)
+    """
+    from .search_api import add_candidates
+
+    items = fetch_new_uploads(youtube, channel)
+    result = add_candidates(youtube, playlist_id, items, channel['title'] or channel['channel_id'], seen)
+
+    # Quota coupé en cours de route: relire la même tranche la prochaine fois
+    if not result['quota_exceeded']:
+        record_poll(channel['channel_id'], items, result['added'])
+    return result
+
+def list_channels(limit=100):
+    """Chaînes suivies, les plus productives d'abord (exposé par /api/channels)"""
+    rows = get_connection().execute("""
+        SELECT * FROM channels
+        ORDER BY added_from_uploads DESC, accepted DESC
+        LIMIT ?
+    """, (limit,)).fetchall()
+    return [dict(row) for row in rows]
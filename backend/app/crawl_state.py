@@ -0,0 +1,153 @@
+import os
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from .db import get_connection, register_column, register_schema
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Re-scan complet (ordre de pertinence, sans date) pour rattraper les vidéos indexées en retard
+FULL_SCAN_INTERVAL = timedelta(days=int(os.getenv('FULL_SCAN_INTERVAL_DAYS', '7')))
+
+# Marge de recouvrement: YouTube indexe parfois une vidéo quelques heures après sa publication
+WATERMARK_OVERLAP = timedelta(hours=6)
+
+# Pages max (50 résultats, 100 unités chacune) lues en mode incrémental
+INCREMENTAL_MAX_PAGES = 3
+
+# Marque de progression par mot-clé
+register_schema("""
+CREATE TABLE IF NOT EXISTS keyword_watermarks (
+    keyword TEXT PRIMARY KEY,
+    last_published_at TEXT,
+    last_run_at TEXT,
+    last_full_scan_at TEXT
+);
+""")
+
+# Tranche jamais lue d'une recherche incrémentale tronquée (les pages arrivent des plus récentes
+# aux plus anciennes): vidéos publiées entre gap_after et gap_before, relues au passage suivant
+register_column('keyword_watermarks', 'gap_after', 'TEXT')
+register_column('keyword_watermarks', 'gap_before', 'TEXT')
+
+def _parse_time(value):
+    """Parse un horodatage RFC 3339 de YouTube ('2025-01-01T00:00:00Z')"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def _format_time(value):
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+def get_watermark(keyword):
+    row = get_connection().execute(
+        "SELECT * FROM keyword_watermarks WHERE keyword = ?", (keyword,)
+    ).fetchone()
+    return dict(row) if row else None
+
+def get_search_window(keyword):
+    """
+    Décide comment chercher un mot-clé
+    - Jamais vu ou re-scan dû: recherche complète (pertinence)
+    - Tranche non lue en attente: rattrapage de cette tranche seulement (triée par date)
+    - Sinon: seulement les vidéos publiées après la marque, triées par date
+    """
+    watermark = get_watermark(keyword)
+    last_published_at = _parse_time(watermark and watermark['last_published_at'])
+    last_full_scan_at = _parse_time(watermark and watermark['last_full_scan_at'])
+
+    if last_published_at is None or last_full_scan_at is None \
+            or _utcnow() - last_full_scan_at >= FULL_SCAN_INTERVAL:
+        return {'full_scan': True, 'published_after': None, 'published_before': None, 'max_pages': 1}
+
+    if watermark['gap_after'] and watermark['gap_before']:
+        return {
+            'full_scan': False,
+            'published_after': watermark['gap_after'],
+            'published_before': watermark['gap_before'],
+            'max_pages': INCREMENTAL_MAX_PAGES
+        }
+
+    return {
+        'full_scan': False,
+        'published_after': _format_time(last_published_at - WATERMARK_OVERLAP),
+        'published_before': None,
+        'max_pages': INCREMENTAL_MAX_PAGES
+    }
+
+def latest_published_at(items):
+    """Date de publication la plus récente parmi des résultats de recherche"""
+    dates = [_parse_time(item.get('snippet', {}).get('publishedAt')) for item in items]
+    dates = [date for date in dates if date]
+    return _format_time(max(dates)) if dates else None
+
+def oldest_published_at(items):
+    """Date de publication la plus ancienne parmi des résultats de recherche"""
+    dates = [_parse_time(item.get('snippet', {}).get('publishedAt')) for item in items]
+    dates = [date for date in dates if date]
+    return _format_time(min(dates)) if dates else None
+
+def record_search(keyword, window, latest=None, truncated=False, oldest=None):
+    """
+    Met à jour la marque après une recherche
+    - La marque avance jusqu'à la vidéo la plus récente vue
+    - Recherche incrémentale tronquée: seules les pages les plus récentes ont été lues;
+      la tranche plus ancienne (marque précédente -> plus ancienne vidéo vue) est gardée
+      comme trou, rattrapé au passage suivant (get_search_window) sans relire les mêmes pages
+    - Rattrapage tronqué: le trou se réduit à la partie encore non lue; complet: il est fermé
+    """
+    watermark = get_watermark(keyword) or {}
+    previous = _parse_time(watermark.get('last_published_at'))
+    latest = _parse_time(latest)
+
+    new_mark = previous
+    if latest:
+        new_mark = max(latest, previous) if previous else latest
+
+    gap_after = watermark.get('gap_after')
+    gap_before = watermark.get('gap_before')
+    if window.get('published_before'):
+        # Rattrapage: pages lues des plus récentes aux plus anciennes à l'intérieur du trou
+        # (tronqué sans rien lire: le trou reste entier)
+        if not truncated:
+            gap_after = gap_before = None
+        elif oldest:
+            gap_before = oldest
+    elif truncated and not window['full_scan'] and oldest:
+        # Un trou déjà en attente est étendu (le rattrapage reprend au plus ancien des deux)
+        gap_after = min(filter(None, [gap_after, window['published_after']]))
+        gap_before = max(filter(None, [gap_before, oldest]))
+
+    now = _format_time(_utcnow())
+    last_full_scan_at = now if window['full_scan'] else watermark.get('last_full_scan_at')
+
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO keyword_watermarks (
+                keyword, last_published_at, last_run_at, last_full_scan_at, gap_after, gap_before
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(keyword) DO UPDATE SET
+                last_published_at = excluded.last_published_at,
+                last_run_at = excluded.last_run_at,
+                last_full_scan_at = excluded.last_full_scan_at,
+                gap_after = excluded.gap_after,
+                gap_before = excluded.gap_before
+        """, (
+            keyword,
+            _format_time(new_mark) if new_mark else None,
+            now,
+            last_full_scan_at,
+            gap_after,
+            gap_before
+        ))
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Nombre de mots-clés traités en parallèle
+CRAWL_CONCURRENCY = int(os.getenv('CRAWL_CONCURRENCY', '4'))
+
+# Threads persistants: leurs clients YouTube (et connexions keep-alive) servent d'une exécution à l'autre
+_executor = ThreadPoolExecutor(max_workers=max(1, CRAWL_CONCURRENCY), thread_name_prefix='crawler')
+
+async def crawl(jobs, worker, concurrency=CRAWL_CONCURRENCY, stop_event=None):
+    """
+    Exécute worker(job) dans des threads, au plus `concurrency` à la fois
+    - La politesse envers l'API est assurée par le limiteur de débit (ratelimit)
+    - Dès que stop_event est levé, les jobs pas encore démarrés sont sautés
+    Retourne les résultats dans l'ordre des jobs (None pour un job sauté)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    stop_event = stop_event or threading.Event()
+
+    async def run(job):
+        async with semaphore:
+            if stop_event.is_set():
+                return None
+            return await asyncio.get_running_loop().run_in_executor(_executor, worker, job)
+
+    return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
+
+def run_crawl(jobs, worker, concurrency=CRAWL_CONCURRENCY, stop_event=None):
+    """Point d'entrée synchrone (scheduler, GitHub Actions)"""
+    return asyncio.run(crawl(jobs, worker, concurrency, stop_event))
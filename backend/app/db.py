@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Base SQLite locale partagée par le backend et le crawler
+DB_PATH = os.getenv('CATALOG_DB', 'data/rapstream.db')
+
+# Schémas et fonctions SQL déclarés par les modules (appliqués à chaque nouvelle connexion)
+_schemas = []
+_functions = []
+_local = threading.local()
+
+def register_function(name, num_params, func):
+    """Déclare une fonction Python utilisable en SQL (index, triggers)"""
+    _functions.append((name, num_params, func))
+
+def register_schema(sql):
+    """Déclare un schéma (CREATE ... IF NOT EXISTS) à appliquer à la base"""
+    _schemas.append(sql)
+
+def register_column(table, column, definition):
+    """Ajoute une colonne à une table existante si elle manque (migration légère)"""
+    def migrate(conn):
+        columns = [row['name'] for row in conn.execute(f"PRAGMA table_xinfo({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    _schemas.append(migrate)
+
+def get_connection():
+    """
+    Retourne la connexion SQLite du thread courant
+    - Une connexion par thread (sqlite3 n'est pas partageable entre threads)
+    - Mode WAL: lectures de l'API non bloquées par les écritures du crawler
+    """
+    conn = getattr(_local, 'conn', None)
+
+    if conn is None:
+        directory = os.path.dirname(DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _local.conn = conn
+        _local.applied = 0
+        _local.functions = 0
+
+    # Les fonctions d'abord: les schémas (triggers) peuvent en dépendre
+    if _local.functions < len(_functions):
+        for name, num_params, func in _functions[_local.functions:]:
+            conn.create_function(name, num_params, func, deterministic=True)
+        _local.functions = len(_functions)
+
+    # Appliquer les schémas enregistrés depuis la dernière fois
+    if _local.applied < len(_schemas):
+        for schema in _schemas[_local.applied:]:
+            if callable(schema):
+                schema(conn)
+            else:
+                conn.executescript(schema)
+        _local.applied = len(_schemas)
+
+    return conn
+
+@contextmanager
+def transaction():
+    """
+    Transaction en écriture exclusive (BEGIN IMMEDIATE)
+    Pour les lectures-puis-écritures qui doivent être atomiques entre threads et process
+    """
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
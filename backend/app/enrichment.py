@@ -0,0 +1,112 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from . import catalog, quota
+from .video_details import BATCH_SIZE, parse_duration
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Fraîcheur des métadonnées: les vidéos récentes (vues qui bougent vite) plus souvent que les autres
+ENRICH_RECENT_DAYS = int(os.getenv('ENRICH_RECENT_DAYS', '30'))
+ENRICH_RECENT_MAX_AGE = timedelta(hours=int(os.getenv('ENRICH_RECENT_MAX_AGE_HOURS', '6')))
+ENRICH_MAX_AGE = timedelta(hours=int(os.getenv('ENRICH_MAX_AGE_HOURS', '72')))
+
+# Vidéos enrichies au plus par mise à jour (1 unité de quota par paquet de 50)
+ENRICH_MAX_VIDEOS = int(os.getenv('ENRICH_MAX_VIDEOS', '2000'))
+
+# Écart minimal entre deux relevés pour recalculer la vitesse (sinon la précédente est gardée)
+MIN_VELOCITY_INTERVAL = timedelta(hours=1)
+
+PARTS = 'snippet,contentDetails,statistics'
+
+def _int(value):
+    return int(value) if value not in (None, '') else None
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def view_velocity(views, previous, published_at, now):
+    """
+    Vues gagnées par jour
+    - Depuis le relevé précédent s'il date d'au moins MIN_VELOCITY_INTERVAL
+    - Sinon (premier relevé) moyenne depuis la publication
+    """
+    previous_at = _parse_date(previous.get('enriched_at'))
+    if previous_at:
+        elapsed = now - previous_at
+        if elapsed < MIN_VELOCITY_INTERVAL:
+            return previous.get('view_velocity') or 0.0
+        return max(0, views - (previous.get('view_count') or 0)) / (elapsed.total_seconds() / 86400)
+
+    published = _parse_date(published_at)
+    days = (now - published).total_seconds() / 86400 if published else 0
+    return views / max(days, 1)
+
+def _metadata(item, previous, now):
+    snippet = item.get('snippet', {})
+    details = item.get('contentDetails', {})
+    statistics = item.get('statistics', {})
+    thumbnails = snippet.get('thumbnails', {})
+    views = _int(statistics.get('viewCount')) or 0
+    best = next((thumbnails[size]['url'] for size in ('maxres', 'high', 'medium') if size in thumbnails), None)
+    return {
+        'video_id': item['id'],
+        'view_count': views,
+        'like_count': _int(statistics.get('likeCount')),
+        'comment_count': _int(statistics.get('commentCount')),
+        'duration_seconds': parse_duration(details.get('duration', '')),
+        'category_id': snippet.get('categoryId'),
+        'tags': json.dumps(snippet['tags'], ensure_ascii=False) if snippet.get('tags') else None,
+        'thumbnail_high': best,
+        'channel_id': snippet.get('channelId'),
+        'published_at': snippet.get('publishedAt'),
+        'view_velocity': view_velocity(views, previous, previous.get('published_at') or snippet.get('publishedAt'), now),
+        'enriched_at': now.isoformat()
+    }
+
+def enrich_catalog(youtube, max_videos=ENRICH_MAX_VIDEOS):
+    """
+    Remplit et rafraîchit les métadonnées des vidéos du catalogue (fin de chaque mise à jour)
+    - Vidéos jamais enrichies d'abord, puis les plus anciennement relevées
+    - Paquets de 50 IDs par videos().list (1 unité par paquet)
+    - Les vidéos supprimées ou privées sont marquées relevées (rien à afficher de plus)
+    Lève QuotaExceededError (ce qui est déjà enregistré est gardé)
+    """
+    now = datetime.now(timezone.utc)
+    stale = catalog.list_stale(
+        (now - timedelta(days=ENRICH_RECENT_DAYS)).isoformat(),
+        (now - ENRICH_RECENT_MAX_AGE).isoformat(),
+        (now - ENRICH_MAX_AGE).isoformat(),
+        max_videos
+    )
+
+    counts = {'enriched': 0, 'missing': 0, 'batches': 0}
+    for start in range(0, len(stale), BATCH_SIZE):
+        batch = {row['video_id']: row for row in stale[start:start + BATCH_SIZE]}
+        response = quota.execute(youtube.videos().list(id=','.join(batch), part=PARTS))
+        counts['batches'] += 1
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            _metadata(item, batch[item['id']], now)
+            for item in response.get('items', []) if item.get('id') in batch
+        ]
+        catalog.update_metadata(rows)
+        counts['enriched'] += len(rows)
+
+        # Absentes de la réponse (supprimées, privées): gardent leurs chiffres jusqu'au relevé suivant
+        missing = batch.keys() - {row['video_id'] for row in rows}
+        catalog.mark_enriched(missing, now.isoformat())
+        counts['missing'] += len(missing)
+
+    counts['stale'] = len(stale)
+    return counts
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Événements gardés en mémoire: un abonné en retard de plus que ça saute les plus anciens
+EVENT_BUFFER_SIZE = 2000
+
+# Champs ajoutés aux événements publiés par le thread courant (run_id, job_id, keyword...)
+_local = threading.local()
+
+class EventBus:
+    """
+    Pub/sub en mémoire du process (crawler, jobs -> flux SSE)
+    - publish() ne bloque jamais: ajout dans un tampon circulaire, sans copie par abonné
+    - Chaque abonné relit le tampon depuis son dernier numéro (reprise via Last-Event-ID)
+    - Identifiants 'epoch-numéro': l'epoch change à chaque démarrage du process, les numéros
+      d'un autre démarrage ne sont pas comparables
+    - Les abonnés en attente sont réveillés une fois par lot d'événements, pas par événement
+    """
+
+    def __init__(self, capacity=EVENT_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=capacity)
+        self._seq = 0
+        self._waiters = []
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def publish(self, event_type, **data):
+        context = getattr(_local, 'context', None)
+        with self._lock:
+            self._seq += 1
+            event = {'seq': self._seq, 'type': event_type, 'ts': datetime.now().isoformat(timespec='seconds')}
+            if context:
+                event.update(context)
+            event.update(data)
+            self._events.append(event)
+            waiters, self._waiters = self._waiters, []
+
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                pass  # Boucle fermée: l'abonné est parti
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def event_id(self, event):
+        """Identifiant SSE d'un événement (renvoyé par EventSource dans Last-Event-ID)"""
+        return f"{self.epoch}-{event['seq']}"
+
+    def resume_point(self, last_event_id=None, since=None):
+        """
+        Numéro après lequel reprendre un abonnement, et True si l'abonné doit repartir de zéro
+        - last_event_id: identifiant 'epoch-numéro' (un numéro seul vaut pour l'epoch courante)
+        - Autre epoch ou numéro en avance: le process a redémarré et le tampon est perdu,
+          reprise depuis le début du nouveau tampon
+        - Ni l'un ni l'autre: seulement les événements à venir
+        """
+        epoch = self.epoch
+        if last_event_id:
+            prefix, _, value = last_event_id.rpartition('-')
+            epoch = prefix or self.epoch
+            since = int(value) if value.isdigit() else None
+
+        if since is None:
+            return self.last_seq, False
+        if epoch != self.epoch or since > self.last_seq:
+            return 0, True
+        return since, False
+
+    def since(self, seq):
+        """Événements après seq, et True si des événements ont été perdus entre-temps"""
+        with self._lock:
+            if not self._events or self._events[-1]['seq'] <= seq:
+                return [], False
+            first = self._events[0]['seq']
+            start = max(0, seq + 1 - first)
+            return [self._events[i] for i in range(start, len(self._events))], seq + 1 < first
+
+    async def wait(self, seq, timeout):
+        """Attend un événement après seq (False au bout de timeout secondes)"""
+        waiter = asyncio.Event()
+        with self._lock:
+            if self._seq > seq:
+                return True
+            self._waiters.append((asyncio.get_running_loop(), waiter))
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._waiters = [entry for entry in self._waiters if entry[1] is not waiter]
+            return False
+
+bus = EventBus()
+
+def publish(event_type, **data):
+    """Publie un événement (champs du contexte du thread inclus)"""
+    bus.publish(event_type, **data)
+
+@contextmanager
+def context(**fields):
+    """Ajoute des champs à tous les événements publiés par ce thread dans le bloc"""
+    previous = getattr(_local, 'context', None)
+    _local.context = {**(previous or {}), **fields}
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+def matches(event, filters):
+    """L'événement correspond-il aux filtres {champ: valeur} de l'abonné ?"""
+    return all(str(event.get(key)) == str(value) for key, value in filters.items())
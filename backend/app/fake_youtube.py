@@ -0,0 +1,450 @@
+import os
+import random
+import string
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from .textnorm import tokenize
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Faux client YouTube Data API v3 (hors ligne): corpus synthétique reproductible
+# Utilisé par YOUTUBE_FAKE=1 (développement) et par scripts/benchmark.py
+FAKE_SEED = int(os.getenv('YOUTUBE_FAKE_SEED', '42'))
+FAKE_VIDEOS = int(os.getenv('YOUTUBE_FAKE_VIDEOS', '3000'))
+FAKE_ERROR_RATE = float(os.getenv('YOUTUBE_FAKE_ERROR_RATE', '0'))
+FAKE_LATENCY_MS = float(os.getenv('YOUTUBE_FAKE_LATENCY_MS', '0'))
+
+# Coûts de l'API réelle (unités par appel)
+COSTS = {
+    'search.list': 100,
+    'videos.list': 1,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'playlistItems.insert': 50,
+    'playlistItems.update': 50,
+    'playlists.insert': 50,
+}
+
+# Résultats max d'une recherche, toutes pages confondues (comme l'API réelle)
+MAX_SEARCH_RESULTS = 500
+
+# Éléments max par playlist (au-delà: 403 playlistContainsMaximumNumberOfVideos)
+MAX_PLAYLIST_ITEMS = 5000
+
+# Date de publication la plus récente du corpus initial
+CORPUS_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+_SYLLABLES = ['ra', 'ko', 'to', 'vo', 'ny', 'fa', 'lo', 'mi', 'ha', 'za', 'ri', 'na', 'be', 'tsi', 'dri']
+_TRACK_WORDS = [
+    'fitia', 'tanora', 'foko', 'tanindrazana', 'fiainana', 'sakaiza', 'namana', 'havana', 'mody',
+    'mandeha', 'mijaly', 'mitady', 'mahery', 'vaovao', 'taloha', 'androany', 'tsara', 'ratsy',
+    'kely', 'hira', 'tononkira', 'tana', 'gasy', 'zaza', 'mpihira', 'fahiny', 'vazo'
+]
+_FORMATS = ['', ' (Clip Officiel)', ' [Official Video]', ' (Audio)', ' (Lyrics)', ' | Freestyle']
+_GENRES = ['rap gasy', 'hip hop malagasy', 'rap malagasy', 'trap malagasy', 'drill malagasy', 'boom bap']
+_CITY_CODES = ['501', '502', '503', '601', '701', '801', '901']
+_OFF_TOPIC_TITLES = [
+    'Rap français - Freestyle de rue', 'Official video hip hop USA', 'Clip officiel rap FR',
+    'Drill UK freestyle', 'Lyrics video pop', 'Live session trap France'
+]
+
+class FakeHttpError(Exception):
+    """Erreur HTTP de l'API (mêmes attributs utiles que googleapiclient.errors.HttpError)"""
+
+    def __init__(self, status, reason):
+        super().__init__(f"<HttpError {status}: {reason}>")
+        self.status_code = status
+        self.reason = reason
+        self.resp = type('Response', (), {'status': status, 'reason': reason})()
+
+class FakeRequest:
+    """Requête différée: exécutée (et comptée) par execute(), comme HttpRequest"""
+
+    def __init__(self, client, method, handler, params):
+        self.methodId = f"youtube.{method}"
+        self._client = client
+        self._method = method
+        self._handler = handler
+        self._params = params
+
+    def execute(self, num_retries=0):
+        return self._client._call(self._method, self._handler, self._params)
+
+class _Resource:
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+
+    def list(self, **params):
+        return FakeRequest(self._client, f"{self._name}.list", getattr(self._client, f"_{self._name}_list"), params)
+
+    def insert(self, **params):
+        return FakeRequest(self._client, f"{self._name}.insert", getattr(self._client, f"_{self._name}_insert"), params)
+
+    def update(self, **params):
+        return FakeRequest(self._client, f"{self._name}.update", getattr(self._client, f"_{self._name}_update"), params)
+
+class FakeYouTube:
+    """
+    Client YouTube en mémoire: search, videos, playlistItems (list/insert/update)
+    - Corpus synthétique reproductible (seed): rap gasy, hors sujet, vidéos courtes, ré-uploads
+    - Quota modélisé (coût par méthode, 403 quotaExceeded au-delà de daily_quota)
+    - Erreurs 5xx et latence injectables
+    - Partagé entre threads (état protégé par un verrou)
+    """
+
+    def __init__(self, seed=FAKE_SEED, videos=FAKE_VIDEOS, playlist_id=None, playlist_size=None,
+                 daily_quota=None, error_rate=FAKE_ERROR_RATE, latency_ms=FAKE_LATENCY_MS,
+                 max_playlist_items=MAX_PLAYLIST_ITEMS):
+        self._lock = threading.Lock()
+        self.max_playlist_items = max_playlist_items
+        self._random = random.Random(seed)
+        self._errors = random.Random(seed + 1)
+        self.daily_quota = daily_quota
+        self.error_rate = error_rate
+        self.latency_ms = latency_ms
+
+        self.corpus = {}
+        self.uploads = {}
+        self.playlist_contents = {}
+        self.reset_stats()
+
+        self._generate(videos)
+
+        # Playlist cible déjà remplie d'une partie du corpus (comme en production)
+        self.playlist_id = playlist_id or os.getenv('PLAYLIST_ID') or 'PLfake'
+        on_topic = [video_id for video_id, video in self.corpus.items() if video['on_topic']]
+        size = len(on_topic) // 10 if playlist_size is None else playlist_size
+        self.playlist_contents[self.playlist_id] = self._random.sample(on_topic, min(size, len(on_topic)))
+
+    # Corpus
+
+    def _new_id(self):
+        return ''.join(self._random.choice(string.ascii_letters + string.digits + '-_') for _ in range(11))
+
+    def _artist_name(self):
+        name = ''.join(self._random.choice(_SYLLABLES) for _ in range(self._random.randint(2, 3)))
+        return self._random.choice(['', 'MC ', 'Mr ', 'Big ']) + name.capitalize()
+
+    def _generate(self, count):
+        channels = [
+            {'id': 'UC' + self._new_id() + self._new_id()[:11], 'title': self._artist_name()}
+            for _ in range(max(1, count // 15))
+        ]
+        for channel in channels:
+            self.uploads[channel['id']] = []
+
+        tracks = []
+        for _ in range(count):
+            published_at = CORPUS_EPOCH - timedelta(minutes=self._random.randint(0, 720 * 24 * 60))
+            self._add_video(channels, tracks, published_at)
+
+    def _add_video(self, channels, tracks, published_at):
+        roll = self._random.random()
+        channel = self._random.choice(channels)
+        duration = self._random.randint(150, 330)
+
+        if roll < 0.15:
+            # Hors sujet (rap d'ailleurs): trouvé par les mêmes recherches
+            title = self._random.choice(_OFF_TOPIC_TITLES) + f" #{self._random.randint(1, 999)}"
+            description = 'Abonnez-vous ! New music every week, rap freestyle'
+            on_topic = False
+        elif roll < 0.25 and tracks:
+            # Autre mise en ligne d'un morceau existant (lyrics, audio)
+            artist, track, duration = self._random.choice(tracks)
+            duration += self._random.randint(-5, 5)
+            title = f"{artist} - {track}{self._random.choice([' (Lyrics)', ' (Audio)', ' [Tononkira]'])}"
+            description = f"{self._random.choice(_GENRES)} {track.lower()}"
+            on_topic = True
+        else:
+            artist = channel['title']
+            track = ' '.join(self._random.sample(_TRACK_WORDS, self._random.randint(1, 3))).capitalize()
+            if self._random.random() < 0.2:
+                artist += f" feat {self._artist_name()}"
+            title = f"{artist} - {track}{self._random.choice(_FORMATS)}"
+            description = f"{self._random.choice(_GENRES)} {' '.join(self._random.sample(_TRACK_WORDS, 4))}"
+            if self._random.random() < 0.3:
+                description += f" rap {self._random.choice(_CITY_CODES)}"
+            tracks.append((artist, track, duration))
+            on_topic = True
+
+        # Extraits, teasers
+        if self._random.random() < 0.15:
+            duration = self._random.randint(20, 110)
+
+        video_id = self._new_id()
+        self.corpus[video_id] = {
+            'id': video_id,
+            'title': title,
+            'description': description,
+            'channel_id': channel['id'],
+            'channel_title': channel['title'],
+            'published_at': published_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'duration': duration,
+            'views': int(self._random.paretovariate(1.2) * 100),
+            'on_topic': on_topic,
+            'tokens': set(tokenize(f"{title} {description}"))
+        }
+        # Mises en ligne d'une chaîne: les plus récentes d'abord
+        self.uploads[channel['id']].append(video_id)
+        self.uploads[channel['id']].sort(key=lambda vid: self.corpus[vid]['published_at'], reverse=True)
+        return video_id
+
+    def publish(self, count):
+        """Publie de nouvelles vidéos datées de maintenant (simule l'activité entre deux mises à jour)"""
+        with self._lock:
+            channels = [
+                {'id': channel_id, 'title': self.corpus[ids[0]]['channel_title'] if ids else 'Nouveau'}
+                for channel_id, ids in self.uploads.items()
+            ]
+            now = datetime.now(timezone.utc)
+            return [
+                self._add_video(channels, [], now - timedelta(seconds=index))
+                for index in range(count)
+            ]
+
+    # Quota, erreurs, latence
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = {}
+            self.units = {}
+            self.errors = 0
+            self.duplicate_inserts = 0
+
+    def stats(self):
+        """Appels et unités consommées depuis le dernier reset_stats"""
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'units_by_method': dict(self.units),
+                'units': sum(self.units.values()),
+                'errors': self.errors,
+                'duplicate_inserts': self.duplicate_inserts,
+                'playlist_size': len(self.playlist_contents.get(self.playlist_id, []))
+            }
+
+    def _call(self, method, handler, params):
+        if self.latency_ms:
+            time.sleep(self._errors.uniform(0.5, 1.5) * self.latency_ms / 1000)
+
+        with self._lock:
+            cost = COSTS.get(method, 1)
+            if self.daily_quota is not None and sum(self.units.values()) + cost > self.daily_quota:
+                raise FakeHttpError(403, 'quotaExceeded')
+
+            # Les requêtes en erreur consomment aussi du quota
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.units[method] = self.units.get(method, 0) + cost
+
+            if self.error_rate and self._errors.random() < self.error_rate:
+                self.errors += 1
+                raise FakeHttpError(self._errors.choice([500, 503]), 'backendError')
+
+            return handler(**params)
+
+    # Endpoints
+
+    def search(self):
+        return _Resource(self, 'search')
+
+    def videos(self):
+        return _Resource(self, 'videos')
+
+    def playlistItems(self):
+        return _Resource(self, 'playlistItems')
+
+    def playlists(self):
+        return _Resource(self, 'playlists')
+
+    def _snippet(self, video):
+        return {
+            'publishedAt': video['published_at'],
+            'channelId': video['channel_id'],
+            'channelTitle': video['channel_title'],
+            'title': video['title'],
+            'description': video['description'],
+            'thumbnails': {
+                'default': {'url': f"https://i.ytimg.com/vi/{video['id']}/default.jpg"},
+                'high': {'url': f"https://i.ytimg.com/vi/{video['id']}/hqdefault.jpg"}
+            }
+        }
+
+    def _page(self, ids, max_results, page_token):
+        start = int(page_token or 0)
+        page = ids[start:start + max_results]
+        next_token = str(start + max_results) if start + max_results < len(ids) else None
+        return page, next_token
+
+    def _search_list(self, q='', part='snippet', maxResults=5, pageToken=None, order='relevance',
+                     publishedAfter=None, publishedBefore=None, **params):
+        query = set(tokenize(q))
+        if not query:
+            raise FakeHttpError(400, 'invalidSearchFilter')
+
+        matches = []
+        for video in self.corpus.values():
+            if publishedAfter and video['published_at'] <= publishedAfter:
+                continue
+            if publishedBefore and video['published_at'] >= publishedBefore:
+                continue
+            score = len(query & video['tokens'])
+            if score * 2 >= len(query):
+                matches.append((score, video))
+
+        if order == 'date':
+            matches.sort(key=lambda match: match[1]['published_at'], reverse=True)
+        else:
+            matches.sort(key=lambda match: (-match[0], -match[1]['views'], match[1]['id']))
+
+        ids = [video['id'] for _, video in matches[:MAX_SEARCH_RESULTS]]
+        page, next_token = self._page(ids, min(maxResults, 50), pageToken)
+
+        response = {
+            'kind': 'youtube#searchListResponse',
+            'pageInfo': {'totalResults': len(matches), 'resultsPerPage': len(page)},
+            'items': [
+                {
+                    'kind': 'youtube#searchResult',
+                    'id': {'kind': 'youtube#video', 'videoId': video_id},
+                    'snippet': self._snippet(self.corpus[video_id])
+                }
+                for video_id in page
+            ]
+        }
+        if next_token:
+            response['nextPageToken'] = next_token
+        return response
+
+    def _videos_list(self, id='', part='snippet', **params):
+        ids = [video_id for video_id in id.split(',') if video_id]
+        if len(ids) > 50:
+            raise FakeHttpError(400, 'tooManyIds')
+
+        items = []
+        for video_id in ids:
+            video = self.corpus.get(video_id)
+            if video is None:
+                continue
+            minutes, seconds = divmod(video['duration'], 60)
+            items.append({
+                'kind': 'youtube#video',
+                'id': video_id,
+                'snippet': self._snippet(video),
+                'contentDetails': {'duration': f"PT{minutes}M{seconds}S", 'definition': 'hd'},
+                'statistics': {'viewCount': str(video['views'])}
+            })
+        return {'kind': 'youtube#videoListResponse', 'items': items}
+
+    def _playlist_item(self, playlist_id, position, video_id):
+        video = self.corpus[video_id]
+        snippet = self._snippet(video)
+        snippet.update({
+            'publishedAt': video['published_at'],
+            'playlistId': playlist_id,
+            'position': position,
+            'resourceId': {'kind': 'youtube#video', 'videoId': video_id},
+            'videoOwnerChannelId': video['channel_id'],
+            'videoOwnerChannelTitle': video['channel_title']
+        })
+        return {
+            'kind': 'youtube#playlistItem',
+            'id': f"PI{playlist_id}{video_id}",
+            'snippet': snippet,
+            'contentDetails': {'videoId': video_id, 'videoPublishedAt': video['published_at']}
+        }
+
+    def _playlist_ids(self, playlist_id):
+        if playlist_id in self.playlist_contents:
+            return self.playlist_contents[playlist_id]
+        # Playlist des mises en ligne d'une chaîne: UUxxxx pour UCxxxx
+        if playlist_id and playlist_id.startswith('UU'):
+            uploads = self.uploads.get('UC' + playlist_id[2:])
+            if uploads is not None:
+                return uploads
+        raise FakeHttpError(404, 'playlistNotFound')
+
+    def _playlistItems_list(self, playlistId=None, part='snippet', maxResults=5, pageToken=None,
+                            videoId=None, **params):
+        ids = self._playlist_ids(playlistId)
+        positions = list(range(len(ids)))
+        if videoId:
+            positions = [position for position in positions if ids[position] == videoId]
+
+        page, next_token = self._page(positions, min(maxResults, 50), pageToken)
+        response = {
+            'kind': 'youtube#playlistItemListResponse',
+            'pageInfo': {'totalResults': len(positions), 'resultsPerPage': len(page)},
+            'items': [self._playlist_item(playlistId, position, ids[position]) for position in page]
+        }
+        if next_token:
+            response['nextPageToken'] = next_token
+        return response
+
+    def _playlistItems_insert(self, part='snippet', body=None, **params):
+        snippet = (body or {}).get('snippet', {})
+        playlist_id = snippet.get('playlistId')
+        video_id = snippet.get('resourceId', {}).get('videoId')
+
+        if playlist_id not in self.playlist_contents:
+            raise FakeHttpError(404, 'playlistNotFound')
+        if video_id not in self.corpus:
+            raise FakeHttpError(404, 'videoNotFound')
+
+        # Comme l'API réelle, un doublon est accepté: compté pour repérer les ajouts non idempotents
+        ids = self.playlist_contents[playlist_id]
+        if len(ids) >= self.max_playlist_items:
+            raise FakeHttpError(403, 'playlistContainsMaximumNumberOfVideos')
+        if video_id in ids:
+            self.duplicate_inserts += 1
+        ids.append(video_id)
+        return self._playlist_item(playlist_id, len(ids) - 1, video_id)
+
+    def _playlistItems_update(self, part='snippet', body=None, **params):
+        snippet = (body or {}).get('snippet', {})
+        playlist_id = snippet.get('playlistId')
+        video_id = snippet.get('resourceId', {}).get('videoId')
+
+        ids = self.playlist_contents.get(playlist_id)
+        if ids is None:
+            raise FakeHttpError(404, 'playlistNotFound')
+        if video_id not in ids or (body or {}).get('id') != f"PI{playlist_id}{video_id}":
+            raise FakeHttpError(404, 'playlistItemNotFound')
+
+        # Déplacement: retiré puis réinséré à la position demandée
+        ids.remove(video_id)
+        position = min(max(0, snippet.get('position', len(ids))), len(ids))
+        ids.insert(position, video_id)
+        return self._playlist_item(playlist_id, position, video_id)
+
+    def _playlists_insert(self, part='snippet', body=None, **params):
+        playlist_id = 'PL' + self._new_id() + self._new_id()[:5]
+        self.playlist_contents[playlist_id] = []
+        return {
+            'kind': 'youtube#playlist',
+            'id': playlist_id,
+            'snippet': (body or {}).get('snippet', {}),
+            'status': (body or {}).get('status', {})
+        }
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_fake_client():
+    """Client factice partagé par tout le process (même corpus et même playlist pour tous les threads)"""
+    global _shared
+
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = FakeYouTube()
+    return _shared
+
+def install(client):
+    """Remplace le client partagé (benchmarks: corpus et erreurs choisis par le scénario)"""
+    global _shared
+    _shared = client
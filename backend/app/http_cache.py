@@ -0,0 +1,50 @@
+from email.utils import format_datetime, parsedate_to_datetime
+
+# Le navigateur garde la réponse mais revalide à chaque fois (304 si rien n'a changé)
+CACHE_CONTROL = 'public, no-cache'
+
+def catalog_headers(version, updated_at, stats=None):
+    """
+    En-têtes de cache dérivés de la version du catalogue
+    stats: (version, date) des chiffres YouTube, pour les réponses qui les contiennent
+    """
+    tag = f"catalog-{version}"
+    if stats:
+        stats_version, stats_updated_at = stats
+        tag += f"-stats-{stats_version}"
+        if stats_updated_at and (updated_at is None or stats_updated_at > updated_at):
+            updated_at = stats_updated_at
+
+    headers = {
+        'ETag': f'W/"{tag}"',
+        'Cache-Control': CACHE_CONTROL
+    }
+    if updated_at:
+        # HTTP-date à la seconde: If-Modified-Since renvoie cette valeur tronquée
+        headers['Last-Modified'] = format_datetime(updated_at.replace(microsecond=0), usegmt=True)
+    return headers
+
+def _strip_weak(tag):
+    return tag[2:] if tag.startswith('W/') else tag
+
+def is_not_modified(request, headers):
+    """
+    Vrai si la copie du client est à jour
+    If-None-Match est prioritaire sur If-Modified-Since (RFC 9110)
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        etag = _strip_weak(headers['ETag'])
+        tags = [_strip_weak(tag.strip()) for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    last_modified = headers.get('Last-Modified')
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(microsecond=0)
+            return since >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+
+    return False
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from . import channels, events, membership, near_duplicates, quota, run_log, shards
+from .db import get_connection, register_schema
+from .quota import QuotaExceededError
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Délai avant de réessayer un ajout échoué (doublé à chaque échec, plafonné)
+INSERT_RETRY_BASE = timedelta(minutes=int(os.getenv('INSERT_RETRY_BASE_MINUTES', '5')))
+INSERT_RETRY_MAX = timedelta(hours=int(os.getenv('INSERT_RETRY_MAX_HOURS', '24')))
+
+# Refus définitifs de l'API (vidéo supprimée, privée...) avant d'abandonner une vidéo
+MAX_REJECTIONS = 5
+
+# Erreurs HTTP qui ne se règlent pas en réessayant (le 403 quotaExceeded est traité à part)
+PERMANENT_STATUSES = {400, 403, 404}
+
+# Playlist pleine (limite YouTube): réessayer tout de suite dans un autre shard
+PLAYLIST_FULL_REASON = 'playlistContainsMaximumNumberOfVideos'
+
+# Ajout commencé depuis plus longtemps sans résultat: le process a été interrompu
+IN_DOUBT_AFTER = timedelta(minutes=10)
+
+# Ajouts réessayés au plus par mise à jour
+DRAIN_BATCH = 200
+
+# Résultat de try_insert -> statut des événements 'video' (mêmes statuts que la recherche)
+DRAIN_EVENTS = {'added': 'inserted', 'present': 'duplicate', 'retry': 'queued', 'failed': 'error', 'queued': 'queued'}
+
+# File persistante des vidéos acceptées: écrite avant l'appel API, vidée par try_insert/drain
+# status: pending, inserting (appel en cours), done, present (déjà dans la playlist), failed
+register_schema("""
+CREATE TABLE IF NOT EXISTS pending_inserts (
+    video_id TEXT PRIMARY KEY,
+    playlist_id TEXT NOT NULL,
+    snippet TEXT NOT NULL,
+    duration_seconds INTEGER,
+    source TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    rejections INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT NOT NULL,
+    claimed_at TEXT,
+    last_error TEXT,
+    enqueued_at TEXT NOT NULL,
+    done_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pending_inserts_due ON pending_inserts(status, next_attempt_at);
+""")
+
+# Les ajouts simultanés dans une même playlist échouent côté YouTube: on les sérialise
+insert_lock = threading.Lock()
+
+def enqueue(playlist_id, video_id, snippet, duration=None, source=None, retry_failed=False):
+    """
+    Inscrit une vidéo acceptée dans la file (avant tout appel API)
+    Une vidéo déjà en file n'est pas dupliquée; une vidéo ajoutée puis retirée de la playlist
+    redevient en attente
+    retry_failed: une vidéo abandonnée (failed) repart aussi de zéro (ajout demandé explicitement)
+    """
+    now = datetime.now().isoformat()
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO pending_inserts (
+                video_id, playlist_id, snippet, duration_seconds, source, next_attempt_at, enqueued_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                status = 'pending',
+                attempts = 0,
+                rejections = 0,
+                snippet = excluded.snippet,
+                source = excluded.source,
+                next_attempt_at = excluded.next_attempt_at,
+                done_at = NULL
+            WHERE status IN ('done', 'present') OR (? AND status = 'failed')
+        """, (
+            video_id,
+            playlist_id,
+            json.dumps(snippet or {}, ensure_ascii=False),
+            duration,
+            source,
+            now,
+            now,
+            retry_failed
+        ))
+
+def _claim(video_id):
+    """Réserve une entrée due (une seule tentative à la fois, même entre process)"""
+    now = datetime.now().isoformat()
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute("""
+            UPDATE pending_inserts SET status = 'inserting', claimed_at = ?, attempts = attempts + 1
+            WHERE video_id = ? AND status = 'pending' AND next_attempt_at <= ?
+        """, (now, video_id, now))
+    if cursor.rowcount == 0:
+        return None
+    return conn.execute("SELECT * FROM pending_inserts WHERE video_id = ?", (video_id,)).fetchone()
+
+def _set_status(video_id, status, error=None):
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            UPDATE pending_inserts SET status = ?, claimed_at = NULL, last_error = COALESCE(?, last_error),
+                done_at = CASE WHEN ? IN ('done', 'present', 'failed') THEN ? ELSE done_at END
+            WHERE video_id = ?
+        """, (status, error, status, datetime.now().isoformat(), video_id))
+
+def _set_target(video_id, playlist_id):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE pending_inserts SET playlist_id = ? WHERE video_id = ?", (playlist_id, video_id)
+        )
+
+def _release(video_id, error):
+    """La tentative ne compte pas (quota épuisé, playlist pleine): l'entrée repart telle quelle"""
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            UPDATE pending_inserts SET status = 'pending', claimed_at = NULL, attempts = attempts - 1,
+                last_error = ?
+            WHERE video_id = ?
+        """, (error, video_id))
+
+def _schedule_retry(entry, error):
+    """Échec: nouvel essai après un délai exponentiel, abandon après MAX_REJECTIONS refus définitifs"""
+    status_code = getattr(getattr(error, 'resp', None), 'status', None)
+    rejections = entry['rejections'] + (1 if status_code in PERMANENT_STATUSES else 0)
+    if rejections >= MAX_REJECTIONS:
+        _set_status(entry['video_id'], 'failed', str(error))
+        return 'failed'
+
+    delay = min(INSERT_RETRY_MAX, INSERT_RETRY_BASE * 2 ** min(entry['attempts'] - 1, 16))
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            UPDATE pending_inserts SET status = 'pending', claimed_at = NULL, rejections = ?,
+                next_attempt_at = ?, last_error = ?
+            WHERE video_id = ?
+        """, (rejections, (datetime.now() + delay).isoformat(), str(error), entry['video_id']))
+    return 'retry'
+
+def try_insert(youtube, video_id, index=None):
+    """
+    Tente l'ajout d'une vidéo de la file
+    Retourne 'added', 'present' (déjà dans la playlist), 'retry' (réessayée plus tard),
+    'failed' (abandonnée) ou 'queued' (pas due ou déjà en cours ailleurs)
+    Lève QuotaExceededError sans consommer de tentative
+    """
+    entry = _claim(video_id)
+    if entry is None:
+        row = get_connection().execute(
+            "SELECT status FROM pending_inserts WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        return 'failed' if row and row['status'] == 'failed' else 'queued'
+
+    index = index or membership.get_index()
+    snippet = json.loads(entry['snippet'])
+    target = entry['playlist_id']
+
+    try:
+        with insert_lock:
+            # Idempotence: déjà dans la playlist (synchro, autre process, essai précédent abouti)
+            if index.contains(video_id):
+                _set_status(video_id, 'present')
+                return 'present'
+
+            # Shard de destination, gardé pour les essais suivants (et la vérification après arrêt)
+            target = shards.route(youtube, target, snippet)
+            if target != entry['playlist_id']:
+                _set_target(video_id, target)
+
+            insert_response = quota.execute(youtube.playlistItems().insert(
+                part='snippet',
+                body={
+                    'snippet': {
+                        'playlistId': target,
+                        'resourceId': {
+                            'kind': 'youtube#video',
+                            'videoId': video_id
+                        }
+                    }
+                }
+            ))
+
+            # Ajout fait: la suite (catalogue, index) ne doit plus mener à un nouvel essai
+            _record_added(index, video_id, insert_response, snippet, target, entry['duration_seconds'])
+    except QuotaExceededError as e:
+        _release(video_id, str(e))
+        raise
+    except Exception as e:
+        if 'duplicate' in str(e).lower():
+            _set_status(video_id, 'present')
+            return 'present'
+        if PLAYLIST_FULL_REASON in str(e):
+            shards.mark_full(target)
+            _release(video_id, str(e))
+            return 'retry'
+        print(f"DEBUG: Ajout de {video_id} reporté: {str(e)}")
+        return _schedule_retry(entry, e)
+
+    return 'added'
+
+def _record_added(index, video_id, insert_response, snippet, playlist_id, duration):
+    """
+    Suites d'un ajout accepté par YouTube, hors du chemin de réessai: YouTube accepte les doublons,
+    un nouvel insert après une erreur SQLite ajouterait la vidéo deux fois
+    Entrée laissée 'inserting' si l'écriture échoue: recover_in_doubt vérifie la playlist
+    """
+    try:
+        _set_status(video_id, 'done')
+
+        # Tenir l'index et le catalogue à jour sans attendre la prochaine synchro
+        index.mark_added(video_id, insert_response, snippet, playlist_id)
+
+        if near_duplicates.NEAR_DUP_MODE != 'off':
+            near_duplicates.add_video(video_id, snippet.get('title', ''), duration)
+
+        # Chaîne productive: ses prochaines vidéos seront lues dans ses mises en ligne
+        channels.record_accepted(snippet.get('channelId'), snippet.get('channelTitle'))
+    except Exception as e:
+        run_log.log_event(
+            'insert_bookkeeping_failed',
+            f"Vidéo {video_id} ajoutée mais non enregistrée: {str(e)}",
+            level=logging.ERROR,
+            video_id=video_id,
+            playlist_id=playlist_id
+        )
+
+def recover_in_doubt(youtube, index=None):
+    """
+    Entrées restées 'inserting' après un arrêt brutal: l'ajout a-t-il eu lieu ?
+    Vérifié dans l'index, sinon auprès de la playlist (1 unité), avant de réessayer
+    """
+    stale_before = (datetime.now() - IN_DOUBT_AFTER).isoformat()
+    rows = get_connection().execute("""
+        SELECT * FROM pending_inserts WHERE status = 'inserting' AND claimed_at <= ?
+    """, (stale_before,)).fetchall()
+
+    index = index or membership.get_index()
+    for entry in rows:
+        video_id = entry['video_id']
+        if not index.contains(video_id):
+            response = quota.execute(youtube.playlistItems().list(
+                playlistId=entry['playlist_id'],
+                videoId=video_id,
+                part='snippet',
+                maxResults=1
+            ))
+            items = response.get('items', [])
+            if not items:
+                _release(video_id, "Ajout interrompu")
+                continue
+            index.mark_added(video_id, items[0], json.loads(entry['snippet']), entry['playlist_id'])
+        _set_status(video_id, 'done')
+
+    return len(rows)
+
+def drain(youtube, limit=DRAIN_BATCH):
+    """
+    Réessaie les ajouts en attente dont le délai est écoulé (début de chaque mise à jour)
+    S'arrête au premier quota épuisé: la suite repart après la remise à zéro
+    """
+    counts = {'added': 0, 'present': 0, 'retry': 0, 'failed': 0, 'queued': 0, 'quota_exceeded': False}
+    index = membership.get_index()
+
+    try:
+        recover_in_doubt(youtube, index)
+
+        rows = get_connection().execute("""
+            SELECT video_id FROM pending_inserts
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at
+            LIMIT ?
+        """, (datetime.now().isoformat(), limit)).fetchall()
+
+        for row in rows:
+            outcome = try_insert(youtube, row['video_id'], index)
+            counts[outcome] += 1
+            events.publish('video', video_id=row['video_id'], source='insert_queue', status=DRAIN_EVENTS[outcome])
+    except QuotaExceededError:
+        counts['quota_exceeded'] = True
+
+    counts['remaining'] = get_stats()['pending']
+    return counts
+
+def get_stats():
+    """Nombre d'entrées par état et plus ancienne vidéo en attente"""
+    conn = get_connection()
+    stats = {status: 0 for status in ('pending', 'inserting', 'done', 'present', 'failed')}
+    for row in conn.execute("SELECT status, COUNT(*) AS n FROM pending_inserts GROUP BY status"):
+        stats[row['status']] = row['n']
+    stats['oldest_pending'] = conn.execute(
+        "SELECT MIN(enqueued_at) AS t FROM pending_inserts WHERE status IN ('pending', 'inserting')"
+    ).fetchone()['t']
+    return stats
+
+def list_entries(status=None, limit=50):
+    """Entrées de la file, les plus récentes d'abord (exposé par /api/inserts)"""
+    conn = get_connection()
+    if status:
+        rows = conn.execute(
+            "SELECT * FROM pending_inserts WHERE status = ? ORDER BY enqueued_at DESC LIMIT ?",
+            (status, limit)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM pending_inserts ORDER BY enqueued_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    entries = []
+    for row in rows:
+        entry = dict(row)
+        snippet = json.loads(entry.pop('snippet'))
+        entry['title'] = snippet.get('title')
+        entry['channel'] = snippet.get('channelTitle')
+        entries.append(entry)
+    return entries
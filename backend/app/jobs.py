@@ -0,0 +1,139 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from . import events
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Recherches manuelles exécutées en même temps (les autres attendent leur tour)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+
+# Jobs en attente ou en cours au-delà desquels on refuse d'en créer d'autres
+MAX_PENDING_JOBS = int(os.getenv('MAX_PENDING_JOBS', '20'))
+
+# Durée de conservation d'un job terminé (pour le polling du frontend)
+JOB_RETENTION = timedelta(hours=1)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+class JobQueueFullError(Exception):
+    """Trop de jobs en attente: réessayer plus tard"""
+    pass
+
+_executor = ThreadPoolExecutor(max_workers=max(1, JOB_WORKERS), thread_name_prefix='jobs')
+_lock = threading.Lock()
+_jobs = {}
+_active_by_key = {}
+
+def _job_key(kind, params):
+    """Deux demandes identiques (mots-clés normalisés, mêmes options) partagent un job"""
+    normalized = {
+        key: ' '.join(value.lower().split()) if isinstance(value, str) else value
+        for key, value in params.items()
+    }
+    return (kind, tuple(sorted(normalized.items())))
+
+def _purge(now):
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job['status'] not in ACTIVE_STATUSES
+        and now - datetime.fromisoformat(job['finished_at']) > JOB_RETENTION
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+def submit(kind, params, func):
+    """
+    Met en file func(params, progress) et retourne (job, coalesced)
+    - Une demande identique déjà en attente ou en cours est rattachée au job existant
+    - progress(stage, done, total): mise à jour de l'avancement par la tâche
+    """
+    key = _job_key(kind, params)
+    now = datetime.now()
+
+    with _lock:
+        _purge(now)
+
+        job_id = _active_by_key.get(key)
+        if job_id is not None:
+            job = _jobs[job_id]
+            job['requests'] += 1
+            return dict(job), True
+
+        active = sum(1 for job in _jobs.values() if job['status'] in ACTIVE_STATUSES)
+        if active >= MAX_PENDING_JOBS:
+            raise JobQueueFullError(f"{active} recherches déjà en attente, réessayer plus tard")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'params': dict(params),
+            'status': 'queued',
+            'progress': {'stage': 'queued', 'done': 0, 'total': 0},
+            'result': None,
+            'error': None,
+            'quota_exceeded': False,
+            'requests': 1,
+            'created_at': now.isoformat(),
+            'started_at': None,
+            'finished_at': None
+        }
+        _jobs[job_id] = job
+        _active_by_key[key] = job_id
+
+    _executor.submit(_run, job_id, key, params, func)
+    return dict(job), False
+
+def _update(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+def _run(job_id, key, params, func):
+    from .quota import QuotaExceededError
+
+    _update(job_id, status='running', started_at=datetime.now().isoformat())
+    events.publish('job', job_id=job_id, kind=key[0], status='running')
+
+    stages = []
+
+    def progress(stage, done=0, total=0):
+        _update(job_id, progress={'stage': stage, 'done': done, 'total': total})
+        # Changement d'étape seulement: l'avancement fin passe par les événements 'video'
+        if stages[-1:] != [stage]:
+            stages.append(stage)
+            events.publish('job', job_id=job_id, kind=key[0], status='running', stage=stage, total=total)
+
+    fields = {}
+    try:
+        # Événements publiés par la tâche (vidéos, recherches) rattachés au job
+        with events.context(job_id=job_id):
+            fields['result'] = func(params, progress)
+        fields['status'] = 'done'
+    except QuotaExceededError as e:
+        fields.update(status='failed', error=str(e), quota_exceeded=True)
+    except Exception as e:
+        fields.update(status='failed', error=str(e))
+
+    with _lock:
+        job = _jobs[job_id]
+        job.update(fields)
+        job['progress'] = dict(job['progress'], stage=job['status'])
+        job['finished_at'] = datetime.now().isoformat()
+        # Les demandes suivantes créent un nouveau job
+        if _active_by_key.get(key) == job_id:
+            del _active_by_key[key]
+
+    # Fin du job: les abonnés peuvent lire le résultat via /api/jobs/{job_id}
+    events.publish('job', job_id=job_id, kind=key[0], status=fields['status'], error=fields.get('error'))
+
+def get_job(job_id):
+    """État d'un job (copie), None si inconnu ou expiré"""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
@@ -0,0 +1,213 @@
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from .db import get_connection, register_column, register_schema
+from .crawl_state import INCREMENTAL_MAX_PAGES
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Période du scheduler / du cron GitHub Actions
+UPDATE_INTERVAL = timedelta(hours=3)
+
+# Attente max d'un mot-clé qui ne rapporte rien (repos doublé à chaque passage vide)
+MAX_BACKOFF = timedelta(hours=int(os.getenv('KEYWORD_MAX_BACKOFF_HOURS', '168')))
+
+# Tolérance sur l'heure de passage (le cron n'est jamais pile à l'heure)
+SCHEDULE_SLACK = timedelta(minutes=30)
+
+# Passages récents pris en compte pour le rendement, et poids d'un passage au suivant (plus ancien)
+STATS_WINDOW = 10
+YIELD_DECAY = 0.7
+
+# Bonus d'exploration (UCB): un mot-clé peu essayé garde une chance de passer devant
+EXPLORATION = 1.0
+
+# Rendement (ajouts par passage) à partir duquel on lit toutes les pages en incrémental
+DEEP_SEARCH_YIELD = 1.0
+
+# Résultat de chaque passage d'un mot-clé
+register_schema("""
+CREATE TABLE IF NOT EXISTS keyword_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    keyword TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    full_scan INTEGER NOT NULL DEFAULT 0,
+    added INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    too_short INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    interrupted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_keyword_runs_keyword ON keyword_runs(keyword, id);
+""")
+register_column('keyword_runs', 'run_id', 'INTEGER')
+register_schema("CREATE INDEX IF NOT EXISTS idx_keyword_runs_run ON keyword_runs(run_id);")
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+def record_run(keyword, result, units, full_scan=False, interrupted=False, run_id=None):
+    """
+    Enregistre le résultat d'un passage
+    interrupted: passage coupé par le quota (ignoré pour le rendement)
+    run_id: mise à jour automatique à laquelle appartient le passage (runs)
+    """
+    # Pas de résultat: la recherche elle-même a échoué
+    errors = result.get('errors', 0) if result else 1
+    result = result or {}
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO keyword_runs (
+                keyword, run_at, full_scan, added, skipped, too_short, errors, units, interrupted, run_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            keyword,
+            _utcnow().isoformat(),
+            int(bool(full_scan)),
+            result.get('added', 0),
+            result.get('skipped', 0),
+            result.get('too_short', 0),
+            errors,
+            units,
+            int(bool(interrupted)),
+            run_id
+        ))
+
+def list_run_keywords(run_id):
+    """Résultat de chaque mot-clé d'une mise à jour"""
+    rows = get_connection().execute("""
+        SELECT keyword, run_at, full_scan, added, skipped, too_short, errors, units, interrupted
+        FROM keyword_runs WHERE run_id = ? ORDER BY id
+    """, (run_id,)).fetchall()
+    return [dict(row) for row in rows]
+
+def _recent_runs():
+    """Derniers passages complets de chaque mot-clé, du plus récent au plus ancien"""
+    rows = get_connection().execute("""
+        SELECT * FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY keyword ORDER BY id DESC) AS rank
+            FROM keyword_runs
+            WHERE interrupted = 0
+        )
+        WHERE rank <= ?
+        ORDER BY keyword, rank
+    """, (STATS_WINDOW,)).fetchall()
+
+    runs = {}
+    for row in rows:
+        runs.setdefault(row['keyword'], []).append(row)
+    return runs
+
+def _totals():
+    rows = get_connection().execute("""
+        SELECT keyword, COUNT(*) AS runs, SUM(added) AS added, SUM(skipped) AS skipped,
+               SUM(too_short) AS too_short, SUM(errors) AS errors, SUM(units) AS units,
+               MAX(run_at) AS last_run_at
+        FROM keyword_runs
+        GROUP BY keyword
+    """).fetchall()
+    return {row['keyword']: row for row in rows}
+
+def _recent_yield(runs):
+    """Ajouts par passage, moyenne pondérée (les passages récents comptent plus)"""
+    weights = [YIELD_DECAY ** i for i in range(len(runs))]
+    return sum(w * run['added'] for w, run in zip(weights, runs)) / sum(weights)
+
+def _empty_streak(runs):
+    """Nombre de passages consécutifs (les plus récents) sans aucun ajout"""
+    streak = 0
+    for run in runs:
+        if run['added']:
+            break
+        streak += 1
+    return streak
+
+def _next_due(runs, streak):
+    """
+    Heure à partir de laquelle le mot-clé peut repasser
+    1 passage vide: cadence normale, puis 6 h, 12 h, 24 h... jusqu'à MAX_BACKOFF
+    """
+    if not runs or streak == 0:
+        return None
+    backoff = min(UPDATE_INTERVAL * (2 ** (streak - 1)), MAX_BACKOFF)
+    return _parse_time(runs[0]['run_at']) + backoff - SCHEDULE_SLACK
+
+def get_keyword_stats(keywords):
+    """
+    Statistiques de rendement et décision de planification de chaque mot-clé
+    score = rendement récent + bonus d'exploration (jamais essayé: prioritaire)
+    """
+    recent = _recent_runs()
+    totals = _totals()
+    total_runs = sum(len(runs) for runs in recent.values())
+    now = _utcnow()
+
+    stats = []
+    for keyword in keywords:
+        runs = recent.get(keyword, [])
+        total = totals.get(keyword)
+
+        if runs:
+            recent_yield = _recent_yield(runs)
+            score = recent_yield + EXPLORATION * math.sqrt(math.log(max(total_runs, 1)) / len(runs))
+        else:
+            recent_yield = None
+            score = math.inf
+
+        streak = _empty_streak(runs)
+        next_due = _next_due(runs, streak)
+        added = total['added'] if total else 0
+        units = total['units'] if total else 0
+
+        stats.append({
+            'keyword': keyword,
+            'runs': total['runs'] if total else 0,
+            'added': added,
+            'skipped': total['skipped'] if total else 0,
+            'too_short': total['too_short'] if total else 0,
+            'errors': total['errors'] if total else 0,
+            'units': units,
+            'units_per_added': round(units / added, 1) if added else None,
+            'recent_yield': round(recent_yield, 3) if recent_yield is not None else None,
+            'empty_streak': streak,
+            'score': round(score, 3) if score != math.inf else None,
+            'last_run_at': total['last_run_at'] if total else None,
+            'next_due_at': next_due.isoformat() if next_due else None,
+            'due': next_due is None or now >= next_due,
+            'max_pages': INCREMENTAL_MAX_PAGES
+                if recent_yield is None or recent_yield >= DEEP_SEARCH_YIELD else 1,
+            '_score': score
+        })
+
+    return stats
+
+def plan_keywords(keywords):
+    """
+    Choisit les mots-clés du passage et leur profondeur
+    - Mots-clés improductifs mis au repos (durée doublée à chaque passage vide)
+    - Les autres triés par score: en cas de quota serré, les moins rentables sont reportés
+    - Pages incrémentales: toutes pour les productifs, une seule pour les autres
+    """
+    stats = get_keyword_stats(keywords)
+    due = sorted((s for s in stats if s['due']), key=lambda s: -s['_score'])
+
+    return {
+        'keywords': [s['keyword'] for s in due],
+        'resting': [s['keyword'] for s in stats if not s['due']],
+        'max_pages': {s['keyword']: s['max_pages'] for s in due}
+    }
+
+def public_stats(keywords):
+    """Statistiques par mot-clé (exposées par /api/keywords/stats), meilleur score d'abord"""
+    stats = sorted(get_keyword_stats(keywords), key=lambda s: -s['_score'])
+    for s in stats:
+        del s['_score']
+    return stats
@@ -1,21 +1,49 @@
-﻿from fastapi import FastAPI, HTTPException
+﻿from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from googleapiclient.discovery import build
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Match
+from contextlib import asynccontextmanager, suppress
+import asyncio
+import json
 import os
+import time
+from typing import Optional
 from dotenv import load_dotenv
 
 # Imports relatifs
-from .auth import get_authenticated_service
-from .models import SearchRequest
-from .auto_update import start_scheduler_background
+from .models import ReorderRequest, SearchRequest
+from .auto_update import KEYWORDS_LIST
+from . import catalog, channels, events, insert_queue, jobs, keyword_stats, membership, metrics, quota, relevance, reorder, runs, scheduler, shards
+from .quota import QuotaExceededError
+from .youtube_client import get_youtube_client
+from .http_cache import catalog_headers, is_not_modified
+from .catalog_search import search_catalog
 
 # Charger les variables d'environnement
 load_dotenv('config/.env')
 
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Scheduler des mises à jour dans la boucle de l'API (aucun crawl au démarrage)
+    Avec plusieurs workers, chacun a sa boucle: le bail en base n'en laisse passer qu'une
+    """
+    task = None
+    if scheduler.SCHEDULER_ENABLED:
+        task = asyncio.create_task(scheduler.run_scheduler())
+        print("✅ Scheduler de mise à jour automatique lancé !")
+    yield
+    if task:
+        # Attendre la fin de la tâche (un crawl en cours dans son thread n'est pas attendu)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
 app = FastAPI(
     title="RAP Gasy Streaming API",
     description="API pour gérer la playlist YouTube RAP Gasy",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuration CORS
@@ -25,18 +53,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Catalog-Total"],
 )
 
+def _route_label(request):
+    """Modèle de la route ('/api/jobs/{job_id}'), pas l'URL: nombre de séries borné"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Mesure la latence de chaque requête HTTP (exposée par /metrics)"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    metrics.http_request_seconds.observe(
+        time.perf_counter() - started,
+        request.method,
+        _route_label(request),
+        str(response.status_code)
+    )
+    return response
+
 # Variables globales
 YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
 PLAYLIST_ID = os.getenv('PLAYLIST_ID')
 
-@app.on_event("startup")
-async def startup_event():
-    """Lance le scheduler en arrière-plan au démarrage"""
-    start_scheduler_background()
-    print("✅ Scheduler de mise à jour automatique lancé !")
-
 @app.get("/")
 def read_root():
     return {
@@ -45,82 +89,444 @@ def read_root():
         "status": "✅ Running"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Métriques du process au format texte Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/videos")
-def get_playlist_videos():
-    """Récupère les vidéos de la playlist YouTube"""
+def get_playlist_videos(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    sort: str = Query('playlist', pattern=f"^({'|'.join(catalog.SORTS)})$")
+):
+    """
+    Récupère les vidéos de la playlist depuis le catalogue local
+    - Aucun appel YouTube (sauf premier remplissage du catalogue)
+    - sort: playlist (ordre de la playlist), views, newest, trending (vues gagnées par jour)
+      ou channel; chaque tri est lu dans son index, sans tri à la requête
+    - Pagination par curseur: passer next_cursor pour la page suivante (même tri)
+    - ETag / Last-Modified: 304 si ni le catalogue ni les chiffres YouTube (vues, likes,
+      renvoyés par tous les tris) n'ont changé
+    - version et stats_version: à passer à /api/videos/changes
+    """
     try:
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+        # Curseur invalide: 400 même quand le client a une copie à jour (pas de 304)
+        if cursor:
+            catalog.check_cursor(cursor, sort)
         
-        request = youtube.playlistItems().list(
-            playlistId=PLAYLIST_ID,
-            part='snippet',
-            maxResults=50
-        )
-        response = request.execute()
+        catalog.bootstrap_catalog(get_youtube_client, PLAYLIST_ID)
+        
+        version, updated_at = catalog.get_version()
+        stats = catalog.get_stats_version()
+        headers = catalog_headers(version, updated_at, stats)
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
         
-        videos = []
-        for item in response.get('items', []):
-            videos.append({
-                'id': item['snippet']['resourceId']['videoId'],
-                'title': item['snippet']['title'],
-                'thumbnail': item['snippet']['thumbnails']['default']['url'],
-                'url': f"https://www.youtube.com/watch?v={item['snippet']['resourceId']['videoId']}"
-            })
+        rows, next_cursor = catalog.list_videos(cursor, limit, sort)
+        videos = [catalog.to_api_video(row) for row in rows]
         
-        return {'videos': videos, 'count': len(videos)}
+        return JSONResponse({
+            'videos': videos,
+            'count': len(videos),
+            'total': catalog.count_videos(),
+            'next_cursor': next_cursor,
+            'version': version,
+            'stats_version': stats[0]
+        }, headers=headers)
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/search-and-add")
+# Vidéos lues par requête SQL pendant l'export (une ligne de 300 octets environ par vidéo)
+EXPORT_BATCH_SIZE = 500
+
+def _export_ndjson(cursor):
+    for rows in catalog.iter_videos(EXPORT_BATCH_SIZE, cursor):
+        yield ''.join(
+            json.dumps(catalog.to_api_video(row), ensure_ascii=False) + '\n' for row in rows
+        )
+
+def _export_json(version, cursor):
+    # En-tête envoyé avant la première requête SQL: premier octet immédiat
+    yield f'{{"version": {version}, "videos": ['
+    separator = ''
+    for rows in catalog.iter_videos(EXPORT_BATCH_SIZE, cursor):
+        yield separator + ', '.join(
+            json.dumps(catalog.to_api_video(row), ensure_ascii=False) for row in rows
+        )
+        separator = ', '
+    yield ']}'
+
+@app.get("/api/videos/export")
+def export_playlist_videos(
+    request: Request,
+    format: str = Query('ndjson', pattern='^(ndjson|json)$'),
+    cursor: Optional[str] = None
+):
+    """
+    Tout le catalogue en flux, dans l'ordre de la playlist (shards compris)
+    - ndjson: une vidéo JSON par ligne | json: {"version", "videos": [...]}
+    - Lu par paquets de EXPORT_BATCH_SIZE: mémoire constante quelle que soit la taille
+    - cursor: reprendre après la dernière vidéo reçue (même curseur que /api/videos)
+    - ETag / Last-Modified: 304 si ni le catalogue ni les chiffres YouTube n'ont changé
+    """
+    if cursor:
+        try:
+            catalog.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # Base neuve (premier déploiement): remplir le catalogue avant d'ouvrir le flux
+    try:
+        catalog.bootstrap_catalog(get_youtube_client, PLAYLIST_ID)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    version, updated_at = catalog.get_version()
+    headers = catalog_headers(version, updated_at, catalog.get_stats_version())
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    headers['X-Catalog-Total'] = str(catalog.count_videos())
+    
+    if format == 'json':
+        return StreamingResponse(_export_json(version, cursor), media_type='application/json', headers=headers)
+    return StreamingResponse(_export_ndjson(cursor), media_type='application/x-ndjson', headers=headers)
+
+@app.get("/api/videos/changes")
+def get_playlist_changes(
+    request: Request,
+    since: int = Query(0, ge=0),
+    stats_since: Optional[int] = Query(None, ge=0)
+):
+    """
+    Delta du catalogue depuis la version `since` (renvoyée par /api/videos)
+    - videos: vidéos ajoutées ou modifiées depuis, et celles dont les chiffres (vues, likes...)
+      ont changé depuis la version des stats `stats_since` si elle est passée
+    - removed: IDs des vidéos retirées de la playlist depuis
+    """
+    version, updated_at = catalog.get_version()
+    stats = catalog.get_stats_version()
+    headers = catalog_headers(version, updated_at, stats)
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    
+    changed, removed = catalog.list_changes(since, stats_since)
+    
+    return JSONResponse({
+        'version': version,
+        'stats_version': stats[0],
+        'since': since,
+        'stats_since': stats_since,
+        'videos': [catalog.to_api_video(row) for row in changed],
+        'removed': removed
+    }, headers=headers)
+
+@app.get("/api/catalog/search")
+def search_local_catalog(q: str = "", limit: int = Query(20, ge=1, le=100)):
+    """
+    Recherche dans les vidéos déjà présentes dans la playlist
+    - Index plein texte local: titres, chaînes, descriptions
+    - Préfixes et variantes d'orthographe malagasy (y/i, accents, lettres doublées)
+    - Aucun quota YouTube consommé
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Paramètre q requis")
+    
+    results = search_catalog(q, limit)
+    
+    return {
+        'query': q,
+        'count': len(results),
+        'results': results
+    }
+
+def _run_search_job(params, progress):
+    """Tâche d'un job de recherche (exécutée par le pool de jobs)"""
+    from .search_api import search_and_add_videos_with_api
+    
+    # Client YouTube (clé API) du thread du pool
+    return search_and_add_videos_with_api(
+        get_youtube_client(),
+        PLAYLIST_ID,
+        params['keywords'],
+        params['max_results'],
+        progress=progress
+    )
+
+@app.post("/api/search-and-add", status_code=202)
 def search_and_add(request: SearchRequest):
     """
-    Recherche et ajoute des vidéos à la playlist
-    En production (Render): utilise clé API
-    En local: utilise OAuth2 avec credentials.json
+    Recherche et ajoute des vidéos à la playlist (en arrière-plan)
+    - Retourne tout de suite l'ID du job: suivre l'avancement sur /api/jobs/{id}
+    - Une recherche identique déjà en cours est partagée (coalesced = true)
     """
+    if quota.is_exhausted():
+        raise HTTPException(status_code=429, detail="Quota YouTube épuisé pour aujourd'hui")
+    
+    # Événements publiés à partir d'ici: le client peut s'abonner après coup sans en perdre
+    events_since = events.bus.last_seq
     try:
-        # Utiliser la clé API pour les recherches et ajouts
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-        
-        # Importer la fonction de recherche
-        from .search_api import search_and_add_videos_with_api
-        
-        result = search_and_add_videos_with_api(
-            youtube,
-            PLAYLIST_ID,
-            request.keywords,
-            request.max_results
+        job, coalesced = jobs.submit(
+            'search-and-add',
+            {'keywords': request.keywords, 'max_results': request.max_results},
+            _run_search_job
         )
-        return result
+    except jobs.JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'coalesced': coalesced,
+        'status_url': f"/api/jobs/{job['id']}",
+        'events_url': f"/api/events?job_id={job['id']}&since={events_since}"
+    }
+
+@app.get("/api/reorder")
+def get_reorder_plan(sort: str = Query('newest', pattern=f"^({'|'.join(catalog.SORTS)})$")):
+    """
+    Coût du rangement de la playlist selon un tri (aucun appel YouTube)
+    moves: déplacements minimaux (50 unités chacun), par playlist (shard)
+    """
+    return reorder.plan(PLAYLIST_ID, sort)
+
+def _run_reorder_job(params, progress):
+    """Tâche d'un job de rangement (exécutée par le pool de jobs)"""
+    progress('reorder')
+    return reorder.reorder_playlist(get_youtube_client(), PLAYLIST_ID, params['sort'], params['max_units'])
+
+@app.post("/api/reorder", status_code=202)
+def start_reorder(request: ReorderRequest):
+    """
+    Range la playlist YouTube selon un tri de /api/videos (en arrière-plan)
+    - Déplacements minimaux, dans la limite de max_units et du quota restant
+    - Suivre le job sur /api/jobs/{id}; le reste est fait par un prochain appel
+    """
+    if request.sort not in catalog.SORTS:
+        raise HTTPException(status_code=400, detail=f"Tri inconnu: {request.sort}")
+    if quota.is_exhausted():
+        raise HTTPException(status_code=429, detail="Quota YouTube épuisé pour aujourd'hui")
+    
+    try:
+        job, coalesced = jobs.submit(
+            'reorder',
+            {'sort': request.sort, 'max_units': request.max_units},
+            _run_reorder_job
+        )
+    except jobs.JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'coalesced': coalesced,
+        'status_url': f"/api/jobs/{job['id']}"
+    }
+
+@app.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """
+    Avancement et résultat d'un job
+    status: queued, running, done (result rempli) ou failed (error rempli)
+    """
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable ou expiré")
+    return job
+
+# Commentaire envoyé sans événement pendant ce délai (proxies qui coupent les connexions muettes)
+SSE_KEEPALIVE_SECONDS = 15
+
+def _sse(event):
+    return f"id: {events.bus.event_id(event)}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@app.get("/api/events")
+async def stream_events(
+    request: Request,
+    job_id: Optional[str] = None,
+    run_id: Optional[int] = None,
+    type: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0)
+):
+    """
+    Suivi en direct (Server-Sent Events) des recherches et des mises à jour
+    - video: sort de chaque candidat (duplicate, off_topic, too_short,
+      near_duplicate, inserted, queued, error) | searched: recherche faite pour un mot-clé
+    - job: étapes et fin d'un job | keyword, channels, insert_queue, run_*: journal des mises à jour
+    - Filtres: job_id, run_id, type (liste séparée par des virgules)
+    - Reprise: en-tête Last-Event-ID (reconnexion d'EventSource) ou since (events_url d'un job)
+    - reset: identifiant d'avant un redémarrage de l'API, le flux repart du début du tampon
+    """
+    filters = {key: value for key, value in (('job_id', job_id), ('run_id', run_id)) if value is not None}
+    types = set(type.split(',')) if type else None
+    
+    since, reset = events.bus.resume_point(request.headers.get('last-event-id'), since)
+    
+    async def stream():
+        seq = since
+        yield "retry: 3000\n\n"
+        if reset:
+            # Événements d'avant le redémarrage perdus: l'abonné recharge son état
+            yield f"event: reset\ndata: {json.dumps({'epoch': events.bus.epoch})}\n\n"
+        while not await request.is_disconnected():
+            batch, lagged = events.bus.since(seq)
+            if lagged:
+                # Abonné trop lent: les plus anciens événements ont quitté le tampon
+                yield "event: lagged\ndata: {}\n\n"
+            if batch:
+                seq = batch[-1]['seq']
+                chunk = ''.join(
+                    _sse(event) for event in batch
+                    if (types is None or event['type'] in types) and events.matches(event, filters)
+                )
+                if chunk:
+                    yield chunk
+            elif not await events.bus.wait(seq, SSE_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+    
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.post("/api/add-video")
 def add_video_to_playlist(video_id: str):
-    """Ajoute une vidéo à la playlist"""
+    """
+    Ajoute une vidéo à la playlist
+    Passe par la file d'ajouts (comme le crawler): shard de destination, idempotence, ajouts
+    sérialisés; un échec (erreur YouTube, quota) laisse la vidéo en file pour la prochaine mise à jour
+    status: success, already_exists ou queued
+    """
     try:
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+        # Éviter un insert à 50 unités pour une vidéo déjà présente
+        index = membership.get_index()
+        if index.contains(video_id):
+            return {'status': 'already_exists', 'videoId': video_id}
         
-        request = youtube.playlistItems().insert(
-            part='snippet',
-            body={
-                'snippet': {
-                    'playlistId': PLAYLIST_ID,
-                    'resourceId': {
-                        'kind': 'youtube#video',
-                        'videoId': video_id
-                    }
-                }
-            }
-        )
-        response = request.execute()
-        return {'status': 'success', 'videoId': video_id}
+        youtube = get_youtube_client()
+        
+        # Date et titre inconnus ici: shard par défaut
+        # Demande explicite: une vidéo abandonnée par la file repart de zéro
+        insert_queue.enqueue(PLAYLIST_ID, video_id, {}, source='add-video', retry_failed=True)
+        outcome = insert_queue.try_insert(youtube, video_id, index)
+        events.publish('video', video_id=video_id, source='add-video', status=insert_queue.DRAIN_EVENTS[outcome])
+        
+        if outcome == 'added':
+            return {'status': 'success', 'videoId': video_id}
+        if outcome == 'present':
+            return {'status': 'already_exists', 'videoId': video_id}
+        if outcome == 'failed':
+            raise HTTPException(status_code=400, detail=f"Ajout de {video_id} refusé par YouTube")
+        return {'status': 'queued', 'videoId': video_id}
     
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=429, detail=f"{str(e)} (vidéo gardée en file)")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/quota")
+def get_quota_budget():
+    """État du budget de quota YouTube du jour"""
+    return quota.get_budget()
+
+@app.get("/api/keywords/stats")
+def get_keywords_stats():
+    """
+    Rendement de chaque mot-clé de la mise à jour automatique
+    - Ajouts, doublons, vidéos trop courtes, erreurs et quota consommé
+    - Score du planificateur, mise au repos et prochaine exécution possible
+    """
+    stats = keyword_stats.public_stats(KEYWORDS_LIST)
+    return {
+        'count': len(stats),
+        'keywords': stats
+    }
+
+@app.get("/api/runs")
+def get_update_runs(before: Optional[int] = None, limit: int = Query(20, ge=1, le=100)):
+    """
+    Historique des mises à jour automatiques, les plus récentes d'abord
+    Page suivante: before = ID de la dernière mise à jour reçue
+    """
+    history = runs.list_runs(before, limit)
+    return {
+        'count': len(history),
+        'runs': history,
+        'next_before': history[-1]['id'] if len(history) == limit else None
+    }
+
+@app.get("/api/scheduler")
+def get_scheduler_status():
+    """Prochaine mise à jour automatique et process qui en détient le bail"""
+    return scheduler.get_status()
+
+@app.get("/api/runs/{run_id}")
+def get_update_run(run_id: int):
+    """Une mise à jour avec le résultat de chacun de ses mots-clés"""
+    run = runs.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Mise à jour introuvable")
+    return run
+
+@app.get("/api/relevance/rejections")
+def get_relevance_rejections(limit: int = Query(50, ge=1, le=500)):
+    """
+    Derniers résultats de recherche écartés comme hors sujet, avec le détail du score
+    Une ligne par (vidéo, mot-clé): hits = nombre d'écarts, rejected_at = le dernier
+    Sert à ajuster RELEVANCE_THRESHOLD
+    """
+    rejections = relevance.list_rejections(limit)
+    return {
+        'threshold': relevance.RELEVANCE_THRESHOLD,
+        'count': len(rejections),
+        'rejections': rejections
+    }
+
+@app.get("/api/shards")
+def get_playlist_shards():
+    """
+    Playlists YouTube qui composent le catalogue (PLAYLIST_ID puis les shards ouverts ensuite)
+    videos: nombre de vidéos de chaque playlist dans le catalogue
+    """
+    playlists = shards.list_shards(PLAYLIST_ID)
+    return {
+        'strategy': shards.PLAYLIST_SHARDING,
+        'shard_size': shards.PLAYLIST_SHARD_SIZE,
+        'count': len(playlists),
+        'total': sum(shard['videos'] for shard in playlists),
+        'shards': playlists
+    }
+
+@app.get("/api/inserts")
+def get_insert_queue(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    """
+    File persistante des ajouts à la playlist
+    status: pending, inserting, done, present ou failed (toutes par défaut)
+    """
+    entries = insert_queue.list_entries(status, limit)
+    return {
+        'stats': insert_queue.get_stats(),
+        'count': len(entries),
+        'entries': entries
+    }
+
+@app.get("/api/channels")
+def get_channels(limit: int = Query(100, ge=1, le=1000)):
+    """Chaînes suivies (nouveautés lues via leur playlist de mises en ligne), les plus productives d'abord"""
+    followed = channels.list_channels(limit)
+    return {
+        'poll_interval_hours': channels.CHANNEL_POLL_INTERVAL.total_seconds() / 3600,
+        'count': len(followed),
+        'channels': followed
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,83 @@
+import threading
+from datetime import datetime, timedelta
+
+from . import catalog, quota, shards
+
+# Synchro complète forcée au-delà de cet âge, même si le nombre de vidéos n'a pas bougé
+FULL_SYNC_MAX_AGE = timedelta(hours=24)
+
+class MembershipIndex:
+    """
+    Index en mémoire des vidéos présentes dans la playlist
+    - Chargé depuis le catalogue SQLite (persistant entre les exécutions)
+    - Mis à jour à chaque ajout, rafraîchi par synchro différentielle
+    - Partagé par le scheduler, /api/search-and-add et /api/add-video
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = set()
+        self._loaded_sync = None
+
+    def _reload_if_stale(self):
+        # Recharger si une synchro a eu lieu depuis le dernier chargement (autre process)
+        last_sync = catalog.get_meta('last_sync')
+        if self._loaded_sync is not None and last_sync == self._loaded_sync:
+            return
+
+        # Lecture sous le verrou: un mark_added concurrent (catalogue écrit avant le verrou)
+        # est soit dans la lecture, soit appliqué après le remplacement, jamais perdu
+        with self._lock:
+            rows = catalog.get_connection().execute("SELECT video_id FROM catalog_videos").fetchall()
+            self._ids = {row['video_id'] for row in rows}
+            self._loaded_sync = last_sync or ''
+
+    def ensure_loaded(self):
+        self._reload_if_stale()
+
+    def contains(self, video_id):
+        return video_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def mark_added(self, video_id, insert_response=None, snippet=None, playlist_id=None):
+        """Enregistre un ajout dans l'index et dans le catalogue"""
+        catalog.record_insert(video_id, insert_response, snippet, playlist_id)
+        with self._lock:
+            self._ids.add(video_id)
+
+    def refresh(self, youtube, playlist_id):
+        """
+        Synchro différentielle avec la playlist et ses shards (un seul catalogue logique)
+        - 1 unité par playlist: compare le nombre de vidéos des playlists avec le catalogue
+        - Synchro complète seulement si ça diffère (ou si la dernière est trop ancienne)
+        """
+        last_sync = catalog.get_meta('last_sync')
+        too_old = last_sync is None or \
+            datetime.now() - datetime.fromisoformat(last_sync) > FULL_SYNC_MAX_AGE
+
+        if not too_old:
+            remote_total = 0
+            for shard_id in shards.playlists(playlist_id):
+                response = quota.execute(youtube.playlistItems().list(
+                    playlistId=shard_id,
+                    part='id',
+                    maxResults=1
+                ))
+                remote_total += response.get('pageInfo', {}).get('totalResults') or 0
+
+            if remote_total == catalog.count_videos():
+                self._reload_if_stale()
+                return {'synced': False, 'total': len(self._ids), 'removed': 0}
+
+        result = catalog.sync_catalog(youtube, playlist_id)
+        self._reload_if_stale()
+        return {'synced': True, **result}
+
+_index = MembershipIndex()
+
+def get_index():
+    """Index partagé du process (chargé depuis le catalogue si besoin)"""
+    _index.ensure_loaded()
+    return _index
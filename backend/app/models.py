@@ -4,6 +4,10 @@ class SearchRequest(BaseModel):
     keywords: str
     max_results: int = 50
 
+class ReorderRequest(BaseModel):
+    sort: str = 'newest'
+    max_units: int = 1000
+
 class VideoInfo(BaseModel):
     id: str
     title: str
@@ -0,0 +1,235 @@
+import hashlib
+import os
+from functools import lru_cache
+import random
+import re
+import threading
+from dotenv import load_dotenv
+
+# video_details: durées des vidéos du catalogue (table lue par sync_index)
+from . import catalog, video_details
+from .db import get_connection, register_schema, transaction
+from .textnorm import fold_accents, tokenize
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# skip: ne pas ajouter un quasi-doublon | flag: l'ajouter mais le signaler | off: désactivé
+NEAR_DUP_MODE = os.getenv('NEAR_DUP_MODE', 'skip')
+
+# Similarité (Jaccard des mots du titre) à partir de laquelle deux vidéos sont le même morceau
+NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', '0.8'))
+
+# Écart de durée toléré entre deux versions d'un même morceau (intro de la version lyrics...)
+DURATION_TOLERANCE = 15
+
+# MinHash découpé en bandes (LSH): 8 bandes de 3 valeurs
+# Deux titres à 80 % de similarité partagent une bande dans > 99 % des cas
+BANDS = 8
+ROWS_PER_BAND = 3
+
+# Deux jeux de bandes par titre: mots du morceau (bandes 0..7) et titre entier, artiste compris (8..15)
+# Sans séparateur, l'artiste tombe dans le morceau: seul le titre entier rapproche les deux formes
+# (à incrémenter quand le contenu de l'index change: sync_index le reconstruit)
+INDEX_FORMAT = '2'
+
+# Mots qui distinguent les mises en ligne d'un même morceau, pas les morceaux
+# (normalisés comme les titres: 'lyrics' -> 'lirics')
+NOISE_WORDS = set(tokenize(
+    'official officiel officielle video videos clip audio lyric lyrics paroles parole tononkira '
+    'music musique hd hq 4k 1080p 720p visualizer visualiser mv new vaovao exclu exclusive '
+    'exclusivite full version with avec by the'
+))
+
+# Invités: de 'feat.' jusqu'à la parenthèse ou au séparateur suivant
+_FEAT_RE = re.compile(r'\b(?:feat|ft|featuring)\b\.?[^()\[\]|\-–—]*')
+_SEPARATOR_RE = re.compile(r'\s+[-–—]\s+|\s*\|\s*|\s*//\s*')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(20240601)
+_PERMUTATIONS = [
+    (_random.randrange(1, _MERSENNE_PRIME), _random.randrange(0, _MERSENNE_PRIME))
+    for _ in range(BANDS * ROWS_PER_BAND)
+]
+
+# Signature de chaque titre du catalogue et ses bandes LSH (recherche sans parcourir le catalogue)
+register_schema("""
+CREATE TABLE IF NOT EXISTS title_signatures (
+    video_id TEXT PRIMARY KEY,
+    artist TEXT NOT NULL,
+    track TEXT NOT NULL,
+    duration_seconds INTEGER
+);
+CREATE TABLE IF NOT EXISTS title_lsh (
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_title_lsh_video ON title_lsh(video_id);
+""")
+
+_sync_lock = threading.Lock()
+
+def parse_title(title):
+    """
+    Découpe un titre en (artiste, morceau), sous forme d'ensembles de mots normalisés
+    - 'Artiste - Morceau (feat. X) [Official Video]' -> ({'artiste'}, {'morceau'})
+    - Les invités (feat.) et mots de format (lyrics, clip...) sont ignorés
+    - Sans séparateur, l'artiste est inconnu (ensemble vide)
+    """
+    text = _FEAT_RE.sub(' ', fold_accents(title or '').lower())
+    parts = [part for part in _SEPARATOR_RE.split(text) if tokenize(part)]
+
+    if len(parts) >= 2:
+        artist, track = parts[0], ' '.join(parts[1:])
+    else:
+        artist, track = '', ' '.join(parts)
+
+    artist_tokens = set(tokenize(artist)) - NOISE_WORDS
+    track_tokens = set(tokenize(track)) - NOISE_WORDS
+    return artist_tokens, track_tokens
+
+@lru_cache(maxsize=65536)
+def _token_signature(token):
+    """Valeurs d'un mot par permutation (les mots reviennent d'un titre à l'autre: en cache)"""
+    value = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'big')
+    return tuple((a * value + b) % _MERSENNE_PRIME for a, b in _PERMUTATIONS)
+
+def lsh_buckets(tokens):
+    """Clés de bande MinHash d'un ensemble de mots (une par bande)"""
+    if not tokens:
+        return []
+    signature = [min(values) for values in zip(*(_token_signature(token) for token in tokens))]
+    return [
+        '-'.join(str(value) for value in signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        for band in range(BANDS)
+    ]
+
+def title_buckets(artist, track):
+    """Bandes LSH (bande, clé) d'un titre: celles du morceau puis celles du titre entier"""
+    return (
+        list(enumerate(lsh_buckets(track)))
+        + [(BANDS + band, bucket) for band, bucket in enumerate(lsh_buckets(artist | track))]
+    )
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def is_near_duplicate(candidate, existing):
+    """
+    Même morceau ?
+    - Mots du morceau similaires (l'artiste d'un côté est retiré de l'autre s'il y manque)
+    - Artistes compatibles quand les deux sont connus
+    - Durées proches quand les deux sont connues (obligatoire pour les titres d'un seul mot)
+    """
+    artist_a, track_a, duration_a = candidate
+    artist_b, track_b, duration_b = existing
+
+    if artist_a and artist_b and not artist_a & artist_b:
+        return False
+    if not artist_a:
+        track_a = track_a - artist_b
+    if not artist_b:
+        track_b = track_b - artist_a
+
+    if _jaccard(track_a, track_b) < NEAR_DUP_THRESHOLD:
+        return False
+
+    if duration_a and duration_b:
+        return abs(duration_a - duration_b) <= DURATION_TOLERANCE
+    return min(len(track_a), len(track_b)) >= 2
+
+def _index_rows(conn, rows):
+    signatures = []
+    buckets = []
+    for video_id, title, duration in rows:
+        artist, track = parse_title(title)
+        signatures.append((video_id, ' '.join(sorted(artist)), ' '.join(sorted(track)), duration))
+        buckets.extend((band, bucket, video_id) for band, bucket in title_buckets(artist, track))
+
+    conn.executemany("DELETE FROM title_lsh WHERE video_id = ?", [(row[0],) for row in signatures])
+    conn.executemany("""
+        INSERT OR REPLACE INTO title_signatures (video_id, artist, track, duration_seconds)
+        VALUES (?, ?, ?, ?)
+    """, signatures)
+    conn.executemany(
+        "INSERT OR IGNORE INTO title_lsh (band, bucket, video_id) VALUES (?, ?, ?)", buckets
+    )
+
+def sync_index():
+    """
+    Aligne l'index sur le catalogue (vidéos ajoutées ou retirées depuis la dernière fois)
+    Ne fait rien si la version du catalogue n'a pas bougé
+    Reconstruit tout l'index s'il a été construit par une version précédente (INDEX_FORMAT)
+    """
+    version, _ = catalog.get_version()
+    rebuild = catalog.get_meta('title_index_format') != INDEX_FORMAT
+    if not rebuild and catalog.get_meta('title_index_version') == str(version):
+        return
+
+    with _sync_lock:
+        with transaction() as conn:
+            if rebuild:
+                conn.execute("DELETE FROM title_lsh")
+                conn.execute("DELETE FROM title_signatures")
+            conn.execute("""
+                DELETE FROM title_lsh WHERE video_id IN (
+                    SELECT s.video_id FROM title_signatures s
+                    LEFT JOIN catalog_videos v ON v.video_id = s.video_id
+                    WHERE v.video_id IS NULL
+                )
+            """)
+            conn.execute("""
+                DELETE FROM title_signatures
+                WHERE video_id NOT IN (SELECT video_id FROM catalog_videos)
+            """)
+            missing = conn.execute("""
+                SELECT v.video_id, v.title, d.duration_seconds
+                FROM catalog_videos v
+                LEFT JOIN title_signatures s ON s.video_id = v.video_id
+                LEFT JOIN video_details d ON d.video_id = v.video_id
+                WHERE s.video_id IS NULL
+            """).fetchall()
+            _index_rows(conn, [tuple(row) for row in missing])
+        catalog.set_meta('title_index_version', str(version))
+        catalog.set_meta('title_index_format', INDEX_FORMAT)
+
+def add_video(video_id, title, duration=None):
+    """Indexe tout de suite une vidéo ajoutée (les recherches suivantes du passage la voient)"""
+    conn = get_connection()
+    with conn:
+        _index_rows(conn, [(video_id, title, duration)])
+
+def find_duplicate(title, duration=None, exclude=None):
+    """
+    Vidéo du catalogue dont ce titre semble être une autre mise en ligne
+    Quelques lectures indexées par bande LSH, puis vérification exacte des candidats
+    Retourne {'video_id', 'title'} ou None
+    """
+    artist, track = parse_title(title)
+    buckets = title_buckets(artist, track)
+    if not buckets:
+        return None
+
+    conn = get_connection()
+    clauses = ' OR '.join('(l.band = ? AND l.bucket = ?)' for _ in buckets)
+    params = [value for band, bucket in buckets for value in (band, bucket)]
+    rows = conn.execute(f"""
+        SELECT DISTINCT s.video_id, s.artist, s.track, s.duration_seconds
+        FROM title_lsh l
+        JOIN title_signatures s ON s.video_id = l.video_id
+        WHERE {clauses}
+    """, params).fetchall()
+
+    for row in rows:
+        if row['video_id'] == exclude:
+            continue
+        existing = (set(row['artist'].split()), set(row['track'].split()), row['duration_seconds'])
+        if is_near_duplicate((artist, track, duration), existing):
+            match = conn.execute(
+                "SELECT title FROM catalog_videos WHERE video_id = ?", (row['video_id'],)
+            ).fetchone()
+            return {'video_id': row['video_id'], 'title': match['title'] if match else None}
+
+    return None
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from . import metrics
+from .db import get_connection, register_schema
+from .ratelimit import youtube_limiter
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Quota journalier du projet Google Cloud (10 000 unités par défaut)
+DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000'))
+
+# Coût en unités de chaque appel utilisé par l'application
+QUOTA_COSTS = {
+    'search.list': 100,
+    'videos.list': 1,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'playlistItems.insert': 50,
+    'playlistItems.update': 50,
+    'playlistItems.delete': 50,
+    'playlists.insert': 50,
+}
+
+# Nombre moyen d'ajouts par recherche tant qu'il n'y a pas d'historique
+DEFAULT_INSERTS_PER_SEARCH = 10
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS quota_ledger (
+    day TEXT NOT NULL,
+    method TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, method)
+);
+CREATE TABLE IF NOT EXISTS quota_exhausted (
+    day TEXT PRIMARY KEY,
+    exhausted_at TEXT NOT NULL
+);
+""")
+
+# Compteurs d'usage du thread courant (voir track_usage)
+_local = threading.local()
+
+class QuotaExceededError(Exception):
+    """Le quota journalier YouTube est épuisé (inutile de réessayer avant la remise à zéro)"""
+    pass
+
+def _pacific_now():
+    """Le quota YouTube est remis à zéro à minuit, heure du Pacifique"""
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo('America/Los_Angeles'))
+    except Exception:
+        return datetime.now(timezone(timedelta(hours=-8)))
+
+def quota_day():
+    return _pacific_now().strftime('%Y-%m-%d')
+
+def is_quota_error(error):
+    """Détecte une erreur 403 quotaExceeded / dailyLimitExceeded de l'API"""
+    message = str(error)
+    return 'quotaExceeded' in message or 'dailyLimitExceeded' in message
+
+def _method_name(request, method):
+    if method:
+        return method
+    # HttpRequest de googleapiclient: methodId = 'youtube.search.list'
+    method_id = getattr(request, 'methodId', '') or ''
+    return method_id[len('youtube.'):] if method_id.startswith('youtube.') else method_id
+
+@contextmanager
+def track_usage():
+    """
+    Mesure le quota consommé par le thread courant dans le bloc
+    Sert à attribuer le coût d'un mot-clé (chaque mot-clé tourne dans un seul thread)
+    """
+    usage = {'calls': 0, 'units': 0}
+    previous = getattr(_local, 'usage', None)
+    _local.usage = usage
+    try:
+        yield usage
+    finally:
+        _local.usage = previous
+
+def record(method, calls=1):
+    """Ajoute le coût d'un appel au registre du jour"""
+    units = QUOTA_COSTS.get(method, 1) * calls
+    metrics.youtube_quota_units.inc(method, amount=units)
+    usage = getattr(_local, 'usage', None)
+    if usage is not None:
+        usage['calls'] += calls
+        usage['units'] += units
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO quota_ledger (day, method, calls, units) VALUES (?, ?, ?, ?)
+            ON CONFLICT(day, method) DO UPDATE SET
+                calls = calls + excluded.calls,
+                units = units + excluded.units
+        """, (quota_day(), method, calls, units))
+
+def mark_exhausted():
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO quota_exhausted (day, exhausted_at) VALUES (?, ?)",
+            (quota_day(), datetime.now().isoformat())
+        )
+
+def is_exhausted():
+    row = get_connection().execute(
+        "SELECT 1 FROM quota_exhausted WHERE day = ?", (quota_day(),)
+    ).fetchone()
+    return row is not None
+
+def used_today():
+    row = get_connection().execute(
+        "SELECT COALESCE(SUM(units), 0) AS units FROM quota_ledger WHERE day = ?",
+        (quota_day(),)
+    ).fetchone()
+    return row['units']
+
+def remaining():
+    if is_exhausted():
+        return 0
+    return max(0, DAILY_QUOTA - used_today())
+
+def execute(request, method=None):
+    """
+    Exécute une requête YouTube en comptabilisant son coût
+    - Refuse l'appel si le budget du jour ne le couvre pas
+    - Respecte la limite d'appels par seconde partagée entre threads
+    - Convertit une erreur quotaExceeded en QuotaExceededError
+    """
+    method = _method_name(request, method)
+    cost = QUOTA_COSTS.get(method, 1)
+
+    if remaining() < cost:
+        raise QuotaExceededError(
+            f"Budget quota insuffisant pour {method} ({cost} unités, reste {remaining()})"
+        )
+
+    youtube_limiter.acquire()
+
+    started = time.perf_counter()
+    try:
+        response = request.execute()
+    except Exception as e:
+        if is_quota_error(e):
+            metrics.youtube_request_seconds.observe(time.perf_counter() - started, method, 'quota_exceeded')
+            mark_exhausted()
+            raise QuotaExceededError(f"Quota YouTube épuisé ({method})") from e
+        metrics.youtube_request_seconds.observe(time.perf_counter() - started, method, 'error')
+        # Les requêtes en erreur consomment aussi du quota
+        record(method)
+        raise
+
+    metrics.youtube_request_seconds.observe(time.perf_counter() - started, method, 'ok')
+    record(method)
+    return response
+
+def estimate_keyword_cost():
+    """
+    Coût estimé d'un mot-clé: recherche + détails + ajouts attendus
+    Le nombre d'ajouts par recherche est tiré de l'historique des 7 derniers jours
+    """
+    since = (_pacific_now() - timedelta(days=7)).strftime('%Y-%m-%d')
+    rows = get_connection().execute("""
+        SELECT method, SUM(calls) AS calls FROM quota_ledger
+        WHERE day >= ? AND method IN ('search.list', 'playlistItems.insert')
+        GROUP BY method
+    """, (since,)).fetchall()
+    calls = {row['method']: row['calls'] for row in rows}
+
+    if calls.get('search.list'):
+        inserts_per_search = calls.get('playlistItems.insert', 0) / calls['search.list']
+    else:
+        inserts_per_search = DEFAULT_INSERTS_PER_SEARCH
+
+    return round(
+        QUOTA_COSTS['search.list']
+        + QUOTA_COSTS['videos.list']
+        + inserts_per_search * QUOTA_COSTS['playlistItems.insert']
+    )
+
+def plan_run(keywords, reserve=0):
+    """
+    Sélectionne les mots-clés qui tiennent dans le budget restant
+    reserve: unités à garder pour d'autres appels (synchro du catalogue...)
+    """
+    budget = remaining() - reserve
+    cost = estimate_keyword_cost()
+    count = max(0, min(len(keywords), budget // cost)) if cost else len(keywords)
+
+    return {
+        'keywords': list(keywords[:count]),
+        'deferred': list(keywords[count:]),
+        'cost_per_keyword': cost,
+        'budget': max(0, budget)
+    }
+
+def get_budget():
+    """État du budget du jour (exposé par /api/quota)"""
+    day = quota_day()
+    rows = get_connection().execute(
+        "SELECT method, calls, units FROM quota_ledger WHERE day = ? ORDER BY units DESC",
+        (day,)
+    ).fetchall()
+
+    now = _pacific_now()
+    reset = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return {
+        'day': day,
+        'daily_quota': DAILY_QUOTA,
+        'used': used_today(),
+        'remaining': remaining(),
+        'exhausted': is_exhausted(),
+        'resets_at': reset.isoformat(),
+        'estimated_cost_per_keyword': estimate_keyword_cost(),
+        'by_method': {
+            row['method']: {'calls': row['calls'], 'units': row['units']}
+            for row in rows
+        }
+    }
@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+class RateLimiter:
+    """
+    Seau à jetons partagé entre threads
+    - rate: jetons par seconde
+    - burst: nombre d'appels autorisés d'affilée
+    acquire() réserve un jeton et attend si le seau est vide
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Réserver le jeton (le solde peut devenir négatif: l'attente le rembourse)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+# Politesse envers l'API YouTube: appels par seconde, tous threads confondus (0 = illimité)
+youtube_limiter = RateLimiter(float(os.getenv('YOUTUBE_MAX_QPS', '5')))
@@ -0,0 +1,183 @@
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from . import catalog
+from .db import get_connection, register_column, register_schema
+from .textnorm import tokenize
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Score minimal pour qu'un résultat de recherche soit ajouté (0 = pas de filtre, par défaut)
+# Un titre d'artiste encore inconnu sans mot du vocabulaire n'a que le mot du genre (0.5):
+# un seuil à 1.0 l'écarte, le filtre n'est donc activé que sur demande
+RELEVANCE_THRESHOLD = float(os.getenv('RELEVANCE_THRESHOLD', '0'))
+
+# Vocabulaire malagasy courant dans les titres et descriptions de la scène
+MALAGASY_WORDS = set(tokenize(
+    'gasy malagasy madagasikara madagascar tana tanà antananarivo toamasina tamatave mahajanga '
+    'toliara tulear fianarantsoa antsiranana antsirabe majunga '
+    'tsy ny ary fa ho izy izaho aho ianao anao isika izahay ianareo izareo ity iny eto ao '
+    'koa satria raha mba tsara ratsy kely vaovao taloha androany rahampitso '
+    'hira hiranay fitia fitiavana tia tiako tianao foko zaza tanora tanindrazana '
+    'mpanakanto mpihira tononkira fahiny vazo vazaha gasikara fiainana '
+    'mahery manahirana mandeha mody miaraka mijaly mitady mahita manao mila tena '
+    'sakaiza namana havana rangah ralahy ramose ndao andao'
+))
+
+# Mots du genre (un seul ne suffit pas: le rap français en contient aussi)
+GENRE_WORDS = set(tokenize('rap hiphop hip hop trap drill freestyle cypher boom bap diss punchline'))
+
+# Codes de ville utilisés par la scène (mots-clés "rap 501"...)
+CITY_CODES = {'501', '502', '503', '504', '505', '506', '601', '602', '603', '701', '702', '703',
+              '801', '901'}
+
+# Poids des indices
+TITLE_WORD_WEIGHT = 1.0
+DESCRIPTION_WORD_WEIGHT = 0.5
+MAX_VOCABULARY_SCORE = 3.0
+GENRE_WEIGHT = 0.5
+CITY_CODE_WEIGHT = 1.0
+CHANNEL_WEIGHT = 1.0
+MAX_CHANNEL_SCORE = 3.0
+
+# Écarts oubliés s'ils ne se sont pas reproduits depuis ce délai
+REJECTION_RETENTION = timedelta(days=int(os.getenv('RELEVANCE_REJECTION_RETENTION_DAYS', '30')))
+
+# Résultats écartés, pour ajuster le seuil
+# Une ligne par (vidéo, mot-clé): rejected_at = dernier écart, hits = nombre d'écarts
+register_schema("""
+CREATE TABLE IF NOT EXISTS relevance_rejections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id TEXT NOT NULL,
+    keyword TEXT,
+    title TEXT,
+    channel_title TEXT,
+    score REAL NOT NULL,
+    features TEXT NOT NULL,
+    rejected_at TEXT NOT NULL
+);
+""")
+register_column('relevance_rejections', 'hits', 'INTEGER NOT NULL DEFAULT 1')
+
+def _merge_duplicate_rejections(conn):
+    """Migration: fusionne les lignes répétées des versions précédentes avant l'index unique"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_relevance_rejections_video'"
+    ).fetchone()
+    if exists:
+        return
+    conn.executescript("""
+        UPDATE relevance_rejections SET hits = (
+            SELECT COUNT(*) FROM relevance_rejections AS other
+            WHERE other.video_id = relevance_rejections.video_id
+              AND other.keyword IS relevance_rejections.keyword
+        );
+        DELETE FROM relevance_rejections WHERE id NOT IN (
+            SELECT MAX(id) FROM relevance_rejections GROUP BY video_id, keyword
+        );
+        CREATE UNIQUE INDEX idx_relevance_rejections_video ON relevance_rejections(video_id, keyword);
+        CREATE INDEX IF NOT EXISTS idx_relevance_rejections_recent ON relevance_rejections(rejected_at);
+    """)
+
+register_schema(_merge_duplicate_rejections)
+
+def _score(snippet, channel_videos):
+    title_tokens = set(tokenize(snippet.get('title', '')))
+    description_tokens = set(tokenize(snippet.get('description', ''))) - title_tokens
+
+    title_words = title_tokens & MALAGASY_WORDS
+    description_words = description_tokens & MALAGASY_WORDS
+    vocabulary = min(
+        MAX_VOCABULARY_SCORE,
+        TITLE_WORD_WEIGHT * len(title_words) + DESCRIPTION_WORD_WEIGHT * len(description_words)
+    )
+    genre = GENRE_WEIGHT if title_tokens & GENRE_WORDS else 0.0
+    city = CITY_CODE_WEIGHT if (title_tokens | description_tokens) & CITY_CODES else 0.0
+    channel = min(MAX_CHANNEL_SCORE, CHANNEL_WEIGHT * math.log1p(channel_videos))
+
+    features = {
+        'vocabulary': round(vocabulary, 2),
+        'genre': genre,
+        'city_code': city,
+        'channel': round(channel, 2),
+        'malagasy_words': sorted(title_words | description_words)[:10]
+    }
+    return round(vocabulary + genre + city + channel, 2), features
+
+def score_items(items):
+    """
+    Score de pertinence de résultats de recherche (une page entière en une passe)
+    - Mots malagasy du titre et de la description
+    - Mots du genre, codes de ville
+    - Réputation de la chaîne: vidéos déjà présentes dans le catalogue
+    Retourne {video_id: {'score', 'features'}}
+    """
+    snippets = {}
+    for item in items:
+        video_id = item.get('id', {}).get('videoId')
+        if video_id:
+            snippets[video_id] = item.get('snippet', {})
+
+    # Réputation des chaînes: une seule requête pour toute la page
+    channels = catalog.count_by_channel(snippet.get('channelId') for snippet in snippets.values())
+
+    scores = {}
+    for video_id, snippet in snippets.items():
+        score, features = _score(snippet, channels.get(snippet.get('channelId'), 0))
+        scores[video_id] = {'score': score, 'features': features}
+    return scores
+
+def record_rejections(keyword, rejected):
+    """
+    Journalise les résultats écartés: [(video_id, snippet, {'score', 'features'})]
+    Une vidéo déjà écartée pour ce mot-clé met sa ligne à jour (table bornée par le corpus);
+    les écarts plus vieux que REJECTION_RETENTION sont oubliés
+    """
+    if not rejected:
+        return
+    now = datetime.now()
+    conn = get_connection()
+    with conn:
+        conn.executemany("""
+            INSERT INTO relevance_rejections (
+                video_id, keyword, title, channel_title, score, features, rejected_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(video_id, keyword) DO UPDATE SET
+                title = excluded.title,
+                channel_title = excluded.channel_title,
+                score = excluded.score,
+                features = excluded.features,
+                rejected_at = excluded.rejected_at,
+                hits = hits + 1
+        """, [
+            (
+                video_id,
+                keyword,
+                snippet.get('title'),
+                snippet.get('channelTitle'),
+                scored['score'],
+                json.dumps(scored['features'], ensure_ascii=False),
+                now.isoformat()
+            )
+            for video_id, snippet, scored in rejected
+        ])
+        conn.execute(
+            "DELETE FROM relevance_rejections WHERE rejected_at < ?",
+            ((now - REJECTION_RETENTION).isoformat(),)
+        )
+
+def list_rejections(limit=50):
+    """Derniers résultats écartés, avec le détail du score et le nombre d'écarts"""
+    rows = get_connection().execute(
+        "SELECT * FROM relevance_rejections ORDER BY rejected_at DESC LIMIT ?", (limit,)
+    ).fetchall()
+    rejections = []
+    for row in rows:
+        rejection = dict(row)
+        rejection['features'] = json.loads(rejection['features'])
+        rejections.append(rejection)
+    return rejections
@@ -0,0 +1,156 @@
+import os
+from bisect import bisect_left
+from dotenv import load_dotenv
+
+from . import catalog, insert_queue, quota, shards
+from .quota import QuotaExceededError
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Ordre voulu de la playlist YouTube: un tri de catalog.SORTS (newest, views...)
+# Vide: la playlist garde l'ordre d'ajout
+PLAYLIST_ORDER = os.getenv('PLAYLIST_ORDER', '')
+
+# Unités max consacrées au rangement par mise à jour (50 par déplacement)
+REORDER_MAX_UNITS = int(os.getenv('REORDER_MAX_UNITS', '1000'))
+
+MOVE_COST = quota.QUOTA_COSTS['playlistItems.update']
+
+def longest_increasing_subsequence(values):
+    """Indices d'une plus longue sous-suite strictement croissante de values (O(n log n))"""
+    tails = []          # Plus petite fin d'une sous-suite de chaque longueur
+    tail_indices = []
+    previous = [-1] * len(values)
+
+    for index, value in enumerate(values):
+        length = bisect_left(tails, value)
+        if length == len(tails):
+            tails.append(value)
+            tail_indices.append(index)
+        else:
+            tails[length] = value
+            tail_indices[length] = index
+        previous[index] = tail_indices[length - 1] if length else -1
+
+    indices = []
+    index = tail_indices[-1] if tail_indices else -1
+    while index != -1:
+        indices.append(index)
+        index = previous[index]
+    return indices[::-1]
+
+def plan_moves(current, desired, limit=None):
+    """
+    Déplacements minimaux pour passer de l'ordre current à l'ordre desired (mêmes vidéos)
+    - Les vidéos d'une plus longue sous-suite déjà dans le bon ordre ne bougent pas
+    - Les autres sont placées une à une, dans l'ordre voulu, juste après leur prédécesseur:
+      appliquer seulement les premiers déplacements rapproche quand même de l'ordre voulu
+    Retourne (nombre total de déplacements, [(video_id, position)] limités à limit)
+    Chaque position est celle à envoyer à playlistItems.update, les précédents déjà appliqués
+    """
+    rank = {video_id: index for index, video_id in enumerate(desired)}
+    stable = {current[index] for index in longest_increasing_subsequence([rank[v] for v in current])}
+    total = len(current) - len(stable)
+
+    order = list(current)
+    moves = []
+    for index, video_id in enumerate(desired):
+        if limit is not None and len(moves) >= limit:
+            break
+        if video_id in stable:
+            continue
+        order.remove(video_id)
+        position = order.index(desired[index - 1]) + 1 if index else 0
+        order.insert(position, video_id)
+        moves.append((video_id, position))
+
+    return total, moves
+
+def plan(primary_id, sort=PLAYLIST_ORDER):
+    """Déplacements nécessaires par playlist (shard) pour suivre le tri, sans appel API"""
+    playlists = []
+    for shard in shards.list_shards(primary_id):
+        current = [row['video_id'] for row in catalog.list_playlist_order(shard['playlist_id'], primary_id)]
+        desired = [row['video_id'] for row in catalog.list_playlist_order(shard['playlist_id'], primary_id, sort)]
+        total, _ = plan_moves(current, desired, limit=0)
+        playlists.append({
+            'playlist_id': shard['playlist_id'],
+            'videos': len(current),
+            'moves': total,
+            'units': total * MOVE_COST
+        })
+
+    moves = sum(playlist['moves'] for playlist in playlists)
+    return {
+        'sort': sort,
+        'moves': moves,
+        'units': moves * MOVE_COST,
+        'playlists': playlists
+    }
+
+def _reorder_shard(youtube, playlist_id, primary_id, sort, max_moves):
+    rows = catalog.list_playlist_order(playlist_id, primary_id)
+    items = {row['video_id']: row['playlist_item_id'] for row in rows}
+    current = [row['video_id'] for row in rows]
+    desired = [row['video_id'] for row in catalog.list_playlist_order(playlist_id, primary_id, sort)]
+    total, moves = plan_moves(current, desired, limit=max_moves)
+
+    order = current
+    applied = 0
+    try:
+        for video_id, position in moves:
+            try:
+                quota.execute(youtube.playlistItems().update(
+                    part='snippet',
+                    body={
+                        'id': items[video_id],
+                        'snippet': {
+                            'playlistId': playlist_id,
+                            'resourceId': {'kind': 'youtube#video', 'videoId': video_id},
+                            'position': position
+                        }
+                    }
+                ))
+            except QuotaExceededError:
+                raise
+            except Exception as e:
+                # Catalogue en retard sur la playlist: la prochaine synchro corrigera le plan
+                print(f"DEBUG: Déplacement de {video_id} impossible: {str(e)}")
+                break
+            order.remove(video_id)
+            order.insert(position, video_id)
+            applied += 1
+    finally:
+        if applied:
+            catalog.set_positions(order, shards.offset_of(playlist_id))
+
+    return {'playlist_id': playlist_id, 'moves': total, 'applied': applied}
+
+def reorder_playlist(youtube, primary_id, sort=PLAYLIST_ORDER, max_units=REORDER_MAX_UNITS):
+    """
+    Range la playlist (chaque shard séparément) selon un tri de catalog.SORTS
+    - Nombre minimal de playlistItems.update (50 unités chacun), plafonné par max_units
+      et par le quota restant: le reste est fait aux passages suivants
+    - Positions du catalogue mises à jour au fur et à mesure
+    Lève QuotaExceededError (les déplacements faits sont gardés)
+    """
+    budget = min(max_units, quota.remaining()) // MOVE_COST
+    results = []
+
+    # Un ajout pendant le rangement décalerait les positions calculées
+    with insert_queue.insert_lock:
+        for shard in shards.list_shards(primary_id):
+            # Budget épuisé: le shard est seulement évalué (déplacements restants)
+            result = _reorder_shard(youtube, shard['playlist_id'], primary_id, sort, max(0, budget))
+            budget -= result['applied']
+            results.append(result)
+
+    applied = sum(result['applied'] for result in results)
+    return {
+        'sort': sort,
+        'applied': applied,
+        'units': applied * MOVE_COST,
+        'remaining': sum(result['moves'] for result in results) - applied,
+        'playlists': results
+    }
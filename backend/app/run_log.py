@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from logging.handlers import MemoryHandler, RotatingFileHandler
+from dotenv import load_dotenv
+
+from . import events
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Journal structuré des mises à jour (une entrée JSON par ligne)
+RUN_LOG_FILE = os.getenv('RUN_LOG_FILE', 'logs/auto_update.jsonl')
+
+# Rotation par taille: auto_update.jsonl, .1, .2, .3
+RUN_LOG_MAX_BYTES = int(os.getenv('RUN_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+RUN_LOG_BACKUPS = 3
+
+# Entrées gardées en mémoire avant écriture (les erreurs sont écrites tout de suite)
+BUFFER_CAPACITY = 200
+
+_lock = threading.Lock()
+_logger = None
+
+class JsonLinesFormatter(logging.Formatter):
+    """{"ts": ..., "level": ..., "event": ..., "message": ..., <champs>}"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='seconds'),
+            'level': record.levelname.lower(),
+            'event': getattr(record, 'event', 'message')
+        }
+        message = record.getMessage()
+        if message:
+            entry['message'] = message
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def get_logger():
+    """Logger du journal (fichier ouvert une fois, écritures groupées)"""
+    global _logger
+
+    if _logger is None:
+        with _lock:
+            if _logger is None:
+                directory = os.path.dirname(RUN_LOG_FILE)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+                file_handler = RotatingFileHandler(
+                    RUN_LOG_FILE,
+                    maxBytes=RUN_LOG_MAX_BYTES,
+                    backupCount=RUN_LOG_BACKUPS,
+                    encoding='utf-8',
+                    delay=True
+                )
+                file_handler.setFormatter(JsonLinesFormatter())
+
+                logger = logging.getLogger('rapstream.runs')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(MemoryHandler(
+                    BUFFER_CAPACITY, flushLevel=logging.ERROR, target=file_handler
+                ))
+                _logger = logger
+
+    return _logger
+
+def log_event(event, message='', level=logging.INFO, **fields):
+    """
+    Ajoute une entrée au journal (écrite au plus tard au prochain flush)
+    et la diffuse tout de suite aux abonnés de /api/events
+    """
+    get_logger().log(level, message, extra={'event': event, 'fields': fields})
+    events.publish(event, message=message, level=logging.getLevelName(level), **fields)
+
+def flush():
+    """Écrit les entrées en attente (fin de mise à jour)"""
+    for handler in get_logger().handlers:
+        handler.flush()
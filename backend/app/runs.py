@@ -0,0 +1,94 @@
+import json
+from datetime import datetime
+
+from .db import get_connection, register_schema
+from .keyword_stats import list_run_keywords
+
+# Historique des mises à jour automatiques (le détail par mot-clé est dans keyword_runs)
+register_schema("""
+CREATE TABLE IF NOT EXISTS update_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    status TEXT NOT NULL,
+    keywords INTEGER NOT NULL DEFAULT 0,
+    added INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    quota_used INTEGER,
+    duration_seconds REAL,
+    error TEXT,
+    summary TEXT
+);
+""")
+
+def start_run(keywords=0):
+    """Crée l'enregistrement d'une mise à jour et retourne son ID"""
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO update_runs (started_at, status, keywords) VALUES (?, 'running', ?)",
+            (datetime.now().isoformat(), keywords)
+        )
+    return cursor.lastrowid
+
+def finish_run(run_id, status, summary=None, quota_used=None, error=None):
+    """Clôt une mise à jour avec ses totaux"""
+    summary = summary or {}
+    conn = get_connection()
+    row = conn.execute("SELECT started_at FROM update_runs WHERE id = ?", (run_id,)).fetchone()
+    now = datetime.now()
+    duration = (now - datetime.fromisoformat(row['started_at'])).total_seconds() if row else None
+
+    with conn:
+        conn.execute("""
+            UPDATE update_runs SET
+                finished_at = ?, status = ?, added = ?, skipped = ?, errors = ?,
+                quota_used = ?, duration_seconds = ?, error = ?, summary = ?
+            WHERE id = ?
+        """, (
+            now.isoformat(),
+            status,
+            summary.get('added', 0),
+            summary.get('skipped', 0),
+            summary.get('errors', 0),
+            quota_used,
+            duration,
+            error,
+            json.dumps(summary, default=str),
+            run_id
+        ))
+
+def _to_api_run(row):
+    run = dict(row)
+    run['summary'] = json.loads(run['summary']) if run['summary'] else None
+    return run
+
+def list_runs(before=None, limit=20):
+    """Mises à jour les plus récentes d'abord; before: ID de la dernière vue (page suivante)"""
+    conn = get_connection()
+    if before:
+        rows = conn.execute(
+            "SELECT * FROM update_runs WHERE id < ? ORDER BY id DESC LIMIT ?", (before, limit)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM update_runs ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [_to_api_run(row) for row in rows]
+
+def get_run(run_id):
+    """Une mise à jour avec le résultat de chacun de ses mots-clés"""
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM update_runs WHERE id = ?", (run_id,)).fetchone()
+    if row is None:
+        return None
+
+    run = _to_api_run(row)
+    run['keywords_detail'] = list_run_keywords(run_id)
+    return run
+
+def last_started_at():
+    """Début de la dernière mise à jour (tous process confondus), None s'il n'y en a jamais eu"""
+    row = get_connection().execute("SELECT MAX(started_at) AS t FROM update_runs").fetchone()
+    return datetime.fromisoformat(row['t']) if row['t'] else None
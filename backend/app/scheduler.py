@@ -0,0 +1,224 @@
+import asyncio
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from . import runs
+from .db import get_connection, register_schema, transaction
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Mises à jour automatiques lancées par l'API (false si seul le cron GitHub Actions s'en charge)
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Intervalle entre deux mises à jour, compté depuis le début de la précédente
+UPDATE_INTERVAL = timedelta(hours=float(os.getenv('UPDATE_INTERVAL_HOURS', '3')))
+
+# Délai aléatoire ajouté à chaque échéance: les process démarrés ensemble ne se réveillent pas en même temps
+SCHEDULER_JITTER_SECONDS = int(os.getenv('SCHEDULER_JITTER_MINUTES', '10')) * 60
+
+# Délai minimal après le démarrage de l'API avant une mise à jour (démarrage jamais ralenti)
+SCHEDULER_STARTUP_DELAY = int(os.getenv('SCHEDULER_STARTUP_DELAY_MINUTES', '2')) * 60
+
+# Bail de la mise à jour: prolongé tant qu'elle tourne, repris par un autre process à expiration
+# (process tué en pleine mise à jour)
+UPDATE_LEASE_TTL = timedelta(seconds=int(os.getenv('UPDATE_LEASE_TTL_SECONDS', '600')))
+
+# Mise à jour commencée ailleurs depuis moins longtemps: inutile d'en relancer une
+MIN_RUN_GAP = UPDATE_INTERVAL / 2
+
+# Attente minimale entre deux réveils (mise à jour sautée, échéance déjà passée)
+MIN_WAKEUP_SECONDS = 60
+
+LEASE_NAME = 'automatic_update'
+
+# Identifiant de ce process dans les baux (plusieurs workers uvicorn, cron)
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Baux entre process partageant la base (un par tâche exclusive)
+register_schema("""
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    acquired_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+""")
+
+def acquire_lease(name=LEASE_NAME, owner=OWNER, ttl=UPDATE_LEASE_TTL):
+    """Prend le bail s'il est libre, expiré ou déjà à nous (atomique entre process)"""
+    now = datetime.now()
+    with transaction() as conn:
+        row = conn.execute(
+            "SELECT owner, expires_at FROM scheduler_leases WHERE name = ?", (name,)
+        ).fetchone()
+        if row and row['owner'] != owner and row['expires_at'] > now.isoformat():
+            return False
+        conn.execute("""
+            INSERT INTO scheduler_leases (name, owner, acquired_at, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                owner = excluded.owner,
+                acquired_at = excluded.acquired_at,
+                expires_at = excluded.expires_at
+        """, (name, owner, now.isoformat(), (now + ttl).isoformat()))
+    return True
+
+def renew_lease(name=LEASE_NAME, owner=OWNER, ttl=UPDATE_LEASE_TTL):
+    """Prolonge le bail; False s'il a été perdu (expiré puis repris par un autre process)"""
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute(
+            "UPDATE scheduler_leases SET expires_at = ? WHERE name = ? AND owner = ?",
+            ((datetime.now() + ttl).isoformat(), name, owner)
+        )
+    return cursor.rowcount > 0
+
+def release_lease(name=LEASE_NAME, owner=OWNER):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM scheduler_leases WHERE name = ? AND owner = ?", (name, owner))
+
+def get_lease(name=LEASE_NAME):
+    """Bail en cours (None s'il est libre ou expiré)"""
+    row = get_connection().execute(
+        "SELECT * FROM scheduler_leases WHERE name = ? AND expires_at > ?",
+        (name, datetime.now().isoformat())
+    ).fetchone()
+    return dict(row) if row else None
+
+def _heartbeat(stop, lost):
+    """
+    Prolonge le bail pendant la mise à jour (thread à part: le crawl ne s'en occupe pas)
+    Bail perdu (repris par un autre process, ou pas prolongé avant son expiration): lève lost,
+    la mise à jour s'arrête pour ne pas tourner en même temps que l'autre
+    """
+    renewed = datetime.now()
+    while not stop.wait(UPDATE_LEASE_TTL.total_seconds() / 3):
+        try:
+            if not renew_lease():
+                print("DEBUG: Bail de mise à jour perdu (repris par un autre process)")
+                lost.set()
+                return
+            renewed = datetime.now()
+        except Exception as e:
+            print(f"DEBUG: Prolongation du bail impossible: {str(e)}")
+            if datetime.now() - renewed >= UPDATE_LEASE_TTL:
+                print("DEBUG: Bail de mise à jour expiré")
+                lost.set()
+                return
+
+def run_update(force=False):
+    """
+    Mise à jour automatique exclusive: un seul process à la fois parmi ceux qui partagent la base
+    - Sautée si une autre est en cours (bail pris) ou a commencé il y a moins de MIN_RUN_GAP
+    - force: ignorer MIN_RUN_GAP (lancement manuel)
+    - Bail perdu en cours de route: la mise à jour s'arrête au prochain mot-clé ou chaîne
+    Retourne les stats de automatic_update, None si sautée
+    """
+    from .auto_update import automatic_update, log_update
+
+    if not acquire_lease():
+        lease = get_lease() or {}
+        log_update(
+            f"⏭️ Mise à jour sautée: déjà en cours ({lease.get('owner')})",
+            event='run_skipped',
+            reason='running',
+            owner=lease.get('owner')
+        )
+        return None
+
+    stop = threading.Event()
+    lost = threading.Event()
+    try:
+        last = runs.last_started_at()
+        if not force and last and datetime.now() - last < MIN_RUN_GAP:
+            log_update(
+                f"⏭️ Mise à jour sautée: la précédente a commencé à {last.strftime('%H:%M')}",
+                event='run_skipped',
+                reason='recent',
+                last_started_at=last.isoformat()
+            )
+            return None
+
+        threading.Thread(target=_heartbeat, args=(stop, lost), daemon=True).start()
+        return automatic_update(abort=lost)
+    finally:
+        stop.set()
+        release_lease()
+
+def next_run_at(minimum_delay=0):
+    """Prochaine échéance: début de la dernière mise à jour + UPDATE_INTERVAL (jitter non compris)"""
+    earliest = datetime.now() + timedelta(seconds=minimum_delay)
+    last = runs.last_started_at()
+    if last is None:
+        return earliest
+    return max(earliest, last + UPDATE_INTERVAL)
+
+async def _run_in_thread(func):
+    """
+    Exécute func dans un thread daemon et attend son résultat
+    (un arrêt de l'API n'attend pas la fin du crawl: la file d'ajouts reprend au passage suivant)
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def settle(outcome):
+        if not done.done():
+            done.set_result(outcome)
+
+    def target():
+        try:
+            outcome = (func(), None)
+        except Exception as e:
+            outcome = (None, e)
+        try:
+            loop.call_soon_threadsafe(settle, outcome)
+        except RuntimeError:
+            pass  # Boucle fermée: l'API s'est arrêtée entre-temps
+
+    threading.Thread(target=target, name='auto-update', daemon=True).start()
+    result, error = await done
+    if error:
+        raise error
+    return result
+
+async def run_scheduler():
+    """
+    Boucle du scheduler (tâche asyncio du lifespan de l'API)
+    Attend l'échéance (plus un jitter), puis lance run_update dans un thread
+    Pas de mise à jour au démarrage: la première attend au moins SCHEDULER_STARTUP_DELAY
+    """
+    minimum_delay = SCHEDULER_STARTUP_DELAY
+    while True:
+        try:
+            due = next_run_at(minimum_delay)
+        except Exception as e:
+            print(f"DEBUG: Échéance de mise à jour inconnue: {str(e)}")
+            due = datetime.now()
+        delay = max(MIN_WAKEUP_SECONDS, (due - datetime.now()).total_seconds())
+        delay += random.uniform(0, SCHEDULER_JITTER_SECONDS)
+        print(f"DEBUG: Prochaine mise à jour vers {(datetime.now() + timedelta(seconds=delay)):%H:%M:%S}")
+        await asyncio.sleep(delay)
+
+        try:
+            await _run_in_thread(run_update)
+        except Exception as e:
+            print(f"DEBUG: Mise à jour planifiée en échec: {str(e)}")
+        minimum_delay = 0
+
+def get_status():
+    """État du scheduler (exposé par /api/scheduler)"""
+    last = runs.last_started_at()
+    return {
+        'enabled': SCHEDULER_ENABLED,
+        'interval_hours': UPDATE_INTERVAL.total_seconds() / 3600,
+        'last_started_at': last.isoformat() if last else None,
+        'next_run_at': next_run_at().isoformat(),
+        'lease': get_lease(),
+        'owner': OWNER
+    }
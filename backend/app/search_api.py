@@ -1,114 +1,264 @@
-from googleapiclient.discovery import build
 from datetime import datetime
-import re
 
-def parse_duration(duration_str):
-    """Parse une durée YouTube au format ISO 8601"""
-    try:
-        match = re.match(r'PT(\d+H)?(\d+M)?(\d+S)?', duration_str)
-        if not match:
-            return 0
-        
-        hours = int(match.group(1)[:-1]) if match.group(1) else 0
-        minutes = int(match.group(2)[:-1]) if match.group(2) else 0
-        seconds = int(match.group(3)[:-1]) if match.group(3) else 0
-        
-        return hours * 3600 + minutes * 60 + seconds
-    except:
-        return 0
+from . import events, insert_queue, membership, near_duplicates, relevance, run_log
+from .quota import QuotaExceededError
+from .crawl_state import latest_published_at, oldest_published_at
+from .search_cache import cached_search
+from .video_details import get_video_details, parse_duration
 
-def search_and_add_videos_with_api(youtube, playlist_id, keywords, max_results=50):
+def add_candidates(youtube, playlist_id, items, label, seen=None, progress=None):
     """
-    Recherche et ajoute avec clé API (pour production/Render)
+    Filtre et ajoute à la playlist des vidéos candidates (résultats de recherche,
+    nouveautés d'une chaîne...) au format search().list: {'id': {'videoId'}, 'snippet'}
+    - label: origine des candidats (mot-clé, chaîne) pour les journaux
+    - seen: vidéos déjà traitées pendant ce passage (SeenVideos)
     """
-    try:
-        request = youtube.search().list(
-            q=keywords,
-            part='snippet',
-            type='video',
-            maxResults=max_results,
-            relevanceLanguage='fr',
-            order='relevance'
+    progress = progress or (lambda stage, done=0, total=0: None)
+    
+    # Suivi en direct (/api/events): un événement par candidat traité et son sort
+    # (pas pour les vidéos déjà vues ce passage: compteur du mot-clé seulement)
+    def report(status, item, **fields):
+        events.publish(
+            'video',
+            video_id=item['id']['videoId'],
+            title=item.get('snippet', {}).get('title'),
+            source=label,
+            status=status,
+            **fields
         )
-        response = request.execute()
-        
-        added_count = 0
-        skipped_count = 0
-        error_count = 0
-        too_short_count = 0
-        added_videos = []
-        
-        items = response.get('items', [])
-        print(f"DEBUG: Trouvé {len(items)} items pour '{keywords}'")
-        
+    
+    added_count = 0
+    skipped_count = 0
+    error_count = 0
+    too_short_count = 0
+    off_topic_count = 0
+    queued_count = 0
+    added_videos = []
+    quota_exceeded = False
+    
+    print(f"DEBUG: Trouvé {len(items)} items pour '{label}'")
+    
+    # Ignorer les vidéos déjà traitées par un autre mot-clé pendant ce passage
+    already_seen_count = 0
+    candidates = items
+    if seen is not None:
+        candidates = []
         for item in items:
-            item_id = item.get('id', {})
-            video_id = item_id.get('videoId')
-            
-            if not video_id:
+            video_id = item.get('id', {}).get('videoId')
+            if video_id and not seen.claim(video_id):
+                already_seen_count += 1
                 continue
-            
-            # Filtrer par durée
-            try:
-                video_details = youtube.videos().list(
-                    id=video_id,
-                    part='contentDetails'
-                ).execute()
-                
-                if not video_details.get('items'):
-                    error_count += 1
-                    continue
-                
-                duration_str = video_details['items'][0]['contentDetails']['duration']
-                total_seconds = parse_duration(duration_str)
-                
-                if total_seconds < 120:
-                    too_short_count += 1
-                    continue
-                
-            except Exception as e:
-                print(f"DEBUG: Erreur durée: {str(e)}")
+            candidates.append(item)
+    
+    # Index partagé des vidéos déjà dans la playlist (aucun appel API)
+    index = membership.get_index()
+    
+    # Index des titres du catalogue (autres mises en ligne d'un même morceau)
+    near_dup_mode = near_duplicates.NEAR_DUP_MODE
+    near_duplicate_videos = []
+    if near_dup_mode != 'off':
+        near_duplicates.sync_index()
+    
+    # Écarter les résultats hors sujet avant toute dépense (durées, ajout): une passe par page
+    new_items = [
+        item for item in candidates
+        if item.get('id', {}).get('videoId') and not index.contains(item['id']['videoId'])
+    ]
+    off_topic = set()
+    if relevance.RELEVANCE_THRESHOLD > 0:
+        scores = relevance.score_items(new_items)
+        rejected = [
+            (item['id']['videoId'], item.get('snippet', {}), scores[item['id']['videoId']])
+            for item in new_items
+            if scores[item['id']['videoId']]['score'] < relevance.RELEVANCE_THRESHOLD
+        ]
+        relevance.record_rejections(label, rejected)
+        off_topic = {video_id for video_id, _, _ in rejected}
+        if off_topic:
+            run_log.log_event(
+                'off_topic',
+                f"{len(off_topic)} résultats hors sujet écartés pour '{label}'",
+                source=label,
+                count=len(off_topic)
+            )
+    
+    progress('details', 0, len(candidates))
+    
+    # Résoudre les durées des nouveaux candidats en une fois (paquets de 50, avec cache)
+    try:
+        details = get_video_details(
+            youtube,
+            [item['id']['videoId'] for item in new_items if item['id']['videoId'] not in off_topic]
+        )
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        print(f"DEBUG: Erreur durée: {str(e)}")
+        details = None
+    
+    for position, item in enumerate(candidates):
+        progress('adding', position, len(candidates))
+        item_id = item.get('id', {})
+        video_id = item_id.get('videoId')
+    
+        if not video_id:
+            continue
+    
+        # Déjà dans la playlist (ou ajoutée par un mot-clé précédent)
+        if index.contains(video_id):
+            skipped_count += 1
+            report('duplicate', item)
+            continue
+    
+        if video_id in off_topic:
+            off_topic_count += 1
+            report('off_topic', item)
+            continue
+    
+        # Filtrer par durée
+        if details is None or video_id not in details:
+            error_count += 1
+            report('error', item, error="Durée inconnue")
+            continue
+    
+        duration = details[video_id]['duration_seconds']
+        if duration < 120:
+            too_short_count += 1
+            report('too_short', item, duration=duration)
+            continue
+    
+        snippet = item.get('snippet', {})
+        title = snippet.get('title', 'Sans titre')
+        channel = snippet.get('channelTitle', 'Inconnu')
+    
+        # Version lyrics / audio / ré-upload d'un morceau déjà dans la playlist:
+        # détecté avant de dépenser 50 unités pour l'ajout
+        duplicate = None
+        if near_dup_mode != 'off':
+            duplicate = near_duplicates.find_duplicate(title, duration, exclude=video_id)
+        if duplicate:
+            run_log.log_event(
+                'near_duplicate',
+                f"Quasi-doublon '{title}' ~ '{duplicate['title']}'",
+                source=label,
+                video_id=video_id,
+                duplicate_of=duplicate['video_id']
+            )
+            near_duplicate_videos.append({
+                'id': video_id,
+                'title': title,
+                'duplicate_of': duplicate['video_id']
+            })
+            if near_dup_mode == 'skip':
+                report('near_duplicate', item, duplicate_of=duplicate['video_id'])
+                continue
+    
+        # Vidéo acceptée: inscrite dans la file persistante avant l'appel API,
+        # un ajout qui échoue (5xx, quota, arrêt) est réessayé par insert_queue.drain
+        insert_queue.enqueue(playlist_id, video_id, snippet, duration, label)
+        if quota_exceeded:
+            queued_count += 1
+            report('queued', item)
+            continue
+    
+        try:
+            outcome = insert_queue.try_insert(youtube, video_id, index)
+            if outcome == 'present':
+                # Ajoutée entre-temps par un autre mot-clé en parallèle
+                skipped_count += 1
+                report('duplicate', item)
+                continue
+            if outcome == 'failed':
                 error_count += 1
+                report('error', item, error="Ajout refusé par YouTube")
                 continue
+            if outcome != 'added':
+                queued_count += 1
+                report('queued', item)
+                continue
+    
+            added_videos.append({
+                'id': video_id,
+                'title': title,
+                'channel': channel,
+                'duplicate_of': duplicate['video_id'] if duplicate else None,
+                'timestamp': datetime.now().isoformat()
+            })
+            added_count += 1
+            report('inserted', item, duplicate_of=duplicate['video_id'] if duplicate else None)
+    
+        except QuotaExceededError:
+            # Inutile de tenter les suivants: ils sont seulement mis en file pour la remise à zéro
+            quota_exceeded = True
+            queued_count += 1
+            report('queued', item, error="Quota épuisé")
+            run_log.log_event('insert_deferred', f"Quota épuisé, ajouts mis en file pour '{label}'", source=label)
+    
+    return {
+        'added': added_count,
+        'skipped': skipped_count,
+        'errors': error_count,
+        'too_short': too_short_count,
+        'off_topic': off_topic_count,
+        'queued': queued_count,
+        'already_seen': already_seen_count,
+        'near_duplicates': len(near_duplicate_videos),
+        'near_duplicate_videos': near_duplicate_videos,
+        'quota_exceeded': quota_exceeded,
+        'videos': added_videos
+    }
+
+def search_and_add_videos_with_api(youtube, playlist_id, keywords, max_results=50,
+                                   published_after=None, max_pages=1, seen=None, progress=None,
+                                   published_before=None):
+    """
+    Recherche et ajoute avec clé API (pour production/Render)
+    - published_after: recherche incrémentale (vidéos publiées après cette date, triées par date)
+    - published_before: borne haute (rattrapage d'une tranche non lue)
+    - max_pages: nombre de pages de résultats à suivre (100 unités par page)
+    - seen: vidéos déjà traitées par un autre mot-clé du même passage (SeenVideos)
+    - progress(stage, done, total): avancement (jobs de recherche manuelle)
+    """
+    progress = progress or (lambda stage, done=0, total=0: None)
+    try:
+        search_params = {
+            'q': keywords,
+            'part': 'snippet',
+            'type': 'video',
+            'maxResults': max_results,
+            'relevanceLanguage': 'fr',
+            'order': 'relevance'
+        }
+        if published_after:
+            search_params['order'] = 'date'
+            search_params['publishedAfter'] = published_after
+        if published_before:
+            search_params['order'] = 'date'
+            search_params['publishedBefore'] = published_before
+        
+        items = []
+        page_token = None
+        pages = 0
+        while pages < max_pages:
+            progress('search', pages, max_pages)
+            response = cached_search(youtube, **search_params, pageToken=page_token)
+            items.extend(response.get('items', []))
+            pages += 1
             
-            snippet = item.get('snippet', {})
-            title = snippet.get('title', 'Sans titre')
-            channel = snippet.get('channelTitle', 'Inconnu')
-            
-            try:
-                youtube.playlistItems().insert(
-                    part='snippet',
-                    body={
-                        'snippet': {
-                            'playlistId': playlist_id,
-                            'resourceId': {
-                                'kind': 'youtube#video',
-                                'videoId': video_id
-                            }
-                        }
-                    }
-                ).execute()
-                
-                added_videos.append({
-                    'id': video_id,
-                    'title': title,
-                    'channel': channel,
-                    'timestamp': datetime.now().isoformat()
-                })
-                added_count += 1
-                
-            except Exception as e:
-                if 'duplicate' in str(e).lower():
-                    skipped_count += 1
-                else:
-                    error_count += 1
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
         
-        return {
-            'added': added_count,
-            'skipped': skipped_count,
-            'errors': error_count,
-            'videos': added_videos
-        }
+        events.publish('searched', keyword=keywords, pages=pages, results=len(items))
+        
+        result = add_candidates(youtube, playlist_id, items, keywords, seen, progress)
+        result['latest_published_at'] = latest_published_at(items)
+        result['oldest_published_at'] = oldest_published_at(items)
+        # Aucune page lue (max_pages=0): rien ne prouve que la fenêtre est complète
+        result['truncated'] = page_token is not None or pages == 0
+        return result
     
+    except QuotaExceededError:
+        raise
     except Exception as e:
         raise Exception(f"Erreur: {str(e)}")
\ No newline at end of file
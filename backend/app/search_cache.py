@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from . import quota
+from .db import get_connection, register_schema
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Durée de vie d'une réponse search().list (plus courte que la période du scheduler:
+# chaque passage planifié relit YouTube, les relances et recherches manuelles profitent du cache)
+SEARCH_CACHE_TTL = timedelta(minutes=int(os.getenv('SEARCH_CACHE_TTL_MINUTES', '120')))
+
+# Réponses de recherche (100 unités chacune) partagées entre threads et process
+register_schema("""
+CREATE TABLE IF NOT EXISTS search_cache (
+    cache_key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+""")
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+def cache_key(params):
+    """
+    Clé normalisée des paramètres de recherche
+    'Rap  Gasy' et 'rap gasy' donnent la même requête YouTube, donc la même clé
+    """
+    normalized = {key: value for key, value in params.items() if value is not None}
+    if 'q' in normalized:
+        normalized['q'] = ' '.join(normalized['q'].lower().split())
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def get_stats():
+    """Compteurs du cache depuis le démarrage du process"""
+    with _stats_lock:
+        return dict(_stats)
+
+def cached_search(youtube, **params):
+    """
+    search().list avec cache TTL
+    Un appel identique (même mot-clé normalisé, même page, même fenêtre) ne coûte rien
+    """
+    key = cache_key(params)
+    min_fetched_at = (datetime.now() - SEARCH_CACHE_TTL).isoformat()
+    conn = get_connection()
+
+    row = conn.execute(
+        "SELECT response FROM search_cache WHERE cache_key = ? AND fetched_at >= ?",
+        (key, min_fetched_at)
+    ).fetchone()
+    if row:
+        _count('hits')
+        return json.loads(row['response'])
+
+    _count('misses')
+    response = quota.execute(youtube.search().list(**params))
+
+    with conn:
+        conn.execute("DELETE FROM search_cache WHERE fetched_at < ?", (min_fetched_at,))
+        conn.execute("""
+            INSERT INTO search_cache (cache_key, response, fetched_at) VALUES (?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                response = excluded.response,
+                fetched_at = excluded.fetched_at
+        """, (key, json.dumps(response), datetime.now().isoformat()))
+
+    return response
+
+class SeenVideos:
+    """
+    Vidéos déjà traitées pendant un passage de la mise à jour
+    Partagé entre les mots-clés (threads): une vidéo trouvée par plusieurs recherches
+    n'est vérifiée qu'une fois
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self.checked = 0
+        self.duplicates = 0
+
+    def claim(self, video_id):
+        """Vrai si la vidéo n'a pas encore été vue pendant ce passage"""
+        with self._lock:
+            self.checked += 1
+            if video_id in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen.add(video_id)
+            return True
+
+    def get_stats(self):
+        with self._lock:
+            return {'checked': self.checked, 'duplicates': self.duplicates}
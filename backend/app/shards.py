@@ -0,0 +1,185 @@
+import os
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+from . import catalog, quota
+from .db import get_connection, register_schema, transaction
+from .textnorm import tokenize
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Répartition des vidéos entre plusieurs playlists YouTube (vues comme un seul catalogue)
+# size: remplir une playlist puis ouvrir la suivante | year: année de publication
+# genre: sous-genre du titre | none: tout dans PLAYLIST_ID
+PLAYLIST_SHARDING = os.getenv('PLAYLIST_SHARDING', 'size')
+
+# Limite YouTube d'éléments par playlist, et remplissage visé (marge pour les ajouts en cours)
+MAX_PLAYLIST_ITEMS = 5000
+PLAYLIST_SHARD_SIZE = int(os.getenv('PLAYLIST_SHARD_SIZE', '4900'))
+
+# Playlists déjà créées à utiliser comme shards: "2024:PLxxx,drill:PLyyy"
+PLAYLIST_SHARDS = os.getenv('PLAYLIST_SHARDS', '')
+
+# Création automatique des shards manquants (playlists.insert, 50 unités, client OAuth)
+PLAYLIST_SHARD_AUTO_CREATE = os.getenv('PLAYLIST_SHARD_AUTO_CREATE', 'true').lower() in ('1', 'true', 'yes')
+PLAYLIST_SHARD_TITLE = os.getenv('PLAYLIST_SHARD_TITLE', 'RAP Gasy')
+
+# Sous-genres (stratégie genre), par priorité: le premier mot trouvé dans le titre l'emporte
+GENRE_SHARDS = [
+    ('drill', set(tokenize('drill'))),
+    ('trap', set(tokenize('trap'))),
+    ('freestyle', set(tokenize('freestyle cypher'))),
+    ('boombap', set(tokenize('bap'))),
+]
+
+# Clé du shard principal (PLAYLIST_ID) et des vidéos sans année ni sous-genre
+DEFAULT_KEY = '*'
+
+# Shards: PLAYLIST_ID (ordinal 0) puis les playlists ouvertes ensuite
+# ordinal: ordre dans le catalogue logique (positions décalées de ordinal * MAX_PLAYLIST_ITEMS)
+register_schema("""
+CREATE TABLE IF NOT EXISTS playlist_shards (
+    playlist_id TEXT PRIMARY KEY,
+    shard_key TEXT NOT NULL,
+    part INTEGER NOT NULL DEFAULT 1,
+    ordinal INTEGER NOT NULL UNIQUE,
+    title TEXT,
+    full INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+""")
+
+_lock = threading.Lock()
+
+def _register(conn, playlist_id, key, part=1, title=None):
+    ordinal = conn.execute(
+        "SELECT COALESCE(MAX(ordinal) + 1, 0) AS n FROM playlist_shards"
+    ).fetchone()['n']
+    conn.execute("""
+        INSERT OR IGNORE INTO playlist_shards (playlist_id, shard_key, part, ordinal, title, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (playlist_id, key, part, ordinal, title, datetime.now().isoformat()))
+
+def _ensure_registered(primary_id):
+    """PLAYLIST_ID en shard 0, puis les playlists déclarées dans PLAYLIST_SHARDS"""
+    conn = get_connection()
+    known = {row['playlist_id'] for row in conn.execute("SELECT playlist_id FROM playlist_shards")}
+    configured = [
+        entry.split(':', 1) for entry in PLAYLIST_SHARDS.split(',') if ':' in entry
+    ]
+    if primary_id in known and all(playlist_id.strip() in known for _, playlist_id in configured):
+        return
+
+    with transaction() as conn:
+        if not conn.execute("SELECT 1 FROM playlist_shards WHERE ordinal = 0").fetchone():
+            _register(conn, primary_id, DEFAULT_KEY)
+        for key, playlist_id in configured:
+            _register(conn, playlist_id.strip(), key.strip())
+
+def list_shards(primary_id):
+    """Shards dans l'ordre du catalogue, avec leur nombre de vidéos"""
+    if PLAYLIST_SHARDING == 'none':
+        return [{
+            'playlist_id': primary_id, 'shard_key': DEFAULT_KEY, 'part': 1, 'ordinal': 0,
+            'title': None, 'full': 0, 'offset': 0, 'videos': catalog.count_videos()
+        }]
+
+    _ensure_registered(primary_id)
+    counts = catalog.count_by_playlist(primary_id)
+    shards = []
+    for row in get_connection().execute("SELECT * FROM playlist_shards ORDER BY ordinal"):
+        shard = dict(row)
+        shard['offset'] = shard['ordinal'] * MAX_PLAYLIST_ITEMS
+        shard['videos'] = counts.get(shard['playlist_id'], 0)
+        shards.append(shard)
+    return shards
+
+def playlists(primary_id):
+    """{playlist_id: décalage de position dans le catalogue logique}"""
+    return {shard['playlist_id']: shard['offset'] for shard in list_shards(primary_id)}
+
+def offset_of(playlist_id):
+    """Décalage de position d'une playlist (0 pour PLAYLIST_ID ou une playlist inconnue)"""
+    row = get_connection().execute(
+        "SELECT ordinal FROM playlist_shards WHERE playlist_id = ?", (playlist_id,)
+    ).fetchone()
+    return row['ordinal'] * MAX_PLAYLIST_ITEMS if row else 0
+
+def shard_key(snippet):
+    """Clé du shard d'une vidéo selon la stratégie"""
+    if PLAYLIST_SHARDING == 'year':
+        published_at = (snippet or {}).get('publishedAt') or ''
+        return published_at[:4] if published_at[:4].isdigit() else DEFAULT_KEY
+    if PLAYLIST_SHARDING == 'genre':
+        tokens = set(tokenize((snippet or {}).get('title', '')))
+        for key, words in GENRE_SHARDS:
+            if tokens & words:
+                return key
+    return DEFAULT_KEY
+
+def _open_shard(shards, key):
+    for shard in reversed(shards):
+        if shard['shard_key'] == key and not shard['full'] and shard['videos'] < PLAYLIST_SHARD_SIZE:
+            return shard
+    return None
+
+def _create_shard(youtube, key, part):
+    """Crée la playlist d'un nouveau shard (50 unités) et l'enregistre"""
+    label = '' if key == DEFAULT_KEY else f" {key}"
+    title = f"{PLAYLIST_SHARD_TITLE}{label}" + (f" #{part}" if part > 1 else '')
+    response = quota.execute(youtube.playlists().insert(
+        part='snippet,status',
+        body={
+            'snippet': {'title': title, 'description': f"{PLAYLIST_SHARD_TITLE} (suite)"},
+            'status': {'privacyStatus': 'public'}
+        }
+    ))
+    with transaction() as conn:
+        _register(conn, response['id'], key, part, title)
+    print(f"DEBUG: Nouvelle playlist '{title}' ({response['id']})")
+    return response['id']
+
+def route(youtube, playlist_id, snippet=None):
+    """
+    Playlist où ajouter une vidéo
+    - playlist_id: PLAYLIST_ID, ou le shard choisi lors d'un essai précédent (gardé s'il n'est pas plein)
+    - Ouvre un nouveau shard quand celui de la clé est plein (ou n'existe pas encore)
+    """
+    if PLAYLIST_SHARDING == 'none':
+        return playlist_id
+
+    primary = get_connection().execute(
+        "SELECT playlist_id FROM playlist_shards WHERE ordinal = 0"
+    ).fetchone()
+    primary_id = primary['playlist_id'] if primary else playlist_id
+
+    shards = list_shards(primary_id)
+    if playlist_id != primary_id:
+        current = next((shard for shard in shards if shard['playlist_id'] == playlist_id), None)
+        if current and not current['full']:
+            return playlist_id
+
+    key = shard_key(snippet)
+    shard = _open_shard(shards, key)
+    if shard:
+        return shard['playlist_id']
+
+    with _lock:
+        # Un autre thread a pu ouvrir le shard entre-temps
+        shards = list_shards(primary_id)
+        shard = _open_shard(shards, key)
+        if shard:
+            return shard['playlist_id']
+        if not PLAYLIST_SHARD_AUTO_CREATE:
+            fallback = _open_shard(shards, DEFAULT_KEY)
+            return fallback['playlist_id'] if fallback else primary_id
+        part = 1 + max((s['part'] for s in shards if s['shard_key'] == key), default=0)
+        return _create_shard(youtube, key, part)
+
+def mark_full(playlist_id):
+    """YouTube refuse les ajouts: la playlist a atteint sa limite"""
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE playlist_shards SET full = 1 WHERE playlist_id = ?", (playlist_id,))
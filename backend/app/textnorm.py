@@ -0,0 +1,30 @@
+import re
+import unicodedata
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_REPEAT_RE = re.compile(r'([a-z])\1+')
+
+def fold_accents(text):
+    """'Tanà' -> 'Tana', 'fô' -> 'fo'"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def normalize_word(word):
+    """
+    Forme canonique d'un mot (variantes d'orthographe malagasy)
+    - y et i sont interchangeables (gasy/gasi, tsy/tsi)
+    - lettres doublées ramenées à une seule (rapp -> rap)
+    """
+    word = word.replace('y', 'i')
+    return _REPEAT_RE.sub(r'\1', word)
+
+def tokenize(text):
+    """Découpe un texte en mots normalisés"""
+    if not text:
+        return []
+    folded = fold_accents(text).lower().replace("'", '').replace('’', '')
+    return [normalize_word(token) for token in _TOKEN_RE.findall(folded)]
+
+def normalize_text(text):
+    """Texte normalisé, mots séparés par des espaces (indexation plein texte)"""
+    return ' '.join(tokenize(text))
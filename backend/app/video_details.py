@@ -0,0 +1,138 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from . import quota, run_log
+from .db import get_connection, register_schema
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+# Nombre max d'IDs acceptés par videos().list
+BATCH_SIZE = 50
+
+# Durée de vie du cache: la durée d'une vidéo publiée ne change pas, mais une vidéo supprimée,
+# privée ou remplacée doit finir par être relue (et les statistiques stockées vieillissent)
+VIDEO_DETAILS_TTL = timedelta(days=int(os.getenv('VIDEO_DETAILS_TTL_DAYS', '30')))
+
+# Cache des détails vidéo (partagé entre mots-clés et entre exécutions)
+register_schema("""
+CREATE TABLE IF NOT EXISTS video_details (
+    video_id TEXT PRIMARY KEY,
+    duration_seconds INTEGER NOT NULL,
+    content_details TEXT NOT NULL,
+    statistics TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+""")
+
+def parse_duration(duration_str):
+    """Parse une durée YouTube au format ISO 8601"""
+    try:
+        match = re.match(r'PT(\d+H)?(\d+M)?(\d+S)?', duration_str)
+        if not match:
+            return 0
+
+        hours = int(match.group(1)[:-1]) if match.group(1) else 0
+        minutes = int(match.group(2)[:-1]) if match.group(2) else 0
+        seconds = int(match.group(3)[:-1]) if match.group(3) else 0
+
+        return hours * 3600 + minutes * 60 + seconds
+    except:
+        return 0
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _load_cached(video_ids, max_age):
+    """Lit les détails déjà en cache (par paquets pour rester sous la limite de paramètres SQLite)"""
+    conn = get_connection()
+    cached = {}
+    min_fetched_at = (datetime.now() - max_age).isoformat() if max_age else ''
+
+    for chunk in _chunks(video_ids, 500):
+        placeholders = ','.join('?' * len(chunk))
+        rows = conn.execute(
+            f"SELECT * FROM video_details WHERE video_id IN ({placeholders}) AND fetched_at >= ?",
+            (*chunk, min_fetched_at)
+        ).fetchall()
+
+        for row in rows:
+            cached[row['video_id']] = {
+                'id': row['video_id'],
+                'duration_seconds': row['duration_seconds'],
+                'contentDetails': json.loads(row['content_details']),
+                'statistics': json.loads(row['statistics'])
+            }
+
+    return cached
+
+def _store(details):
+    conn = get_connection()
+    now = datetime.now().isoformat()
+    with conn:
+        conn.executemany("""
+            INSERT INTO video_details (video_id, duration_seconds, content_details, statistics, fetched_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                duration_seconds = excluded.duration_seconds,
+                content_details = excluded.content_details,
+                statistics = excluded.statistics,
+                fetched_at = excluded.fetched_at
+        """, [
+            (
+                d['id'],
+                d['duration_seconds'],
+                json.dumps(d['contentDetails']),
+                json.dumps(d['statistics']),
+                now
+            )
+            for d in details
+        ])
+
+def get_video_details(youtube, video_ids, max_age=None):
+    """
+    Retourne {video_id: détails} pour une liste d'IDs
+    - Lit d'abord le cache local
+    - Résout les manquants par paquets de 50 IDs (1 unité de quota par paquet)
+    - max_age (timedelta): ignore les entrées du cache plus anciennes (VIDEO_DETAILS_TTL par défaut)
+    Les vidéos supprimées ou privées sont absentes du résultat
+    """
+    # Dédoublonner en gardant l'ordre
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids:
+        return {}
+
+    details = _load_cached(video_ids, max_age or VIDEO_DETAILS_TTL)
+    missing = [video_id for video_id in video_ids if video_id not in details]
+
+    for chunk in _chunks(missing, BATCH_SIZE):
+        response = quota.execute(youtube.videos().list(
+            id=','.join(chunk),
+            part='contentDetails,statistics'
+        ))
+
+        fetched = []
+        for item in response.get('items', []):
+            content_details = item.get('contentDetails', {})
+            fetched.append({
+                'id': item['id'],
+                'duration_seconds': parse_duration(content_details.get('duration', '')),
+                'contentDetails': content_details,
+                'statistics': item.get('statistics', {})
+            })
+
+        _store(fetched)
+        details.update({d['id']: d for d in fetched})
+
+    if missing:
+        run_log.log_event(
+            'video_details',
+            f"Détails vidéo: {len(video_ids) - len(missing)} en cache, {len(missing)} demandés à l'API",
+            cached=len(video_ids) - len(missing),
+            fetched=len(missing)
+        )
+    return details
@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv('config/.env')
+
+YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+
+# Faux client en mémoire (développement hors ligne, benchmarks): aucun appel réseau
+YOUTUBE_FAKE = os.getenv('YOUTUBE_FAKE', '').lower() in ('1', 'true', 'yes')
+
+# Délai max d'un appel HTTP (secondes)
+HTTP_TIMEOUT = 30
+
+_doc_lock = threading.Lock()
+_discovery_doc = None
+_local = threading.local()
+
+def _get_discovery_doc():
+    """
+    Document de découverte YouTube v3, lu une seule fois par process
+    Copie statique fournie avec google-api-python-client: aucun appel réseau
+    """
+    global _discovery_doc
+
+    if _discovery_doc is None:
+        with _doc_lock:
+            if _discovery_doc is None:
+                from googleapiclient.discovery_cache import get_static_doc
+                _discovery_doc = json.loads(get_static_doc('youtube', 'v3'))
+
+    return _discovery_doc
+
+def get_youtube_client():
+    """
+    Retourne le client YouTube (clé API) du thread courant
+    - Construit une seule fois par thread (httplib2 n'est pas thread-safe)
+    - Connexion HTTP persistante (keep-alive) réutilisée entre les appels
+    - Imports Google chargés au premier appel seulement (démarrage rapide de l'API)
+    - YOUTUBE_FAKE=1: client factice partagé (voir fake_youtube)
+    """
+    if YOUTUBE_FAKE:
+        from .fake_youtube import get_fake_client
+        return get_fake_client()
+
+    client = getattr(_local, 'youtube', None)
+
+    if client is None:
+        import httplib2
+        from googleapiclient.discovery import build_from_document
+
+        client = build_from_document(
+            _get_discovery_doc(),
+            developerKey=YOUTUBE_API_KEY,
+            http=httplib2.Http(timeout=HTTP_TIMEOUT)
+        )
+        _local.youtube = client
+
+    return client
@@ -4,6 +4,9 @@ import './App.css'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
+// Vidéos reçues ajoutées à l'affichage par lots: une fois par frame, ou dès que le lot atteint cette taille
+const FLUSH_ROWS = 500
+
 export default function App() {
   const [videos, setVideos] = useState([])
   const [loading, setLoading] = useState(true)
@@ -19,16 +22,59 @@ export default function App() {
     setError('')
 
     try {
-      const response = await fetch(`${API_URL}/api/videos`)
-      
+      // Toute la playlist en flux NDJSON: affichée au fur et à mesure de la réception
+      const response = await fetch(`${API_URL}/api/videos/export`)
+
       if (!response.ok) {
         throw new Error('Erreur lors de la récupération de la playlist')
       }
 
-      const data = await response.json()
-      setVideos(data.videos || [])
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let received = 0
+      let pending = []
+      let frame = null
+
+      // Ajoute le lot en attente à la liste affichée (sans recopier tout ce qui a déjà été reçu)
+      const flush = () => {
+        if (frame !== null) {
+          cancelAnimationFrame(frame)
+          frame = null
+        }
+        if (pending.length === 0) return
+        const batch = pending
+        pending = []
+        setVideos((previous) => previous.concat(batch))
+      }
+
+      setVideos([])
+      try {
+        while (true) {
+          const { done, value } = await reader.read()
+          buffer += decoder.decode(value || new Uint8Array(), { stream: !done })
 
-      if (data.videos && data.videos.length === 0) {
+          const lines = buffer.split('\n')
+          buffer = done ? '' : lines.pop()
+          for (const line of lines) {
+            if (line.trim()) {
+              pending.push(JSON.parse(line))
+              received += 1
+            }
+          }
+
+          if (done) break
+          if (pending.length >= FLUSH_ROWS) {
+            flush()
+          } else if (pending.length > 0 && frame === null) {
+            frame = requestAnimationFrame(flush)
+          }
+        }
+      } finally {
+        flush()
+      }
+
+      if (received === 0) {
         setError('Votre playlist est vide')
       }
     } catch (err) {
@@ -217,7 +263,7 @@ export default function App() {
                         aspectRatio: '16 / 9'
                       }}>
                         <img
-                          src={video.thumbnail}
+                          src={video.thumbnail_high || video.thumbnail}
                           alt={video.title}
                           style={{
                             width: '100%',
@@ -266,7 +312,10 @@ export default function App() {
                           fontSize: '12px',
                           color: '#94a3b8',
                           margin: '12px 0 0 0'
-                        }}>Regarder sur YouTube →</p>
+                        }}>
+                          {video.views != null && `👁️ ${video.views.toLocaleString('fr-FR')} vues · `}
+                          Regarder sur YouTube →
+                        </p>
                       </div>
                     </a>
                   ))}
@@ -2,12 +2,78 @@ import { useState } from 'react'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
+// Intervalle de suivi d'un job de recherche (ms), si le suivi en direct est indisponible
+const POLL_INTERVAL = 1000
+
+// Dernières vidéos traitées affichées pendant la recherche
+const FEED_SIZE = 8
+
+const VIDEO_STATUS_LABELS = {
+  inserted: '✅ Ajoutée',
+  duplicate: '🔁 Déjà présente',
+  too_short: '⏱️ Trop courte',
+  off_topic: '🚫 Hors sujet',
+  near_duplicate: '👯 Quasi-doublon',
+  queued: '📥 En file',
+  error: '⚠️ Erreur'
+}
+
+const STAGE_LABELS = {
+  queued: 'En attente',
+  search: 'Recherche YouTube',
+  details: 'Vérification des durées',
+  adding: 'Ajout des vidéos'
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
 export default function SearchPage({ onBack }) {
   const [keywords, setKeywords] = useState('')
   const [maxResults, setMaxResults] = useState(50)
   const [loading, setLoading] = useState(false)
   const [results, setResults] = useState(null)
   const [error, setError] = useState('')
+  const [progress, setProgress] = useState(null)
+  const [feed, setFeed] = useState([])
+
+  // Suit le job en direct (Server-Sent Events) jusqu'à sa fin
+  // Résout false si le flux n'est pas disponible: le polling prend le relais
+  const followJob = (eventsUrl) => new Promise((resolve) => {
+    if (typeof EventSource === 'undefined' || !eventsUrl) {
+      resolve(false)
+      return
+    }
+
+    const source = new EventSource(`${API_URL}${eventsUrl}`)
+
+    source.addEventListener('job', (event) => {
+      const payload = JSON.parse(event.data)
+      if (payload.stage) {
+        setProgress({ stage: payload.stage, done: 0, total: payload.total || 0 })
+      }
+      if (payload.status === 'done' || payload.status === 'failed') {
+        source.close()
+        resolve(true)
+      }
+    })
+
+    source.addEventListener('video', (event) => {
+      const payload = JSON.parse(event.data)
+      setFeed((previous) => [payload, ...previous].slice(0, FEED_SIZE))
+      setProgress((previous) => previous && { ...previous, done: previous.done + 1 })
+    })
+
+    // API redémarrée: le job a disparu avec elle, le polling donnera le verdict
+    source.addEventListener('reset', () => {
+      source.close()
+      resolve(false)
+    })
+
+    source.onerror = () => {
+      source.close()
+      resolve(false)
+    }
+  })
 
   const handleSearch = async (e) => {
     e.preventDefault()
@@ -16,6 +82,8 @@ export default function SearchPage({ onBack }) {
     setLoading(true)
     setError('')
     setResults(null)
+    setProgress(null)
+    setFeed([])
 
     try {
       const response = await fetch(`${API_URL}/api/search-and-add`, {
@@ -35,13 +103,36 @@ export default function SearchPage({ onBack }) {
         throw new Error(data.detail || 'Erreur lors de la recherche')
       }
 
-      setResults(data)
+      // La recherche tourne en arrière-plan: suivre le job jusqu'à la fin
+      // (en direct si possible, puis lecture du résultat)
+      await followJob(data.events_url)
+
+      let job = null
+      while (!job || job.status === 'queued' || job.status === 'running') {
+        if (job) await sleep(POLL_INTERVAL)
+
+        const jobResponse = await fetch(`${API_URL}/api/jobs/${data.job_id}`)
+        job = await jobResponse.json()
+
+        if (!jobResponse.ok) {
+          throw new Error(job.detail || 'Erreur lors du suivi de la recherche')
+        }
+        setProgress(job.progress)
+      }
+
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Erreur lors de la recherche')
+      }
+
+      setResults(job.result)
       setKeywords('')
     } catch (err) {
       setError(err.message || 'Erreur de connexion avec le serveur')
       console.error(err)
     } finally {
       setLoading(false)
+      setProgress(null)
+      setFeed([])
     }
   }
 
@@ -203,11 +294,37 @@ export default function SearchPage({ onBack }) {
               onMouseEnter={(e) => !loading && keywords.trim() && (e.target.style.backgroundColor = '#dc2626')}
               onMouseLeave={(e) => !loading && keywords.trim() && (e.target.style.backgroundColor = '#ef4444')}
             >
-              {loading ? '⏳ Recherche en cours...' : '🔍 Rechercher et ajouter'}
+              {loading
+                ? `⏳ ${STAGE_LABELS[progress?.stage] || 'Recherche en cours'}${progress?.total ? ` (${progress.done}/${progress.total})` : ''}...`
+                : '🔍 Rechercher et ajouter'}
             </button>
           </form>
         </div>
 
+        {/* Vidéos traitées en direct */}
+        {loading && feed.length > 0 && (
+          <div style={{
+            marginBottom: '24px',
+            padding: '16px',
+            backgroundColor: '#1e293b',
+            border: '1px solid #334155',
+            borderRadius: '8px'
+          }}>
+            {feed.map((video) => (
+              <p key={video.seq} style={{
+                color: '#cbd5e1',
+                fontSize: '14px',
+                margin: '4px 0',
+                whiteSpace: 'nowrap',
+                overflow: 'hidden',
+                textOverflow: 'ellipsis'
+              }}>
+                {VIDEO_STATUS_LABELS[video.status] || video.status} · {video.title || video.video_id}
+              </p>
+            ))}
+          </div>
+        )}
+
         {/* Message d'erreur */}
         {error && (
           <div style={{
@@ -0,0 +1,216 @@
+"""
+Benchmarks du crawler sur le faux client YouTube (aucun appel réseau, aucun quota réel)
+
+    python scripts/benchmark.py                        # tous les scénarios
+    python scripts/benchmark.py update_cold --repeat 3
+    python scripts/benchmark.py --save bench.json      # enregistrer une référence
+    python scripts/benchmark.py --baseline bench.json  # comparer (code 1 si régression)
+
+Chaque scénario tourne dans un process séparé avec une base SQLite neuve
+Mesures: temps, appels API par méthode, unités de quota (vues par le faux client et
+comptées par l'application), vidéos ajoutées, ajouts en double dans la playlist
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Recherches manuelles du scénario search_and_add
+MANUAL_QUERIES = ['rap gasy', 'hira vaovao', 'tononkira', 'drill malagasy', 'rap 501']
+
+# Scénarios: options du faux client
+SCENARIOS = {
+    # Première mise à jour: base vide, playlist déjà remplie à 10 %
+    'update_cold': {},
+    # Deuxième mise à jour après 60 nouvelles publications (caches, marques, chaînes suivies)
+    'update_warm': {},
+    # Recherches manuelles via POST /api/search-and-add et suivi des jobs
+    'search_and_add': {},
+    # Première mise à jour avec 5 % d'erreurs 5xx et 20 ms de latence par appel
+    'update_flaky': {'error_rate': 0.05, 'latency_ms': 20},
+}
+
+# Écarts tolérés par rapport à la référence
+QUOTA_TOLERANCE = 0.10
+TIME_TOLERANCE = 0.25
+
+def _environment(workdir, name):
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+        'YOUTUBE_FAKE': '1',
+        'PLAYLIST_ID': 'PLbenchmark',
+        'CATALOG_DB': os.path.join(workdir, f'{name}.db'),
+        'RUN_LOG_FILE': os.path.join(workdir, f'{name}.jsonl'),
+        'YOUTUBE_DAILY_QUOTA': '10000000',
+        'YOUTUBE_MAX_QPS': '0',
+    })
+    return env
+
+def _update(auto_update, fake):
+    started = time.perf_counter()
+    result = auto_update.automatic_update() or {}
+    return time.perf_counter() - started, result.get('added', 0)
+
+def _search_and_add(fake):
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+
+    client = TestClient(app)
+    started = time.perf_counter()
+    job_ids = [
+        client.post('/api/search-and-add', json={'keywords': query, 'max_results': 50}).json()['job_id']
+        for query in MANUAL_QUERIES
+    ]
+
+    added = 0
+    for job_id in job_ids:
+        while True:
+            job = client.get(f'/api/jobs/{job_id}').json()
+            if job['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.01)
+        added += (job.get('result') or {}).get('added', 0)
+    return time.perf_counter() - started, added
+
+def run_scenario(name):
+    """Exécuté dans le process enfant: retourne les mesures du scénario"""
+    from backend.app import fake_youtube
+
+    fake = fake_youtube.FakeYouTube(**SCENARIOS[name])
+    fake_youtube.install(fake)
+
+    from backend.app import auto_update, catalog, quota
+
+    # Préparation, hors mesure
+    if name == 'update_warm':
+        auto_update.automatic_update()
+        fake.publish(60)
+    elif name == 'search_and_add':
+        # Catalogue rempli comme en production (premier appel de /api/videos)
+        catalog.bootstrap_catalog(fake_youtube.get_fake_client, fake.playlist_id)
+    fake.reset_stats()
+
+    playlist_before = fake.stats()['playlist_size']
+    units_before = quota.used_today()
+
+    if name == 'search_and_add':
+        wall, added = _search_and_add(fake)
+    else:
+        wall, added = _update(auto_update, fake)
+
+    stats = fake.stats()
+    return {
+        'scenario': name,
+        'wall_seconds': round(wall, 3),
+        'calls': sum(stats['calls'].values()),
+        'calls_by_method': stats['calls'],
+        'units': stats['units'],
+        'app_units': quota.used_today() - units_before,
+        'added': added,
+        'playlist_growth': stats['playlist_size'] - playlist_before,
+        'injected_errors': stats['errors'],
+        'duplicate_inserts': stats['duplicate_inserts'],
+    }
+
+def _spawn(name, workdir):
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', name],
+        cwd=workdir,
+        env=_environment(workdir, name),
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scénario {name} en échec:\n{completed.stderr[-2000:]}")
+    # Dernière ligne: mesures en JSON (le reste est la sortie de la mise à jour)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def _print_table(results):
+    columns = [
+        ('scenario', 'Scénario', 16),
+        ('wall_seconds', 'Temps (s)', 10),
+        ('calls', 'Appels', 8),
+        ('units', 'Unités', 9),
+        ('app_units', 'Unités app', 11),
+        ('added', 'Ajoutées', 9),
+        ('injected_errors', 'Erreurs', 8),
+        ('duplicate_inserts', 'Doublons', 9),
+    ]
+    print(' '.join(title.ljust(width) for _, title, width in columns))
+    for result in results:
+        print(' '.join(str(result[key]).ljust(width) for key, _, width in columns))
+
+def _compare(results, baseline):
+    """Régressions par rapport à la référence: quota ou temps au-delà de la tolérance"""
+    reference = {result['scenario']: result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = reference.get(result['scenario'])
+        if previous is None:
+            continue
+        if result['units'] > previous['units'] * (1 + QUOTA_TOLERANCE):
+            regressions.append(f"{result['scenario']}: {previous['units']} -> {result['units']} unités")
+        if result['wall_seconds'] > previous['wall_seconds'] * (1 + TIME_TOLERANCE):
+            regressions.append(
+                f"{result['scenario']}: {previous['wall_seconds']} s -> {result['wall_seconds']} s"
+            )
+        if result['duplicate_inserts'] > previous['duplicate_inserts']:
+            regressions.append(f"{result['scenario']}: {result['duplicate_inserts']} ajouts en double")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du crawler sur le faux client YouTube")
+    parser.add_argument('scenarios', nargs='*', help=f"parmi {', '.join(SCENARIOS)} (tous par défaut)")
+    parser.add_argument('--repeat', type=int, default=1, help="exécutions par scénario (temps médian)")
+    parser.add_argument('--save', help="fichier JSON où enregistrer les résultats")
+    parser.add_argument('--baseline', help="résultats de référence à comparer")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        result = run_scenario(args.child)
+        print(json.dumps(result))
+        return 0
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"scénario inconnu: {', '.join(unknown)}")
+
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as workdir:
+                runs.append(_spawn(name, workdir))
+        result = runs[0]
+        result['wall_seconds'] = round(statistics.median(run['wall_seconds'] for run in runs), 3)
+        results.append(result)
+
+    _print_table(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = _compare(results, json.load(f))
+        if regressions:
+            print("\n❌ Régressions:")
+            for regression in regressions:
+                print(f"  • {regression}")
+            return 1
+        print("\n✅ Aucune régression par rapport à la référence")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
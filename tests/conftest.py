@@ -0,0 +1,48 @@
+"""
+Fixtures communes: faux client YouTube et base SQLite neuve pour chaque test
+(les variables d'environnement sont posées avant l'import de backend.app)
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix='rapstream-tests-')
+os.environ.update({
+    'YOUTUBE_FAKE': '1',
+    'YOUTUBE_MAX_QPS': '0',
+    'YOUTUBE_DAILY_QUOTA': '10000000',
+    'PLAYLIST_ID': 'PLtest',
+    'CATALOG_DB': os.path.join(_workdir, 'catalog.db'),
+    'RUN_LOG_FILE': os.path.join(_workdir, 'runs.jsonl'),
+    'SCHEDULER_ENABLED': '0',
+})
+
+import pytest
+
+from backend.app import db, fake_youtube, membership
+
+def _close_connection():
+    conn = getattr(db._local, 'conn', None)
+    if conn is not None:
+        conn.close()
+    db._local.__dict__.clear()
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    """Base neuve par test (connexion du thread courant rouverte sur le nouveau fichier)"""
+    _close_connection()
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'catalog.db'))
+    monkeypatch.setattr(membership, '_index', membership.MembershipIndex())
+    yield db.get_connection()
+    _close_connection()
+
+@pytest.fixture
+def fake():
+    """Faux client partagé du process: petit corpus, playlist vide"""
+    client = fake_youtube.FakeYouTube(videos=600, playlist_id='PLtest', playlist_size=0)
+    fake_youtube.install(client)
+    yield client
+    fake_youtube.install(None)
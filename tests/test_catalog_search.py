@@ -0,0 +1,74 @@
+from fastapi.testclient import TestClient
+
+from backend.app import catalog, catalog_search, main
+from backend.app.textnorm import normalize_text
+
+def _add_to_catalog(videos):
+    catalog.upsert_videos([
+        {
+            'video_id': video_id,
+            'playlist_item_id': f"PI{video_id}",
+            'position': position,
+            'title': title,
+            'channel_id': f"UC{position}",
+            'channel_title': channel,
+            'description': description,
+            'thumbnail': None,
+            'published_at': '2024-01-01T00:00:00Z',
+            'added_at': '2024-01-02T00:00:00Z',
+            'synced_at': '2024-01-02T00:00:00'
+        }
+        for position, (video_id, title, channel, description) in enumerate(videos)
+    ])
+
+def test_normalize_text_unifies_malagasy_spellings():
+    assert normalize_text("Rapp GASY - Tanà by Night (Tsy Mety)") == 'rap gasi tana bi night tsi meti'
+    assert normalize_text("Fitiavan'ny") == 'fitiavani'
+
+def test_match_query_uses_normalized_prefixes():
+    assert catalog_search.build_match_query('Rapp Gàsy') == '"rap"* "gasi"*'
+    assert catalog_search.build_match_query('  --  ') == ''
+
+def test_spelling_variants_and_prefixes_match(database):
+    _add_to_catalog([
+        ('a', 'Tsy Mety - Rap Gasy 2024', 'Mc Rakoto', ''),
+        ('b', 'Fitiavana (Clip Officiel)', 'Big Lova', 'Hira vaovao avy any Tanà'),
+        ('c', 'Freestyle Antananarivo', 'Shyn', '')
+    ])
+
+    assert [video['id'] for video in catalog_search.search_catalog('tsi meti')] == ['a']
+    assert [video['id'] for video in catalog_search.search_catalog('RAPP GÀSI')] == ['a']
+    assert [video['id'] for video in catalog_search.search_catalog('fitia')] == ['b']
+    assert [video['id'] for video in catalog_search.search_catalog('tana')] == ['b']
+    assert catalog_search.search_catalog('rap fitiavana') == []
+
+def test_title_matches_rank_above_description_matches(database):
+    _add_to_catalog([
+        ('desc', 'Freestyle', 'Shyn', 'Ity no hira momba an\'i Tanà'),
+        ('title', 'Tanà By Night', 'Mc Rakoto', ''),
+        # Autres vidéos: bm25 ne départage que des mots assez rares dans le catalogue
+        ('x', 'Fitiavana', 'Big Lova', ''),
+        ('y', 'Tsy Mety', 'Mc Rakoto', ''),
+        ('z', 'Mandeha', 'Denise', '')
+    ])
+
+    results = catalog_search.search_catalog('tana')
+
+    assert [video['id'] for video in results] == ['title', 'desc']
+    assert results[0]['score'] > results[1]['score']
+
+def test_index_follows_catalog_updates(database):
+    _add_to_catalog([('a', 'Ancien titre', 'Mc Rakoto', '')])
+    _add_to_catalog([('a', 'Nouveau titre', 'Mc Rakoto', '')])
+
+    assert catalog_search.search_catalog('ancien') == []
+    assert [video['id'] for video in catalog_search.search_catalog('nouveau')] == ['a']
+
+def test_endpoint_requires_a_query(database):
+    _add_to_catalog([('a', 'Tsy Mety', 'Mc Rakoto', '')])
+    client = TestClient(main.app)
+
+    assert client.get('/api/catalog/search', params={'q': ' '}).status_code == 400
+    response = client.get('/api/catalog/search', params={'q': 'tsi'})
+    assert response.status_code == 200
+    assert response.json()['count'] == 1
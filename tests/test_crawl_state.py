@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from backend.app import auto_update, crawl_state, search_api
+
+KEYWORD = 'rap gasy'
+
+def _seed_watermark(conn, last_published_at):
+    """Mot-clé déjà scanné en entier: le passage suivant est incrémental"""
+    now = crawl_state._format_time(crawl_state._utcnow())
+    with conn:
+        conn.execute(
+            "INSERT INTO keyword_watermarks (keyword, last_published_at, last_run_at, last_full_scan_at) "
+            "VALUES (?, ?, ?, ?)",
+            (KEYWORD, last_published_at, now, now)
+        )
+
+def _record_searches(fake, monkeypatch):
+    searches = []
+    search_list = fake._search_list
+
+    def recording(**params):
+        response = search_list(**params)
+        searches.append((params, [item['id']['videoId'] for item in response['items']]))
+        return response
+
+    monkeypatch.setattr(fake, '_search_list', recording)
+    return searches
+
+def test_truncated_search_reads_the_tail_on_next_runs(database, fake, monkeypatch):
+    oldest = min(video['published_at'] for video in fake.corpus.values())
+    _seed_watermark(database, oldest)
+    window = crawl_state.get_search_window(KEYWORD)
+    expected = fake._search_list(q=KEYWORD, order='date', publishedAfter=window['published_after'])
+    total = expected['pageInfo']['totalResults']
+    assert total > 50
+
+    searches = _record_searches(fake, monkeypatch)
+    auto_update.process_keyword(fake, 1, 1, KEYWORD, max_pages=1)
+
+    # Une seule page lue: la marque avance quand même, la tranche plus ancienne est gardée
+    first_page = searches[0][1]
+    watermark = crawl_state.get_watermark(KEYWORD)
+    newest = max(fake.corpus[video_id]['published_at'] for video_id in first_page)
+    oldest_seen = min(fake.corpus[video_id]['published_at'] for video_id in first_page)
+    assert watermark['last_published_at'] == newest
+    assert watermark['gap_after'] == window['published_after']
+    assert watermark['gap_before'] == oldest_seen
+
+    backfill = crawl_state.get_search_window(KEYWORD)
+    assert backfill['published_before'] == oldest_seen
+    assert backfill['published_after'] == window['published_after']
+
+    # Rattrapage page par page jusqu'à la fermeture du trou, sans relire une page
+    for _ in range(total // 50 + 1):
+        if not crawl_state.get_watermark(KEYWORD)['gap_before']:
+            break
+        auto_update.process_keyword(fake, 1, 1, KEYWORD, max_pages=1)
+
+    watermark = crawl_state.get_watermark(KEYWORD)
+    assert watermark['gap_after'] is None and watermark['gap_before'] is None
+    assert watermark['last_published_at'] == newest
+
+    read = [video_id for _, page in searches for video_id in page]
+    assert len(read) == len(set(read)) == total
+    assert all(params.get('publishedBefore') for params, _ in searches[1:])
+
+    # Trou fermé: retour à la recherche incrémentale depuis la marque
+    window = crawl_state.get_search_window(KEYWORD)
+    assert window['published_before'] is None
+    assert window['published_after'] == crawl_state._format_time(
+        crawl_state._parse_time(newest) - crawl_state.WATERMARK_OVERLAP
+    )
+
+def test_complete_search_leaves_no_gap(database, fake):
+    newest = max(video['published_at'] for video in fake.corpus.values())
+    _seed_watermark(database, crawl_state._format_time(crawl_state._parse_time(newest) - timedelta(days=20)))
+
+    auto_update.process_keyword(fake, 1, 1, KEYWORD, max_pages=3)
+
+    watermark = crawl_state.get_watermark(KEYWORD)
+    assert watermark['gap_after'] is None and watermark['gap_before'] is None
+    assert crawl_state.get_search_window(KEYWORD)['published_before'] is None
+
+def test_zero_pages_reads_nothing_and_keeps_the_gap(database, fake):
+    result = search_api.search_and_add_videos_with_api(fake, 'PLtest', KEYWORD, max_pages=0)
+
+    assert result['added'] == 0
+    assert result['truncated']
+    assert 'search.list' not in fake.stats()['calls']
+
+    # Rattrapage sans aucune page lue: le trou n'est pas refermé
+    _seed_watermark(database, '2025-06-01T00:00:00Z')
+    with database:
+        database.execute(
+            "UPDATE keyword_watermarks SET gap_after = ?, gap_before = ? WHERE keyword = ?",
+            ('2025-01-01T00:00:00Z', '2025-03-01T00:00:00Z', KEYWORD)
+        )
+    window = crawl_state.get_search_window(KEYWORD)
+    assert window['published_before'] == '2025-03-01T00:00:00Z'
+
+    crawl_state.record_search(KEYWORD, window, result['latest_published_at'], result['truncated'], result['oldest_published_at'])
+
+    watermark = crawl_state.get_watermark(KEYWORD)
+    assert watermark['gap_after'] == '2025-01-01T00:00:00Z'
+    assert watermark['gap_before'] == '2025-03-01T00:00:00Z'
@@ -0,0 +1,81 @@
+import asyncio
+
+from backend.app import events, main
+
+class _Request:
+    """Requête minimale pour stream_events: en-têtes, déconnexion après quelques tours"""
+
+    def __init__(self, headers=None, turns=1):
+        self.headers = headers or {}
+        self._turns = turns
+
+    async def is_disconnected(self):
+        self._turns -= 1
+        return self._turns < 0
+
+def _read_stream(monkeypatch, headers=None, since=None):
+    monkeypatch.setattr(main, 'SSE_KEEPALIVE_SECONDS', 0.01)
+
+    async def read():
+        response = await main.stream_events(_Request(headers), since=since)
+        return ''.join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(read())
+
+def _ids(body):
+    return [line[len('id: '):] for line in body.splitlines() if line.startswith('id: ')]
+
+def test_event_ids_carry_the_boot_epoch(monkeypatch):
+    bus = events.EventBus()
+    monkeypatch.setattr(events, 'bus', bus)
+    events.publish('job', job_id='a', status='running')
+    events.publish('job', job_id='a', status='done')
+
+    body = _read_stream(monkeypatch, since=0)
+
+    assert _ids(body) == [f"{bus.epoch}-1", f"{bus.epoch}-2"]
+    assert 'event: reset' not in body
+
+def test_resume_after_last_event_id_in_same_boot(monkeypatch):
+    bus = events.EventBus()
+    monkeypatch.setattr(events, 'bus', bus)
+    for status in ('queued', 'running', 'done'):
+        events.publish('job', status=status)
+
+    body = _read_stream(monkeypatch, headers={'last-event-id': f"{bus.epoch}-2"})
+
+    assert _ids(body) == [f"{bus.epoch}-3"]
+    assert 'event: reset' not in body
+
+def test_reconnect_after_restart_resets_and_replays(monkeypatch):
+    # Avant le redémarrage: l'abonné a reçu jusqu'au numéro 50
+    before = events.EventBus()
+    for index in range(50):
+        before.publish('video', index=index)
+    last_event_id = before.event_id({'seq': 50})
+
+    # Nouveau process: numéros repartis de zéro, nouvelle epoch
+    after = events.EventBus()
+    monkeypatch.setattr(events, 'bus', after)
+    events.publish('run_started', run_id=7)
+    events.publish('keyword', run_id=7)
+
+    body = _read_stream(monkeypatch, headers={'last-event-id': last_event_id})
+
+    assert body.index('event: reset') < body.index('id: ')
+    assert _ids(body) == [f"{after.epoch}-1", f"{after.epoch}-2"]
+
+def test_sequence_ahead_of_bus_resets(monkeypatch):
+    # Ancien identifiant sans epoch (numéro seul) ou since d'un events_url d'avant le redémarrage
+    bus = events.EventBus()
+    monkeypatch.setattr(events, 'bus', bus)
+    events.publish('job', status='running')
+
+    assert bus.resume_point('120') == (0, True)
+    assert bus.resume_point(None, 120) == (0, True)
+    assert bus.resume_point('1') == (1, False)
+    assert bus.resume_point(None, None) == (1, False)
+
+    body = _read_stream(monkeypatch, since=120)
+    assert 'event: reset' in body
+    assert _ids(body) == [f"{bus.epoch}-1"]
@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import catalog, fake_youtube, main
+
+@pytest.fixture
+def client(database):
+    fake = fake_youtube.FakeYouTube(videos=300, playlist_id='PLtest', playlist_size=20)
+    fake_youtube.install(fake)
+    catalog.sync_catalog(fake, 'PLtest')
+    yield TestClient(main.app)
+    fake_youtube.install(None)
+
+def _stats(video_id, views):
+    return {
+        'video_id': video_id,
+        'view_count': views,
+        'like_count': views // 10,
+        'comment_count': 0,
+        'duration_seconds': 180,
+        'category_id': '10',
+        'tags': '[]',
+        'thumbnail_high': None,
+        'channel_id': None,
+        'published_at': None,
+        'view_velocity': views / 10,
+        'enriched_at': datetime.now().isoformat()
+    }
+
+def test_stats_change_revalidates_every_response_with_stats(client):
+    video_ids = [row['video_id'] for row in catalog.list_playlist_order('PLtest', 'PLtest')]
+    catalog.update_metadata([_stats(video_id, 100) for video_id in video_ids])
+
+    version, _ = catalog.get_version()
+    first = client.get('/api/videos').json()
+    urls = [f"/api/videos?sort={sort}" for sort in catalog.SORTS] + [
+        '/api/videos/export',
+        f"/api/videos/changes?since={version}&stats_since={first['stats_version']}"
+    ]
+    etags = {url: client.get(url).headers['etag'] for url in urls}
+
+    # Nouveau relevé: seuls les chiffres changent
+    catalog.update_metadata([_stats(video_id, 250) for video_id in video_ids[:3]])
+
+    assert catalog.get_version()[0] == version
+    for url, etag in etags.items():
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 200, url
+
+    # Le delta porte les nouveaux chiffres des vidéos relevées, pas le reste
+    changes = client.get(
+        '/api/videos/changes', params={'since': version, 'stats_since': first['stats_version']}
+    ).json()
+    assert sorted(video['id'] for video in changes['videos']) == sorted(video_ids[:3])
+    assert all(video['views'] == 250 for video in changes['videos'])
+    assert changes['stats_version'] == first['stats_version'] + 1
+    assert client.get('/api/videos/changes', params={'since': version}).json()['videos'] == []
+
+def test_unchanged_stats_keep_the_stats_version(client):
+    video_ids = [row['video_id'] for row in catalog.list_playlist_order('PLtest', 'PLtest')]
+    catalog.update_metadata([_stats(video_id, 100) for video_id in video_ids])
+    stats_version, _ = catalog.get_stats_version()
+
+    catalog.update_metadata([_stats(video_id, 100) for video_id in video_ids])
+
+    assert catalog.get_stats_version()[0] == stats_version
+
+def test_etag_revalidation(client):
+    response = client.get('/api/videos')
+    assert response.status_code == 200
+    etag = response.headers['etag']
+
+    response = client.get('/api/videos', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['etag'] == etag
+    assert response.content == b''
+
+    # Nouvelle version du catalogue: réponse complète avec un nouvel ETag
+    catalog.set_positions([row['video_id'] for row in catalog.list_playlist_order('PLtest', 'PLtest')][::-1])
+    response = client.get('/api/videos', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+def test_if_modified_since_with_sub_second_updated_at(client):
+    # updated_at est écrit avec les microsecondes, Last-Modified à la seconde
+    last_modified = client.get('/api/videos').headers['last-modified']
+    response = client.get('/api/videos', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+def test_bad_cursor_is_rejected_before_revalidation(client):
+    etag = client.get('/api/videos').headers['etag']
+
+    for sort in ('playlist', 'views'):
+        response = client.get(
+            '/api/videos',
+            params={'cursor': 'pas-un-curseur', 'sort': sort},
+            headers={'If-None-Match': etag}
+        )
+        assert response.status_code == 400, sort
+
+def test_export_bootstraps_a_fresh_catalog(database):
+    fake = fake_youtube.FakeYouTube(videos=300, playlist_id='PLtest', playlist_size=20)
+    fake_youtube.install(fake)
+    try:
+        response = TestClient(main.app).get('/api/videos/export')
+    finally:
+        fake_youtube.install(None)
+
+    assert response.status_code == 200
+    lines = [line for line in response.text.splitlines() if line]
+    assert len(lines) == 20
+    assert response.headers['x-catalog-total'] == '20'
@@ -0,0 +1,143 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import insert_queue, main, membership
+from backend.app.fake_youtube import FakeHttpError
+from backend.app.quota import QuotaExceededError
+
+def _on_topic(fake, count):
+    return [video_id for video_id, video in fake.corpus.items() if video['on_topic']][:count]
+
+def _entry(database, video_id):
+    return database.execute("SELECT * FROM pending_inserts WHERE video_id = ?", (video_id,)).fetchone()
+
+def test_add_video_goes_through_the_queue(database, fake):
+    video_id = _on_topic(fake, 1)[0]
+    client = TestClient(main.app)
+
+    response = client.post('/api/add-video', params={'video_id': video_id})
+    assert response.json() == {'status': 'success', 'videoId': video_id}
+    assert _entry(database, video_id)['status'] == 'done'
+    assert _entry(database, video_id)['source'] == 'add-video'
+
+    # Deuxième demande: réponse de l'index, aucun appel YouTube
+    fake.reset_stats()
+    response = client.post('/api/add-video', params={'video_id': video_id})
+    assert response.json() == {'status': 'already_exists', 'videoId': video_id}
+    assert fake.stats()['calls'] == {}
+    assert fake.playlist_contents['PLtest'] == [video_id]
+
+def test_enqueued_twice_is_inserted_once(database, fake):
+    video_id = _on_topic(fake, 1)[0]
+    index = membership.get_index()
+
+    insert_queue.enqueue('PLtest', video_id, {'title': 'Titre'})
+    insert_queue.enqueue('PLtest', video_id, {'title': 'Titre'})
+    assert insert_queue.try_insert(fake, video_id, index) == 'added'
+    # Déjà en cours ou fait: pas de seconde tentative
+    assert insert_queue.try_insert(fake, video_id, index) == 'queued'
+
+    # Ré-inscrite (autre mot-clé): l'index la connaît, pas d'insert à 50 unités
+    insert_queue.enqueue('PLtest', video_id, {'title': 'Titre'})
+    fake.reset_stats()
+    assert insert_queue.try_insert(fake, video_id, index) == 'present'
+    assert fake.stats()['calls'] == {}
+    assert fake.duplicate_inserts == 0
+
+def test_duplicate_error_marks_the_entry_present(database, fake, monkeypatch):
+    video_id = _on_topic(fake, 1)[0]
+
+    def rejecting(**params):
+        raise FakeHttpError(409, 'duplicate')
+
+    monkeypatch.setattr(fake, '_playlistItems_insert', rejecting)
+    insert_queue.enqueue('PLtest', video_id, {})
+
+    assert insert_queue.try_insert(fake, video_id) == 'present'
+    assert _entry(database, video_id)['status'] == 'present'
+
+def test_quota_exhausted_keeps_the_video_queued(database, fake):
+    video_id = _on_topic(fake, 1)[0]
+    fake.daily_quota = sum(fake.stats()['units_by_method'].values())
+    client = TestClient(main.app)
+
+    response = client.post('/api/add-video', params={'video_id': video_id})
+    assert response.status_code == 429
+
+    # Tentative non comptée: reprise telle quelle par la prochaine mise à jour
+    entry = _entry(database, video_id)
+    assert entry['status'] == 'pending'
+    assert entry['attempts'] == 0
+    assert video_id not in fake.playlist_contents['PLtest']
+
+    # Remise à zéro du quota
+    fake.daily_quota = None
+    with database:
+        database.execute("DELETE FROM quota_exhausted")
+    counts = insert_queue.drain(fake)
+    assert counts['added'] == 1 and counts['remaining'] == 0
+    assert fake.playlist_contents['PLtest'] == [video_id]
+
+def test_try_insert_raises_on_quota(database, fake):
+    video_id = _on_topic(fake, 1)[0]
+    fake.daily_quota = 0
+    insert_queue.enqueue('PLtest', video_id, {})
+
+    with pytest.raises(QuotaExceededError):
+        insert_queue.try_insert(fake, video_id)
+    assert _entry(database, video_id)['status'] == 'pending'
+
+def _give_up(database, video_id):
+    with database:
+        database.execute(
+            "UPDATE pending_inserts SET status = 'failed', attempts = 5, rejections = 5 WHERE video_id = ?",
+            (video_id,)
+        )
+
+def test_failed_entry_is_reported_failed_not_queued(database, fake):
+    video_id = _on_topic(fake, 1)[0]
+    insert_queue.enqueue('PLtest', video_id, {})
+    _give_up(database, video_id)
+
+    # Retrouvée par un autre mot-clé: toujours abandonnée, pas "en file"
+    insert_queue.enqueue('PLtest', video_id, {})
+    assert insert_queue.try_insert(fake, video_id) == 'failed'
+    assert _entry(database, video_id)['status'] == 'failed'
+
+def test_add_video_retries_a_failed_entry(database, fake):
+    video_id = _on_topic(fake, 1)[0]
+    insert_queue.enqueue('PLtest', video_id, {})
+    _give_up(database, video_id)
+
+    response = TestClient(main.app).post('/api/add-video', params={'video_id': video_id})
+
+    assert response.json() == {'status': 'success', 'videoId': video_id}
+    entry = _entry(database, video_id)
+    assert entry['status'] == 'done' and entry['rejections'] == 0
+
+def test_add_video_rejected_for_good_answers_400(database, fake, monkeypatch):
+    monkeypatch.setattr(insert_queue, 'MAX_REJECTIONS', 1)
+
+    response = TestClient(main.app).post('/api/add-video', params={'video_id': 'inexistante'})
+
+    assert response.status_code == 400
+
+def test_bookkeeping_error_after_insert_does_not_insert_twice(database, fake, monkeypatch):
+    video_id = _on_topic(fake, 1)[0]
+    index = membership.get_index()
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(index, 'mark_added', locked)
+    insert_queue.enqueue('PLtest', video_id, {})
+    assert insert_queue.try_insert(fake, video_id, index) == 'added'
+    monkeypatch.undo()
+
+    assert _entry(database, video_id)['status'] == 'done'
+    counts = insert_queue.drain(fake)
+    assert counts['added'] == counts['retry'] == 0
+    assert fake.playlist_contents['PLtest'] == [video_id]
+    assert fake.duplicate_inserts == 0
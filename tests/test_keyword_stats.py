@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.app import keyword_stats
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {'value': datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)}
+    monkeypatch.setattr(keyword_stats, '_utcnow', lambda: now['value'])
+    return now
+
+def _run(clock, keyword, added, hours_later=3, **kwargs):
+    keyword_stats.record_run(keyword, {'added': added}, units=101 + 50 * added, **kwargs)
+    clock['value'] += timedelta(hours=hours_later)
+
+def _stats(keywords):
+    return {s['keyword']: s for s in keyword_stats.get_keyword_stats(keywords)}
+
+def test_untried_keywords_come_first_then_by_recent_yield(clock, database):
+    _run(clock, 'productif', 8, hours_later=0)
+    _run(clock, 'moyen', 2, hours_later=0)
+    _run(clock, 'faible', 1)
+
+    plan = keyword_stats.plan_keywords(['faible', 'moyen', 'nouveau', 'productif'])
+
+    assert plan['keywords'] == ['nouveau', 'productif', 'moyen', 'faible']
+    assert plan['resting'] == []
+
+def test_recent_runs_weigh_more_and_interrupted_runs_are_ignored(clock, database):
+    _run(clock, 'rap gasy', 10)
+    _run(clock, 'rap gasy', 0)
+    _run(clock, 'rap gasy', 0, interrupted=True)
+
+    stats = _stats(['rap gasy'])['rap gasy']
+
+    # Passage interrompu ignoré: 0 (poids 1) puis 10 (poids 0.7)
+    assert stats['recent_yield'] == round(7 / 1.7, 3)
+    assert stats['empty_streak'] == 1
+    assert stats['runs'] == 3
+
+def test_exploration_bonus_lets_a_rarely_tried_keyword_catch_up(clock, database):
+    for _ in range(6):
+        _run(clock, 'souvent', 1, hours_later=0)
+    _run(clock, 'rare', 1)
+
+    stats = _stats(['souvent', 'rare'])
+
+    assert stats['souvent']['recent_yield'] == stats['rare']['recent_yield']
+    assert stats['rare']['score'] > stats['souvent']['score']
+
+def test_empty_streak_doubles_the_rest(clock, database):
+    start = clock['value']
+    _run(clock, 'vide', 0, hours_later=0)
+
+    # Un passage vide: cadence normale
+    stats = _stats(['vide'])['vide']
+    assert stats['next_due_at'] == (start + timedelta(hours=3) - keyword_stats.SCHEDULE_SLACK).isoformat()
+    assert not stats['due']
+    clock['value'] = start + timedelta(hours=3)
+    assert _stats(['vide'])['vide']['due']
+
+    # Trois passages vides: 12 h de repos après le dernier
+    _run(clock, 'vide', 0, hours_later=0)
+    clock['value'] += timedelta(hours=6)
+    _run(clock, 'vide', 0, hours_later=0)
+    last = clock['value']
+
+    clock['value'] = last + timedelta(hours=6)
+    plan = keyword_stats.plan_keywords(['vide', 'autre'])
+    assert plan['resting'] == ['vide']
+    assert plan['keywords'] == ['autre']
+
+    clock['value'] = last + timedelta(hours=12)
+    assert keyword_stats.plan_keywords(['vide'])['keywords'] == ['vide']
+
+def test_backoff_is_capped(clock, monkeypatch, database):
+    monkeypatch.setattr(keyword_stats, 'MAX_BACKOFF', timedelta(hours=24))
+    for _ in range(keyword_stats.STATS_WINDOW):
+        _run(clock, 'vide', 0, hours_later=0)
+
+    stats = _stats(['vide'])['vide']
+
+    assert stats['empty_streak'] == keyword_stats.STATS_WINDOW
+    assert stats['next_due_at'] == (
+        clock['value'] + timedelta(hours=24) - keyword_stats.SCHEDULE_SLACK
+    ).isoformat()
+
+def test_a_productive_run_ends_the_rest(clock, database):
+    for _ in range(4):
+        _run(clock, 'reprise', 0, hours_later=0)
+    _run(clock, 'reprise', 3, hours_later=0)
+
+    stats = _stats(['reprise'])['reprise']
+
+    assert stats['empty_streak'] == 0
+    assert stats['due']
+
+def test_unproductive_keywords_read_a_single_incremental_page(clock, database):
+    _run(clock, 'productif', 4)
+    _run(clock, 'maigre', 0)
+
+    plan = keyword_stats.plan_keywords(['productif', 'maigre', 'nouveau'])
+
+    assert plan['max_pages']['maigre'] == 1
+    assert plan['max_pages']['productif'] == keyword_stats.INCREMENTAL_MAX_PAGES
+    assert plan['max_pages']['nouveau'] == keyword_stats.INCREMENTAL_MAX_PAGES
@@ -0,0 +1,35 @@
+import threading
+
+from backend.app import catalog, membership
+
+class _HookedLock:
+    """Verrou qui laisse un autre thread ajouter une vidéo juste avant la première prise"""
+
+    def __init__(self, hook):
+        self._lock = threading.Lock()
+        self._hook = hook
+
+    def __enter__(self):
+        hook, self._hook = self._hook, None
+        if hook:
+            hook()
+        return self._lock.__enter__()
+
+    def __exit__(self, *args):
+        return self._lock.__exit__(*args)
+
+def test_add_during_reload_is_kept(database):
+    index = membership.MembershipIndex()
+    catalog.set_meta('last_sync', '2030-01-01T00:00:00')
+
+    def concurrent_add():
+        worker = threading.Thread(
+            target=index.mark_added, args=('late-video', None, {'title': 'Titre'}, 'PLtest')
+        )
+        worker.start()
+        worker.join()
+
+    index._lock = _HookedLock(concurrent_add)
+    index.ensure_loaded()
+
+    assert index.contains('late-video')
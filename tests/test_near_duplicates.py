@@ -0,0 +1,107 @@
+from backend.app import catalog, near_duplicates
+
+def test_parse_title_splits_artist_and_track():
+    artist, track = near_duplicates.parse_title('Mc Rakoto - Fitia Mandeha (feat. Big Lova) [Official Video]')
+    assert artist == {'mc', 'rakoto'}
+    assert track == {'fitia', 'mandeha'}
+
+    artist, track = near_duplicates.parse_title('Mc Rakoto Fitia Mandeha (Lyrics)')
+    assert artist == set()
+    assert track == {'mc', 'rakoto', 'fitia', 'mandeha'}
+
+def test_reupload_with_separator_is_found(database):
+    near_duplicates.add_video('original', 'Mc Rakoto - Fitia Mandeha (Clip Officiel)', 200)
+
+    duplicate = near_duplicates.find_duplicate('Mc Rakoto - Fitia Mandeha (Lyrics)', 205)
+
+    assert duplicate['video_id'] == 'original'
+
+def test_reupload_without_separator_is_found(database):
+    near_duplicates.add_video('original', 'Mc Rakoto - Fitia Mandeha (Clip Officiel)', 200)
+
+    # Ré-upload lyrics dont le titre n'a pas de séparateur: l'artiste tombe dans le morceau
+    duplicate = near_duplicates.find_duplicate('Mc Rakoto Fitia Mandeha (Lyrics)', 203)
+
+    assert duplicate is not None and duplicate['video_id'] == 'original'
+
+REUPLOADS = [
+    ('Big Lova - Tanora Mahery', 'Big Lova Tanora Mahery (Lyrics)'),
+    ('Mc Rakoto Be - Fitia Mandeha', 'Mc Rakoto Be Fitia Mandeha (Audio)'),
+    ('Shyn Kaly - Ho Anao Irery', 'Shyn Kaly Ho Anao Irery (Paroles)'),
+    ('Tence Mena Ravao - Hiaraka Isika', 'Tence Mena Ravao Hiaraka Isika (Clip Officiel)'),
+    ('Jerry Marcoss Zay - Tsy Mbola', 'Jerry Marcoss Zay Tsy Mbola (Lyrics)'),
+    ('Denise Ntsoa - Mbola Tsy Ampy', 'Denise Ntsoa Mbola Tsy Ampy (Audio)'),
+]
+
+def test_every_reupload_without_separator_is_found(database):
+    # L'artiste qui tombe dans le morceau ne doit pas dépendre du hasard des bandes LSH
+    for position, (original, reupload) in enumerate(REUPLOADS):
+        near_duplicates.add_video(f"original{position}", original, 200 + position)
+
+    for position, (original, reupload) in enumerate(REUPLOADS):
+        duplicate = near_duplicates.find_duplicate(reupload, 200 + position)
+        assert duplicate is not None and duplicate['video_id'] == f"original{position}", reupload
+
+def test_original_without_separator_is_found(database):
+    near_duplicates.add_video('original', 'Mc Rakoto Fitia Mandeha', 200)
+
+    duplicate = near_duplicates.find_duplicate('Mc Rakoto - Fitia Mandeha (Audio)', 198)
+
+    assert duplicate is not None and duplicate['video_id'] == 'original'
+
+def test_other_track_or_other_artist_is_not_a_duplicate(database):
+    near_duplicates.add_video('original', 'Mc Rakoto - Fitia Mandeha (Clip Officiel)', 200)
+
+    assert near_duplicates.find_duplicate('Mc Rakoto - Tanora Mahery (Clip Officiel)', 200) is None
+    assert near_duplicates.find_duplicate('Big Lova - Fitia Mandeha (Clip Officiel)', 200) is None
+
+def test_far_apart_durations_are_different_recordings(database):
+    near_duplicates.add_video('original', 'Mc Rakoto - Fitia Mandeha (Clip Officiel)', 200)
+
+    assert near_duplicates.find_duplicate('Mc Rakoto - Fitia Mandeha (Live)', 420) is None
+
+def test_single_word_track_needs_durations(database):
+    near_duplicates.add_video('original', 'Mc Rakoto - Fitia', None)
+
+    assert near_duplicates.find_duplicate('Mc Rakoto - Fitia (Audio)', None) is None
+
+def _add_to_catalog(titles):
+    catalog.upsert_videos([
+        {
+            'video_id': video_id,
+            'playlist_item_id': f"PI{video_id}",
+            'position': position,
+            'title': title,
+            'channel_id': 'UC1',
+            'channel_title': 'Mc Rakoto',
+            'description': '',
+            'thumbnail': None,
+            'published_at': '2024-01-01T00:00:00Z',
+            'added_at': '2024-01-02T00:00:00Z',
+            'synced_at': '2024-01-02T00:00:00'
+        }
+        for position, (video_id, title) in enumerate(titles)
+    ])
+
+def test_sync_index_follows_the_catalog(database):
+    _add_to_catalog([('a', 'Mc Rakoto - Fitia Mandeha'), ('b', 'Mc Rakoto - Tanora Mahery')])
+
+    near_duplicates.sync_index()
+
+    assert near_duplicates.find_duplicate('Mc Rakoto Tanora Mahery (Lyrics)', None)['video_id'] == 'b'
+
+def test_index_from_a_previous_format_is_rebuilt(database):
+    _add_to_catalog([('a', 'Big Lova - Tanora Mahery')])
+    near_duplicates.sync_index()
+
+    # Index construit avant les bandes du titre entier
+    database.execute("DELETE FROM title_lsh WHERE band >= ?", (near_duplicates.BANDS,))
+    database.commit()
+    catalog.set_meta('title_index_format', '1')
+
+    near_duplicates.sync_index()
+
+    assert catalog.get_meta('title_index_format') == near_duplicates.INDEX_FORMAT
+    assert database.execute(
+        "SELECT COUNT(*) FROM title_lsh WHERE video_id = 'a' AND band >= ?", (near_duplicates.BANDS,)
+    ).fetchone()[0] == near_duplicates.BANDS
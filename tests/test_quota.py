@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from backend.app import quota
+from backend.app.fake_youtube import FakeHttpError
+
+PACIFIC = ZoneInfo('America/Los_Angeles')
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Heure du Pacifique réglable (le quota YouTube repart à zéro à minuit là-bas)"""
+    now = {'value': datetime(2024, 3, 9, 23, 59, tzinfo=PACIFIC)}
+    monkeypatch.setattr(quota, '_pacific_now', lambda: now['value'])
+    return now
+
+def test_quota_day_follows_pacific_time():
+    now = quota._pacific_now()
+
+    assert now.utcoffset() in (timedelta(hours=-7), timedelta(hours=-8))
+    assert quota.quota_day() == now.strftime('%Y-%m-%d')
+
+def test_ledger_accumulates_per_day_and_method(clock, database):
+    quota.record('search.list')
+    quota.record('search.list')
+    quota.record('videos.list', calls=3)
+
+    assert quota.used_today() == 2 * 100 + 3
+    budget = quota.get_budget()
+    assert budget['day'] == '2024-03-09'
+    assert budget['by_method']['search.list'] == {'calls': 2, 'units': 200}
+    assert budget['by_method']['videos.list'] == {'calls': 3, 'units': 3}
+
+def test_pacific_midnight_starts_a_new_day(clock, monkeypatch, database):
+    monkeypatch.setattr(quota, 'DAILY_QUOTA', 1000)
+    quota.record('playlistItems.insert', calls=4)
+    quota.mark_exhausted()
+    assert quota.remaining() == 0
+    assert quota.get_budget()['resets_at'] == '2024-03-10T00:00:00-08:00'
+
+    # Minuit heure du Pacifique (08:00 UTC, nuit du passage à l'heure d'été)
+    clock['value'] = datetime(2024, 3, 10, 0, 1, tzinfo=PACIFIC)
+
+    assert quota.quota_day() == '2024-03-10'
+    assert quota.used_today() == 0
+    assert not quota.is_exhausted()
+    assert quota.remaining() == 1000
+    assert quota.get_budget()['resets_at'] == '2024-03-11T00:00:00-07:00'
+
+def test_execute_refuses_calls_over_budget(clock, monkeypatch, fake, database):
+    monkeypatch.setattr(quota, 'DAILY_QUOTA', 150)
+    quota.execute(fake.search().list(q='rap gasy', part='snippet', type='video', maxResults=50))
+
+    with pytest.raises(quota.QuotaExceededError):
+        quota.execute(fake.search().list(q='rap gasy', part='snippet', type='video', maxResults=50))
+
+    assert fake.stats()['calls']['search.list'] == 1
+    assert quota.remaining() == 50
+
+class _FailingRequest:
+    methodId = 'youtube.playlistItems.insert'
+
+    def __init__(self, error):
+        self.error = error
+
+    def execute(self):
+        raise self.error
+
+def test_quota_error_marks_the_day_exhausted(clock, database):
+    with pytest.raises(quota.QuotaExceededError):
+        quota.execute(_FailingRequest(FakeHttpError(403, 'quotaExceeded')))
+
+    assert quota.is_exhausted()
+    assert quota.remaining() == 0
+
+def test_failed_calls_are_still_charged(clock, database):
+    with pytest.raises(FakeHttpError):
+        quota.execute(_FailingRequest(FakeHttpError(500, 'backendError')))
+
+    assert quota.used_today() == 50
+    assert not quota.is_exhausted()
+
+def test_plan_run_defers_keywords_over_budget(clock, monkeypatch, database):
+    monkeypatch.setattr(quota, 'DAILY_QUOTA', 2000)
+    # 2 recherches, 1 ajout: 100 + 1 + 0.5 * 50 unités par mot-clé
+    quota.record('search.list', calls=2)
+    quota.record('playlistItems.insert')
+
+    plan = quota.plan_run(['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o'], reserve=100)
+
+    assert plan['cost_per_keyword'] == 126
+    assert plan['budget'] == 2000 - 250 - 100
+    assert plan['keywords'] == list('abcdefghijklm')
+    assert plan['deferred'] == ['n', 'o']
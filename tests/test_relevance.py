@@ -0,0 +1,95 @@
+import sqlite3
+
+from backend.app import db, relevance, search_api
+
+def _rejected(video_id, score=0.5):
+    return (video_id, {'title': f"Titre {video_id}", 'channelTitle': 'Chaîne'}, {'score': score, 'features': {}})
+
+def test_repeated_rejections_update_one_row(database):
+    relevance.record_rejections('rap gasy', [_rejected('a'), _rejected('b')])
+    relevance.record_rejections('rap gasy', [_rejected('a', score=0.7)])
+    relevance.record_rejections('hira', [_rejected('a')])
+
+    rows = {(row['video_id'], row['keyword']): row for row in relevance.list_rejections()}
+    assert len(rows) == 3
+    assert rows[('a', 'rap gasy')]['hits'] == 2
+    assert rows[('a', 'rap gasy')]['score'] == 0.7
+    assert rows[('b', 'rap gasy')]['hits'] == 1
+
+def test_old_rejections_are_pruned(database):
+    relevance.record_rejections('rap gasy', [_rejected('a')])
+    with database:
+        database.execute("UPDATE relevance_rejections SET rejected_at = '2000-01-01T00:00:00'")
+
+    relevance.record_rejections('rap gasy', [_rejected('b')])
+
+    assert [row['video_id'] for row in relevance.list_rejections()] == ['b']
+
+def test_existing_duplicates_are_merged(tmp_path, monkeypatch):
+    # Base d'une version précédente: une ligne par écart
+    path = str(tmp_path / 'legacy.db')
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE relevance_rejections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_id TEXT NOT NULL,
+            keyword TEXT,
+            title TEXT,
+            channel_title TEXT,
+            score REAL NOT NULL,
+            features TEXT NOT NULL,
+            rejected_at TEXT NOT NULL
+        );
+        INSERT INTO relevance_rejections (video_id, keyword, score, features, rejected_at) VALUES
+            ('a', 'rap gasy', 0.1, '{}', '2030-01-01T00:00:00'),
+            ('a', 'rap gasy', 0.2, '{}', '2030-01-02T00:00:00'),
+            ('a', 'hira', 0.3, '{}', '2030-01-03T00:00:00');
+    """)
+    legacy.close()
+
+    db._local.conn.close()
+    db._local.__dict__.clear()
+    monkeypatch.setattr(db, 'DB_PATH', path)
+
+    rows = {(row['video_id'], row['keyword']): row for row in relevance.list_rejections()}
+    assert len(rows) == 2
+    assert rows[('a', 'rap gasy')]['hits'] == 2
+    assert rows[('a', 'rap gasy')]['score'] == 0.2
+
+def _new_artist_video(fake):
+    """Morceau d'un artiste inconnu du catalogue, titre sans mot du vocabulaire malagasy"""
+    video = next(
+        video for video in fake.corpus.values() if video['on_topic'] and video['duration'] >= 180
+    )
+    video['title'] = 'Mc Rakoto - Ilay andro (Clip Officiel)'
+    video['description'] = 'Rap 2024'
+    return {'id': {'videoId': video['id']}, 'snippet': fake._snippet(video)}
+
+def test_new_artist_title_scores_below_the_old_default(database, fake):
+    item = _new_artist_video(fake)
+
+    scored = relevance.score_items([item])[item['id']['videoId']]
+
+    assert scored['score'] < 1.0
+
+def test_new_artist_title_is_added_by_default(database, fake):
+    item = _new_artist_video(fake)
+    assert relevance.RELEVANCE_THRESHOLD == 0
+
+    result = search_api.add_candidates(fake, 'PLtest', [item], 'rap gasy')
+
+    assert result['off_topic'] == 0
+    assert result['added'] == 1
+
+def test_enabled_threshold_rejects_off_topic_titles(database, fake, monkeypatch):
+    monkeypatch.setattr(relevance, 'RELEVANCE_THRESHOLD', 1.0)
+    off_topic = [
+        {'id': {'videoId': video['id']}, 'snippet': fake._snippet(video)}
+        for video in fake.corpus.values() if not video['on_topic']
+    ][:10]
+
+    result = search_api.add_candidates(fake, 'PLtest', off_topic, 'rap gasy')
+
+    assert result['off_topic'] == len(off_topic)
+    assert result['added'] == 0
+    assert len(relevance.list_rejections()) == len(off_topic)
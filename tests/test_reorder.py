@@ -0,0 +1,78 @@
+import random
+
+from backend.app import catalog, reorder
+
+def _apply(order, moves):
+    order = list(order)
+    for video_id, position in moves:
+        order.remove(video_id)
+        order.insert(position, video_id)
+    return order
+
+def test_longest_increasing_subsequence():
+    values = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9]
+    indices = reorder.longest_increasing_subsequence(values)
+    picked = [values[index] for index in indices]
+
+    assert indices == sorted(indices)
+    assert all(a < b for a, b in zip(picked, picked[1:]))
+    assert len(picked) == 6
+    assert reorder.longest_increasing_subsequence([]) == []
+
+def test_plan_moves_reaches_the_desired_order_with_minimal_moves():
+    shuffle = random.Random(7)
+    for size in (0, 1, 2, 10, 200):
+        desired = [f"v{index}" for index in range(size)]
+        current = desired[:]
+        shuffle.shuffle(current)
+
+        total, moves = reorder.plan_moves(current, desired)
+
+        lis = len(reorder.longest_increasing_subsequence([desired.index(v) for v in current]))
+        assert total == len(moves) == size - lis
+        assert _apply(current, moves) == desired
+
+def test_plan_moves_already_sorted_costs_nothing():
+    videos = ['a', 'b', 'c', 'd']
+    assert reorder.plan_moves(videos, videos) == (0, [])
+
+def test_one_misplaced_video_is_one_move():
+    total, moves = reorder.plan_moves(['b', 'c', 'd', 'a', 'e'], ['a', 'b', 'c', 'd', 'e'])
+    assert total == 1
+    assert moves == [('a', 0)]
+
+def test_limited_plan_is_a_prefix_that_keeps_progressing():
+    shuffle = random.Random(3)
+    desired = [f"v{index}" for index in range(50)]
+    current = desired[:]
+    shuffle.shuffle(current)
+
+    total, moves = reorder.plan_moves(current, desired)
+    _, first = reorder.plan_moves(current, desired, limit=10)
+    assert first == moves[:10]
+
+    # Le reste se planifie depuis l'ordre obtenu, sans refaire les déplacements faits
+    remaining, rest = reorder.plan_moves(_apply(current, first), desired)
+    assert remaining == total - 10
+    assert _apply(_apply(current, first), rest) == desired
+
+def test_reorder_playlist_with_fake(database, fake):
+    video_ids = [video_id for video_id, video in fake.corpus.items() if video['on_topic']][:40]
+    fake.playlist_contents['PLtest'] = video_ids[:]
+    catalog.sync_catalog(fake, 'PLtest')
+
+    plan = reorder.plan('PLtest', 'newest')
+    assert plan['moves'] > 5
+
+    # Budget de 5 déplacements: le reste est gardé pour le passage suivant
+    partial = reorder.reorder_playlist(fake, 'PLtest', 'newest', max_units=5 * reorder.MOVE_COST)
+    assert partial['applied'] == 5 and partial['remaining'] == plan['moves'] - 5
+
+    result = reorder.reorder_playlist(fake, 'PLtest', 'newest', max_units=10 ** 6)
+
+    assert result['applied'] == plan['moves'] - 5 and result['remaining'] == 0
+    assert fake.stats()['calls'].get('playlistItems.update', 0) == plan['moves']
+    desired = [row['video_id'] for row in catalog.list_playlist_order('PLtest', 'PLtest', 'newest')]
+    assert fake.playlist_contents['PLtest'] == desired
+    assert [row['video_id'] for row in catalog.list_playlist_order('PLtest', 'PLtest')] == desired
+    assert reorder.plan('PLtest', 'newest')['moves'] == 0
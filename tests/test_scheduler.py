@@ -0,0 +1,70 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from backend.app import auto_update, db, scheduler
+
+def _steal_lease():
+    """Un autre process reprend le bail (le nôtre a expiré pendant une pause du crawl)"""
+    conn = db.get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE scheduler_leases SET owner = 'other-host:1:abcd', expires_at = '9999-01-01T00:00:00' "
+            "WHERE name = ?",
+            (scheduler.LEASE_NAME,)
+        )
+
+def test_lease_lost_mid_run_aborts_the_update(database, fake, monkeypatch):
+    monkeypatch.setattr(scheduler, 'UPDATE_LEASE_TTL', timedelta(seconds=0.3))
+    searches = []
+    search_list = fake._search_list
+
+    def searching(**params):
+        searches.append(params['q'])
+        if len(searches) == 1:
+            # Le heartbeat (toutes les 0,1 s) constate la perte avant les mots-clés suivants
+            _steal_lease()
+            time.sleep(0.5)
+        return search_list(**params)
+
+    monkeypatch.setattr(fake, '_search_list', searching)
+
+    stats = scheduler.run_update(force=True)
+
+    assert stats['aborted'] is True
+    assert stats['quota_exceeded'] is False
+    # Seuls les mots-clés déjà démarrés par les workers du crawler ont cherché
+    assert 0 < len(set(searches)) < len(auto_update.KEYWORDS_LIST) / 2
+    # Le bail appartient toujours à l'autre process (pas relâché par celui qui l'a perdu)
+    assert scheduler.get_lease()['owner'] == 'other-host:1:abcd'
+    row = database.execute("SELECT status FROM update_runs WHERE id = ?", (stats['run_id'],)).fetchone()
+    assert row['status'] == 'aborted'
+
+def test_update_skipped_while_another_process_holds_the_lease(database, fake):
+    assert scheduler.acquire_lease(owner='other-host:1:abcd')
+
+    assert scheduler.run_update(force=True) is None
+    assert fake.stats()['calls'] == {}
+
+def test_api_shutdown_waits_for_the_cancelled_scheduler(database, monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend.app import main
+
+    started = []
+    cancelled = []
+
+    async def run_scheduler():
+        started.append(True)
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(scheduler, 'SCHEDULER_ENABLED', True)
+    monkeypatch.setattr(scheduler, 'run_scheduler', run_scheduler)
+
+    with TestClient(main.app) as client:
+        assert client.get('/api/scheduler').status_code == 200
+
+    assert started and cancelled
@@ -0,0 +1,65 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+from backend.app import search_api, search_cache
+
+SEARCH = {'part': 'snippet', 'type': 'video', 'maxResults': 50, 'order': 'relevance'}
+
+def test_cache_key_normalizes_the_query():
+    assert search_cache.cache_key({'q': '  Rap   GASY ', 'pageToken': None}) == search_cache.cache_key({'q': 'rap gasy'})
+    assert search_cache.cache_key({'q': 'rap gasy', 'pageToken': 'CDIQAA'}) != search_cache.cache_key({'q': 'rap gasy'})
+
+def test_identical_search_is_served_from_cache(fake, database):
+    first = search_cache.cached_search(fake, q='rap gasy', **SEARCH)
+    again = search_cache.cached_search(fake, q='Rap  Gasy', **SEARCH)
+
+    assert again == first
+    assert fake.stats()['calls']['search.list'] == 1
+
+    # Autre page: autre requête YouTube
+    search_cache.cached_search(fake, q='rap gasy', pageToken=first['nextPageToken'], **SEARCH)
+    assert fake.stats()['calls']['search.list'] == 2
+
+def test_expired_response_is_fetched_again(fake, database):
+    search_cache.cached_search(fake, q='rap gasy', **SEARCH)
+    expired = (datetime.now() - search_cache.SEARCH_CACHE_TTL - timedelta(minutes=1)).isoformat()
+    database.execute("UPDATE search_cache SET fetched_at = ?", (expired,))
+    database.commit()
+
+    search_cache.cached_search(fake, q='rap gasy', **SEARCH)
+
+    assert fake.stats()['calls']['search.list'] == 2
+    rows = database.execute("SELECT fetched_at FROM search_cache").fetchall()
+    assert len(rows) == 1 and rows[0]['fetched_at'] > expired
+
+def test_seen_videos_claims_each_video_once_across_threads():
+    seen = search_cache.SeenVideos()
+    claimed = []
+
+    def worker():
+        claimed.extend(video_id for video_id in range(200) if seen.claim(video_id))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == list(range(200))
+    assert seen.get_stats() == {'checked': 800, 'duplicates': 600}
+
+def test_keywords_of_a_run_skip_videos_already_seen(fake, database):
+    seen = search_cache.SeenVideos()
+
+    first = search_api.search_and_add_videos_with_api(fake, 'PLtest', 'rap gasy', seen=seen)
+    videos_list_calls = fake.stats()['calls']['videos.list']
+    second = search_api.search_and_add_videos_with_api(fake, 'PLtest', 'Rap Gasy', seen=seen)
+
+    results = json.loads(database.execute("SELECT response FROM search_cache").fetchone()['response'])['items']
+    assert first['added'] > 0
+    assert second['already_seen'] == len(results)
+    assert second['added'] == 0
+    # Recherche servie par le cache, aucun détail redemandé
+    assert fake.stats()['calls']['search.list'] == 1
+    assert fake.stats()['calls']['videos.list'] == videos_list_calls
@@ -0,0 +1,98 @@
+import pytest
+
+from backend.app import fake_youtube, insert_queue, membership, shards
+
+@pytest.fixture
+def small_playlists():
+    """Faux client dont les playlists sont pleines à 2 vidéos"""
+    client = fake_youtube.FakeYouTube(videos=600, playlist_id='PLtest', playlist_size=0, max_playlist_items=2)
+    fake_youtube.install(client)
+    yield client
+    fake_youtube.install(None)
+
+def _register_primary():
+    return shards.list_shards('PLtest')
+
+def test_shard_key_per_strategy(monkeypatch):
+    snippet = {'title': 'Mc Rakoto - Drill Gasy', 'publishedAt': '2024-05-01T10:00:00Z'}
+
+    monkeypatch.setattr(shards, 'PLAYLIST_SHARDING', 'year')
+    assert shards.shard_key(snippet) == '2024'
+    assert shards.shard_key({}) == shards.DEFAULT_KEY
+
+    monkeypatch.setattr(shards, 'PLAYLIST_SHARDING', 'genre')
+    assert shards.shard_key(snippet) == 'drill'
+    assert shards.shard_key({'title': 'Mc Rakoto - Fitia'}) == shards.DEFAULT_KEY
+
+    monkeypatch.setattr(shards, 'PLAYLIST_SHARDING', 'size')
+    assert shards.shard_key(snippet) == shards.DEFAULT_KEY
+
+def test_primary_playlist_is_used_until_full(fake, database):
+    _register_primary()
+
+    assert shards.route(fake, 'PLtest') == 'PLtest'
+    assert 'playlists.insert' not in fake.stats()['calls']
+
+def test_full_primary_opens_a_new_shard_once(fake, database):
+    _register_primary()
+    shards.mark_full('PLtest')
+
+    created = shards.route(fake, 'PLtest')
+    again = shards.route(fake, 'PLtest')
+
+    assert created != 'PLtest' and again == created
+    assert fake.stats()['calls']['playlists.insert'] == 1
+    assert created in fake.playlist_contents
+    assert shards.playlists('PLtest') == {'PLtest': 0, created: shards.MAX_PLAYLIST_ITEMS}
+    assert shards.offset_of(created) == shards.MAX_PLAYLIST_ITEMS
+
+def test_retry_keeps_the_shard_chosen_before(fake, database):
+    _register_primary()
+    shards.mark_full('PLtest')
+    created = shards.route(fake, 'PLtest')
+
+    assert shards.route(fake, created) == created
+
+    shards.mark_full(created)
+    assert shards.route(fake, created) not in ('PLtest', created)
+    assert [shard['part'] for shard in shards.list_shards('PLtest')] == [1, 2, 3]
+
+def test_without_auto_create_the_primary_is_kept(fake, monkeypatch, database):
+    monkeypatch.setattr(shards, 'PLAYLIST_SHARD_AUTO_CREATE', False)
+    monkeypatch.setattr(shards, 'PLAYLIST_SHARDING', 'year')
+    _register_primary()
+
+    assert shards.route(fake, 'PLtest', {'publishedAt': '2024-05-01T10:00:00Z'}) == 'PLtest'
+    assert 'playlists.insert' not in fake.stats()['calls']
+
+def test_year_strategy_opens_one_shard_per_year(fake, monkeypatch, database):
+    monkeypatch.setattr(shards, 'PLAYLIST_SHARDING', 'year')
+    _register_primary()
+
+    first = shards.route(fake, 'PLtest', {'publishedAt': '2024-05-01T10:00:00Z'})
+    same_year = shards.route(fake, 'PLtest', {'publishedAt': '2024-11-20T10:00:00Z'})
+    other_year = shards.route(fake, 'PLtest', {'publishedAt': '2023-01-02T10:00:00Z'})
+
+    assert first == same_year != other_year
+    titles = {shard['shard_key']: shard['title'] for shard in shards.list_shards('PLtest')}
+    assert titles['2024'] == f"{shards.PLAYLIST_SHARD_TITLE} 2024"
+
+def test_playlist_full_error_moves_the_insert_to_a_new_shard(small_playlists, database):
+    fake = small_playlists
+    _register_primary()
+    index = membership.get_index()
+    video_ids = [video_id for video_id, video in fake.corpus.items() if video['on_topic']][:3]
+
+    for video_id in video_ids:
+        insert_queue.enqueue('PLtest', video_id, {'title': fake.corpus[video_id]['title']})
+    outcomes = [insert_queue.try_insert(fake, video_id, index) for video_id in video_ids]
+
+    # YouTube refuse le troisième: PLtest marquée pleine, l'ajout repart vers un nouveau shard
+    assert outcomes == ['added', 'added', 'retry']
+    assert [shard['full'] for shard in shards.list_shards('PLtest')] == [1]
+
+    assert insert_queue.try_insert(fake, video_ids[2], index) == 'added'
+    created = shards.list_shards('PLtest')[1]['playlist_id']
+    assert fake.playlist_contents['PLtest'] == video_ids[:2]
+    assert fake.playlist_contents[created] == video_ids[2:]
+    assert shards.list_shards('PLtest')[1]['videos'] == 1
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from backend.app import video_details
+
+def _video_ids(fake, count):
+    return list(fake.corpus)[:count]
+
+def test_details_are_fetched_in_batches_then_served_from_cache(fake, database):
+    video_ids = _video_ids(fake, 120)
+
+    details = video_details.get_video_details(fake, video_ids + ['absente'])
+
+    assert set(details) == set(video_ids)
+    assert details[video_ids[0]]['duration_seconds'] == fake.corpus[video_ids[0]]['duration']
+    assert fake.stats()['calls']['videos.list'] == 3
+
+    again = video_details.get_video_details(fake, video_ids)
+
+    assert again[video_ids[0]]['duration_seconds'] == details[video_ids[0]]['duration_seconds']
+    assert fake.stats()['calls']['videos.list'] == 3
+
+def test_entries_older_than_the_ttl_are_fetched_again(fake, database):
+    video_ids = _video_ids(fake, 2)
+    video_details.get_video_details(fake, video_ids)
+
+    expired = (datetime.now() - video_details.VIDEO_DETAILS_TTL - timedelta(hours=1)).isoformat()
+    database.execute("UPDATE video_details SET fetched_at = ? WHERE video_id = ?", (expired, video_ids[0]))
+    database.commit()
+
+    video_details.get_video_details(fake, video_ids)
+
+    assert fake.stats()['calls']['videos.list'] == 2
+    fetched_at = database.execute(
+        "SELECT fetched_at FROM video_details WHERE video_id = ?", (video_ids[0],)
+    ).fetchone()['fetched_at']
+    assert fetched_at > expired
+
+def test_parse_duration():
+    assert video_details.parse_duration('PT1H2M3S') == 3723
+    assert video_details.parse_duration('PT4M') == 240
+    assert video_details.parse_duration('P1D') == 0
+    assert video_details.parse_duration(None) == 0